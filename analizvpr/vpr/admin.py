@@ -1,3 +1,14 @@
 from django.contrib import admin
 
-# Register your models here.
+from vpr.models import School, ClassGroup, ExamWave, Student, StudentResult, TaskScore, WaveAggregate, \
+    OutboxMessage
+
+
+admin.site.register(School)
+admin.site.register(ClassGroup)
+admin.site.register(ExamWave)
+admin.site.register(Student)
+admin.site.register(StudentResult)
+admin.site.register(TaskScore)
+admin.site.register(WaveAggregate)
+admin.site.register(OutboxMessage)
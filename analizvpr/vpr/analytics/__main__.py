@@ -0,0 +1,6 @@
+import sys
+
+from vpr.analytics.cli import main
+
+
+sys.exit(main())
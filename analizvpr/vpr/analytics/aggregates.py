@@ -0,0 +1,180 @@
+from collections import Counter
+from typing import List, Dict, Any, Iterable, Union
+
+from vpr.analytics.columns import ClassColumns
+from vpr.analytics.records import StudentRecord, TaskSchema
+
+
+class ClassAggregates:
+    """
+    Running aggregates of a class that all metrics are calculated from.
+    Накопительные агрегаты класса, из которых рассчитываются все метрики.
+
+    Aggregates are built once from ClassColumns and then can be updated
+    by applying or reverting data of a single student in O(tasks).
+    Агрегаты строятся один раз из ClassColumns, а затем могут обновляться
+    применением или отменой данных одного ученика за O(заданий).
+
+    Aggregates hold only counts and sums, so aggregates of classes can be merged
+    into aggregates of a school or a region in any order.
+    Агрегаты содержат только количества и суммы, поэтому агрегаты классов можно
+    объединять в агрегаты школы или региона в любом порядке.
+    """
+
+    def __init__(self):
+        self.total_count = 0
+        self.present_count = 0
+        self.schema = TaskSchema()
+        self.marks = {"exam_mark": Counter(), "third_quarter": Counter()}
+        self.exam_points = Counter()
+        self.solved_tasks = 0
+        self.task_mistakes: List[int] = []
+        self.improved = 0
+        self.reduced = 0
+
+    @classmethod
+    def from_columns(cls, columns: ClassColumns) -> "ClassAggregates":
+        """
+        Builds aggregates from the columnar view of a class.
+        Строит агрегаты из поколоночного представления класса.
+        """
+        aggregates = cls()
+        aggregates.total_count = columns.total_count
+        aggregates.present_count = columns.present_count
+        aggregates.schema = columns.schema
+        aggregates.marks = {"exam_mark": Counter(columns.exam_marks),
+                            "third_quarter": Counter(columns.quarter_marks)}
+        aggregates.exam_points = Counter(columns.exam_points)
+        aggregates.solved_tasks = sum(1 for score in columns.task_scores if score > 0)
+        aggregates.task_mistakes = [columns.task_column(i).count(0) for i in range(columns.tasks_count)]
+        for exam, quarter in zip(columns.exam_marks, columns.quarter_marks):
+            aggregates.improved += exam > quarter
+            aggregates.reduced += exam < quarter
+        return aggregates
+
+    @classmethod
+    def combine(cls, partials: Iterable["ClassAggregates"]) -> "ClassAggregates":
+        """
+        Merges aggregates of several classes into new aggregates, e.g. of a school.
+        Объединяет агрегаты нескольких классов в новые агрегаты, например, школы.
+        """
+        aggregates = cls()
+        for partial in partials:
+            aggregates.merge(partial)
+        return aggregates
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns aggregates as a JSON compatible dict, e.g. to store them in the database.
+        Возвращает агрегаты в виде словаря, совместимого с JSON, например, для хранения в базе данных.
+        """
+        return {
+            "total_count": self.total_count,
+            "present_count": self.present_count,
+            "task_keys": list(self.schema.task_keys),
+            "marks": {mark_type: dict(counter) for mark_type, counter in self.marks.items()},
+            "exam_points": dict(self.exam_points),
+            "solved_tasks": self.solved_tasks,
+            "task_mistakes": list(self.task_mistakes),
+            "improved": self.improved,
+            "reduced": self.reduced,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ClassAggregates":
+        """
+        Restores aggregates from to_dict, also after a JSON round trip that turned integer keys into strings.
+        Восстанавливает агрегаты из to_dict, в том числе после JSON, превратившего целые ключи в строки.
+        """
+        aggregates = cls()
+        aggregates.total_count = data["total_count"]
+        aggregates.present_count = data["present_count"]
+        aggregates.schema = TaskSchema(data["task_keys"])
+        aggregates.marks = {mark_type: Counter({int(mark): count for mark, count in counter.items()})
+                            for mark_type, counter in data["marks"].items()}
+        aggregates.exam_points = Counter({int(points): count for points, count in data["exam_points"].items()})
+        aggregates.solved_tasks = data["solved_tasks"]
+        aggregates.task_mistakes = list(data["task_mistakes"])
+        aggregates.improved = data["improved"]
+        aggregates.reduced = data["reduced"]
+        return aggregates
+
+    @property
+    def task_keys(self) -> List[str]:
+        return list(self.schema.task_keys)
+
+    def marks_sum(self, mark_type: str) -> int:
+        return sum(mark * count for mark, count in self.marks[mark_type].items())
+
+    def add_student(self, student: Union[Dict[str, Any], StudentRecord], sign: int = 1) -> None:
+        """
+        Applies (sign=1) or reverts (sign=-1) the data of one student.
+        Применяет (sign=1) или отменяет (sign=-1) данные одного ученика.
+        """
+        if not self.schema and student.get("is_present") is True:
+            self.schema = student.schema if isinstance(student, StudentRecord) else TaskSchema.from_student(student)
+            self.task_mistakes = [0] * len(self.schema)
+        student = StudentRecord.adapt(student, self.schema)
+
+        self.total_count += sign
+        if student.is_present is not True:
+            return
+        self.present_count += sign
+
+        exam = self._to_int(student.exam_mark)
+        quarter = self._to_int(student.third_quarter)
+        self._update_counter(self.marks["exam_mark"], exam, sign)
+        self._update_counter(self.marks["third_quarter"], quarter, sign)
+        self._update_counter(self.exam_points, student.exam_points, sign)
+        self.improved += sign * (exam > quarter)
+        self.reduced += sign * (exam < quarter)
+
+        for task_index, score in enumerate(student.scores):
+            self.solved_tasks += sign * (score > 0)
+            self.task_mistakes[task_index] += sign * (score == 0)
+
+    def merge(self, other: "ClassAggregates") -> "ClassAggregates":
+        """
+        Adds aggregates of another group of students with the same tasks to these aggregates.
+        Добавляет к этим агрегатам агрегаты другой группы учеников с теми же заданиями.
+        """
+        if other.schema:
+            if not self.schema:
+                self.schema = other.schema
+                self.task_mistakes = [0] * len(self.schema)
+            elif self.schema.task_keys != other.schema.task_keys:
+                raise ValueError("Нельзя объединить результаты работ с разными заданиями")
+
+        self.total_count += other.total_count
+        self.present_count += other.present_count
+        for mark_type, counter in other.marks.items():
+            self.marks[mark_type].update(counter)
+        self.exam_points.update(other.exam_points)
+        self.solved_tasks += other.solved_tasks
+        if other.schema:
+            self.task_mistakes = [mine + theirs for mine, theirs in zip(self.task_mistakes, other.task_mistakes)]
+        self.improved += other.improved
+        self.reduced += other.reduced
+        return self
+
+    def remove_student(self, student: Union[Dict[str, Any], StudentRecord]) -> None:
+        self.add_student(student, sign=-1)
+
+    def replace_student(self, old_student: Union[Dict[str, Any], StudentRecord],
+                        new_student: Union[Dict[str, Any], StudentRecord]) -> None:
+        """
+        Replaces the data of one student, e.g. after a teacher has corrected a task score.
+        Заменяет данные одного ученика, например, после исправления учителем балла за задание.
+        """
+        self.remove_student(old_student)
+        self.add_student(new_student)
+
+    @staticmethod
+    def _update_counter(counter: Counter, key: int, delta: int) -> None:
+        counter[key] += delta
+        if counter[key] <= 0:
+            del counter[key]
+
+    @staticmethod
+    def _to_int(value: Any) -> int:
+        return value if isinstance(value, int) else 0
@@ -0,0 +1,324 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from collections.abc import Sequence
+from typing import Dict, Any, Iterable, Iterator, List, Tuple
+
+from vpr.analytics.columns import ClassColumns
+from vpr.analytics.records import StudentRecord, TaskSchema
+
+
+ARCHIVE_MAGIC = b"VPRARCH\0"
+ARCHIVE_FORMAT = 1
+ARCHIVE_SUFFIX = ".vpra"
+# magic, format, header length in bytes
+# магическая строка, формат, длина заголовка в байтах
+PREFIX = struct.Struct("<8sII")
+ALIGNMENT = 8
+# Marks that are not integers, e.g. "-" of absent students, are stored as this value
+# Оценки, которые не являются целыми числами, например "-" отсутствующих учеников, хранятся этим значением
+NO_MARK = -1
+
+# Fixed-width columns of the archive: students columns have a row per student, rows columns a row per present
+# student (task_scores - a row of scores per present student), presence is a bitmask of ceil(n / 8) bytes per class
+# Колонки фиксированной ширины архива: у колонок учеников строка на ученика, у колонок rows - строка на
+# присутствующего ученика (task_scores - строка баллов на присутствующего), presence - битовая маска
+# из ceil(n / 8) байт на класс
+SECTIONS = (
+    ("presence", "B"),
+    ("third_quarter", "b"),
+    ("exam_mark", "b"),
+    ("name_offsets", "I"),
+    ("names", "B"),
+    ("exam_marks", "b"),
+    ("quarter_marks", "b"),
+    ("exam_points", "i"),
+    ("task_scores", "h"),
+)
+
+
+def write_archive(path: str, classes: Iterable[Dict[str, Any]]) -> int:
+    """
+    Writes classes, e.g. of a whole exam wave, into a columnar archive and returns the number of classes.
+    Every class is a dict with students_data, its other keys (mark_3, class_group_id, ...) are kept in the header
+    and must be JSON serializable. All classes with present students must have the same tasks.
+    Записывает классы, например, всего проведения ВПР, в поколоночный архив и возвращает количество классов.
+    Каждый класс - словарь с students_data, его остальные ключи (mark_3, class_group_id, ...) хранятся в заголовке
+    и должны сериализоваться в JSON. У всех классов с присутствующими учениками должны быть одинаковые задания.
+
+    Marks that are not integers are read back as "-", missing task scores as 0, as the metrics count them.
+    Оценки, которые не являются целыми числами, читаются обратно как "-", отсутствующие баллы - как 0,
+    как их и учитывают метрики.
+    """
+    columns = {name: array(type_code) for name, type_code in SECTIONS}
+    columns["name_offsets"].append(0)
+    task_keys = None
+    header_classes = []
+
+    for class_data in classes:
+        students_data = class_data.get("students_data") or []
+        schema = TaskSchema.from_students(students_data)
+        if schema.task_keys:
+            task_keys = schema.task_keys if task_keys is None else task_keys
+            if schema.task_keys != task_keys:
+                raise ValueError("У всех классов архива должны быть одинаковые задания")
+
+        records = [StudentRecord.adapt(student, schema) for student in students_data]
+        class_columns = ClassColumns(records, schema)
+        header_classes.append({
+            "data": {key: value for key, value in class_data.items() if key != "students_data"},
+            "students": [len(columns["exam_mark"]), class_columns.total_count],
+            "rows": [len(columns["exam_points"]), class_columns.present_count],
+            "presence": len(columns["presence"]),
+            "tasks": len(schema),
+        })
+        for student in records:
+            columns["names"].frombytes(str(student.student_name).encode("utf-8"))
+            columns["name_offsets"].append(len(columns["names"]))
+            columns["third_quarter"].append(_to_mark(student.third_quarter))
+            columns["exam_mark"].append(_to_mark(student.exam_mark))
+        columns["presence"].frombytes(class_columns.presence.to_bytes((class_columns.total_count + 7) // 8, "little"))
+        for name in ("exam_marks", "quarter_marks", "exam_points", "task_scores"):
+            columns[name].extend(getattr(class_columns, name))
+
+    if columns["name_offsets"][-1] >= 2 ** 32:
+        raise ValueError("Слишком много имен учеников для одного архива")
+
+    header = {
+        "format": ARCHIVE_FORMAT,
+        "byteorder": sys.byteorder,
+        "task_keys": list(task_keys or ()),
+        "sections": {},
+        "classes": header_classes,
+    }
+    # offsets of the sections depend on the header length, so they are counted for the header with the widest offsets
+    # смещения секций зависят от длины заголовка, поэтому считаются для заголовка с самыми широкими смещениями
+    header["sections"] = {name: [sys.maxsize, len(column)] for name, column in columns.items()}
+    offset = _align(PREFIX.size + len(_dump_header(header)))
+    for name, _ in SECTIONS:
+        header["sections"][name][0] = offset
+        offset = _align(offset + len(columns[name]) * columns[name].itemsize)
+    header_bytes = _dump_header(header)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile("wb", dir=directory, suffix=ARCHIVE_SUFFIX, delete=False) as archive_file:
+        try:
+            archive_file.write(PREFIX.pack(ARCHIVE_MAGIC, ARCHIVE_FORMAT, len(header_bytes)))
+            archive_file.write(header_bytes)
+            for name, _ in SECTIONS:
+                archive_file.write(b"\0" * (header["sections"][name][0] - archive_file.tell()))
+                columns[name].tofile(archive_file)
+        except BaseException:
+            archive_file.close()
+            os.unlink(archive_file.name)
+            raise
+    os.replace(archive_file.name, path)
+    return len(header_classes)
+
+
+class ResultsArchive:
+    """
+    Read-only columnar archive of classes mapped into memory: opening reads only the header, columns of a class
+    are zero-copy slices of the mapped file, so processes reading the same archive share its pages.
+    Поколоночный архив классов только для чтения, отображенный в память: открытие читает только заголовок,
+    колонки класса - срезы отображенного файла без копирования, поэтому процессы, читающие один архив,
+    разделяют его страницы.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        with open(self.path, "rb") as archive_file:
+            self._mmap = mmap.mmap(archive_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open()
+        except BaseException:
+            self._mmap.close()
+            raise
+
+    def _open(self):
+        if len(self._mmap) < PREFIX.size:
+            raise ValueError("Файл не является архивом результатов ВПР")
+        magic, archive_format, header_length = PREFIX.unpack_from(self._mmap)
+        if magic != ARCHIVE_MAGIC:
+            raise ValueError("Файл не является архивом результатов ВПР")
+        if archive_format != ARCHIVE_FORMAT:
+            raise ValueError(f"Неизвестный формат архива результатов: {archive_format}")
+
+        header = json.loads(self._mmap[PREFIX.size:PREFIX.size + header_length].decode("utf-8"))
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError("Архив результатов записан с другим порядком байт")
+
+        self.schema = TaskSchema(header["task_keys"])
+        self.classes_header: List[Dict[str, Any]] = header["classes"]
+        self._root = memoryview(self._mmap)
+        self.sections: Dict[str, memoryview] = {}
+        for name, type_code in SECTIONS:
+            offset, count = header["sections"][name]
+            size = count * array(type_code).itemsize
+            self.sections[name] = self._root[offset:offset + size].cast(type_code)
+
+    def __len__(self) -> int:
+        return len(self.classes_header)
+
+    def __getitem__(self, index: int) -> "ArchiveClass":
+        if not -len(self) <= index < len(self):
+            raise IndexError(index)
+        return ArchiveClass(self, index % len(self))
+
+    def __iter__(self) -> Iterator["ArchiveClass"]:
+        return (ArchiveClass(self, index) for index in range(len(self)))
+
+    def datasets(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yields class datasets for get_report, batch and regional functions: the keys the class was written with
+        and its students as students_data.
+        Отдает наборы данных классов для get_report, пакетных и региональных функций: ключи, с которыми класс
+        был записан, и его учеников в students_data.
+        """
+        return (archive_class.get_dataset() for archive_class in self)
+
+    def group_by(self, key: str) -> List[List[Dict[str, Any]]]:
+        """
+        Returns class datasets grouped by a key of their data in the order of first appearance,
+        e.g. group_by("school_id") gives the schools for aggregate_region.
+        Возвращает наборы данных классов, сгруппированные по ключу их данных в порядке первого появления,
+        например, group_by("school_id") дает школы для aggregate_region.
+        """
+        groups: Dict[Any, List[Dict[str, Any]]] = {}
+        for dataset in self.datasets():
+            groups.setdefault(dataset.get(key), []).append(dataset)
+        return list(groups.values())
+
+    def close(self):
+        self.sections = {}
+        self._root.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            # columns of classes still in use keep the mapping, it is unmapped when they are released
+            # колонки еще используемых классов удерживают отображение, оно снимается, когда они освобождаются
+            pass
+
+    def __enter__(self) -> "ResultsArchive":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ArchiveClass(Sequence):
+    """
+    Class of an archive as a sequence of student records, which Students reads through its zero-copy columns
+    without decoding the students. Pickled as a reference to the archive file, so process pools map the file
+    instead of copying the class.
+    Класс архива как последовательность записей учеников, которую Students читает через ее колонки без копирования,
+    не декодируя учеников. Сериализуется pickle как ссылка на файл архива, поэтому пулы процессов отображают файл,
+    а не копируют класс.
+    """
+
+    def __init__(self, archive: ResultsArchive, index: int):
+        self.archive = archive
+        self.index = index
+        entry = archive.classes_header[index]
+        self.data: Dict[str, Any] = entry["data"]
+        self._students_start, self.total_count = entry["students"]
+        self._rows_start, self.present_count = entry["rows"]
+        self._presence_start = entry["presence"]
+        self.schema = archive.schema if entry["tasks"] else TaskSchema()
+        self._columns = None
+
+    @property
+    def columns(self) -> ClassColumns:
+        if self._columns is None:
+            sections = self._get_sections()
+            rows = slice(self._rows_start, self._rows_start + self.present_count)
+            tasks_count = len(self.schema)
+            self._columns = ClassColumns.from_buffers(
+                schema=self.schema,
+                total_count=self.total_count,
+                presence=sections["presence"][self._presence_start:self._presence_start + (self.total_count + 7) // 8],
+                exam_marks=sections["exam_marks"][rows],
+                quarter_marks=sections["quarter_marks"][rows],
+                exam_points=sections["exam_points"][rows],
+                task_scores=sections["task_scores"][rows.start * tasks_count:rows.stop * tasks_count],
+            )
+        return self._columns
+
+    def get_dataset(self) -> Dict[str, Any]:
+        dataset = dict(self.data)
+        dataset["students_data"] = self
+        return dataset
+
+    def __len__(self) -> int:
+        return self.total_count
+
+    def __getitem__(self, position: int) -> StudentRecord:
+        if not 0 <= position < self.total_count:
+            raise IndexError(position)
+        presence = self.columns.presence
+        row = (presence & ((1 << position) - 1)).bit_count()
+        return self._get_record(position, row, bool(presence >> position & 1))
+
+    def __iter__(self) -> Iterator[StudentRecord]:
+        presence = self.columns.presence
+        row = 0
+        for position in range(self.total_count):
+            is_present = bool(presence >> position & 1)
+            yield self._get_record(position, row, is_present)
+            row += is_present
+
+    def _get_record(self, position: int, row: int, is_present: bool) -> StudentRecord:
+        sections = self._get_sections()
+        index = self._students_start + position
+        name = sections["names"][sections["name_offsets"][index]:sections["name_offsets"][index + 1]]
+        tasks_count = len(self.schema)
+        return StudentRecord(
+            student_name=bytes(name).decode("utf-8"),
+            is_present=is_present,
+            third_quarter=_from_mark(sections["third_quarter"][index]),
+            exam_mark=_from_mark(sections["exam_mark"][index]),
+            scores=self.columns.task_scores[row * tasks_count:(row + 1) * tasks_count] if is_present else None,
+            schema=self.schema,
+        )
+
+    def _get_sections(self) -> Dict[str, memoryview]:
+        if not self.archive.sections:
+            raise ValueError("Архив результатов закрыт")
+        return self.archive.sections
+
+    def __reduce__(self):
+        return _load_archive_class, (self.archive.path, self.index)
+
+
+# Archives opened by unpickled classes, one mapping per file and process
+# Архивы, открытые распакованными классами, одно отображение на файл и процесс
+_opened_archives: Dict[str, Tuple[Tuple[int, int], ResultsArchive]] = {}
+
+
+def _load_archive_class(path: str, index: int) -> ArchiveClass:
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    opened = _opened_archives.get(path)
+    if opened is None or opened[0] != version:
+        opened = _opened_archives[path] = (version, ResultsArchive(path))
+    return opened[1][index]
+
+
+def _to_mark(value: Any) -> int:
+    return value if isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= 127 else NO_MARK
+
+
+def _from_mark(value: int) -> Any:
+    return "-" if value == NO_MARK else value
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _dump_header(header: Dict[str, Any]) -> bytes:
+    return json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
@@ -1,7 +1,6 @@
 from abc import ABC, abstractmethod
 from enum import Enum
-
-from vpr.analytics.student import Students
+from typing import Tuple
 
 
 class MarkType(Enum):
@@ -13,16 +12,43 @@ class MarkType(Enum):
     THIRD_QUARTER = "third_quarter"
 
 
+class BaseIntermediate(ABC):
+    """
+    Base class for intermediate results shared by several metrics within one report.
+    Базовый класс для промежуточных результатов, общих для нескольких метрик в рамках одного отчета.
+    """
+    name: str = None
+    inputs: Tuple[str, ...] = ("students",)
+
+    @abstractmethod
+    def calculate(self, *inputs):
+        """
+        Calculates the result from the values of inputs, passed in the same order.
+        Рассчитывает результат из значений inputs, переданных в том же порядке.
+        """
+        pass
+
+
 class BaseMetric(ABC):
     """
     Base class for all metrics.
     Базовый класс для всех метрик.
+
+    The metric declares the names of intermediate results it needs in inputs,
+    MetricsController passes their values to calculate in the same order.
+    Метрика объявляет в inputs имена нужных ей промежуточных результатов,
+    MetricsController передает их значения в calculate в том же порядке.
     """
     metric_name: str = None
     mark_type: MarkType = None
+    inputs: Tuple[str, ...] = ("students",)
+
+    @property
+    def outputs(self) -> Tuple[str, ...]:
+        return (self.metric_name,)
 
     @abstractmethod
-    def calculate(self, students_data: Students):
+    def calculate(self, *inputs):
         pass
 
 
@@ -32,9 +58,10 @@ class BaseVerification(ABC):
     Базовый класс для верификации данных.
     """
     bad_message: str = None
+    inputs: Tuple[str, ...] = ("students",)
 
     @abstractmethod
-    def get_verification(self, students_data: Students) -> bool:
+    def get_verification(self, *inputs) -> bool:
         """
         Returns True if the object has passed verification.
         Возвращает True, если объект прошел верификацию.
@@ -0,0 +1,79 @@
+import os
+import time
+from typing import Dict, Any, Callable, Iterable, Iterator, NamedTuple
+
+from vpr.analytics.metrics_controller import get_report, calculate_report
+
+
+class BatchReport(NamedTuple):
+    """
+    Report of one class from a batch together with its position and calculation time.
+    Отчет одного класса из пакета вместе с его позицией и временем расчета.
+    """
+    index: int
+    report: Dict[str, Any]
+    elapsed: float
+
+
+def get_reports(datasets: Iterable[Dict[str, Any]], max_workers: int = None,
+                translate: bool = True) -> Iterator[BatchReport]:
+    """
+    Calculates reports for many classes in a process pool and yields them as they are finished.
+    Рассчитывает отчеты для множества классов в пуле процессов и отдает их по мере готовности.
+
+    Results come in completion order, BatchReport.index points to the position of the dataset in datasets.
+    With translate=False reports keep English metric keys.
+    Результаты приходят в порядке готовности, BatchReport.index указывает на позицию набора данных в datasets.
+    С translate=False отчеты сохраняют английские ключи метрик.
+    """
+    payloads = ((index, _get_payload(data), translate) for index, data in enumerate(datasets))
+    return map_unordered(_calculate_report, payloads, max_workers=max_workers)
+
+
+def map_unordered(function: Callable, arguments: Iterable[tuple], max_workers: int = None) -> Iterator[Any]:
+    """
+    Calls function with every tuple of arguments in a process pool and yields results as they are finished.
+    At most max_workers * 4 calls are pending at once, so arguments can be a lazy generator of any length.
+    Вызывает function с каждым кортежем аргументов в пуле процессов и отдает результаты по мере готовности.
+    Одновременно ожидают не более max_workers * 4 вызовов, поэтому arguments может быть ленивым генератором
+    любой длины.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1:
+        for args in arguments:
+            yield function(*args)
+        return
+
+    # the process pool is imported only when it is used, it pulls in multiprocessing
+    # пул процессов импортируется только при использовании, он подтягивает multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+    max_pending = max_workers * 4
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = set()
+        for args in arguments:
+            pending.add(executor.submit(function, *args))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def _get_payload(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Takes from the class dataset (a dict or a session) only the keys used by get_report.
+    Берет из набора данных класса (словаря или сессии) только ключи, используемые get_report.
+    """
+    return {"students_data": data.get("students_data"), "mark_3": data.get("mark_3"),
+            "verification_rules": data.get("verification_rules")}
+
+
+def _calculate_report(index: int, data: Dict[str, Any], translate: bool = True) -> BatchReport:
+    started = time.perf_counter()
+    report = get_report(data) if translate else calculate_report(data)
+    return BatchReport(index=index, report=report, elapsed=time.perf_counter() - started)
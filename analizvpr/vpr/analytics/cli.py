@@ -0,0 +1,84 @@
+import argparse
+import json
+import sys
+from typing import Dict, Any, List, Optional, Sequence
+
+from vpr.analytics.batch import map_unordered
+from vpr.analytics.importers import read_students_file, StudentsImportError
+from vpr.analytics.metrics_controller import calculate_report, get_report
+from vpr.analytics.utils import add_marks_to_students
+
+
+def analyze_file(path: str, exam_marks: Dict[str, int], translate: bool = False) -> Dict[str, Any]:
+    """
+    Reads a class from a CSV or XLSX file and returns its report, with Russian metric names if translate is set.
+    Читает класс из CSV или XLSX файла и возвращает его отчет, с русскими названиями метрик, если задан translate.
+
+    Raises OSError if the file can not be read and StudentsImportError if its data is invalid.
+    Вызывает OSError, если файл не читается, и StudentsImportError, если его данные некорректны.
+    """
+    with open(path, "rb") as students_file:
+        students_data = read_students_file(students_file, path)
+    students_data = add_marks_to_students(students_data, exam_marks)
+    data = {"students_data": students_data, "mark_3": exam_marks["points_for_3"]}
+    return get_report(data) if translate else calculate_report(data)
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m vpr.analytics",
+        description="Рассчитывает отчеты по результатам ВПР из CSV или XLSX файлов без запуска Django. "
+                    "Для одного файла выводит отчет в JSON, для нескольких - по строке NDJSON на файл.")
+    parser.add_argument("paths", nargs="+", metavar="path", help="CSV или XLSX файлы с результатами учеников")
+    parser.add_argument("--points-for-3", type=int, required=True)
+    parser.add_argument("--points-for-4", type=int, required=True)
+    parser.add_argument("--points-for-5", type=int, required=True)
+    parser.add_argument("--russian", action="store_true", help="русские названия метрик вместо английских ключей")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="число процессов для нескольких файлов, 0 - по числу ядер (по умолчанию 1)")
+    parser.add_argument("--output", help="файл для отчетов, по умолчанию stdout")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Entry point of the analytics CLI, returns the exit code: 0 if all files were analyzed, 1 otherwise.
+    Точка входа CLI аналитики, возвращает код выхода: 0, если все файлы обработаны, иначе 1.
+    """
+    options = get_parser().parse_args(argv)
+    exam_marks = {f"points_for_{i}": getattr(options, f"points_for_{i}") for i in range(3, 6)}
+    output = open(options.output, "w", encoding="utf-8") if options.output else sys.stdout
+    try:
+        if len(options.paths) == 1:
+            result = _analyze(options.paths[0], exam_marks, options.russian)
+            if "errors" in result:
+                print("\n".join(result["errors"]), file=sys.stderr)
+                return 1
+            output.write(json.dumps(result["report"], ensure_ascii=False, indent=2) + "\n")
+            return 0
+
+        failed = False
+        arguments = ((path, exam_marks, options.russian) for path in options.paths)
+        for result in map_unordered(_analyze, arguments, max_workers=options.workers):
+            failed = failed or "errors" in result
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        return 1 if failed else 0
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+def _analyze(path: str, exam_marks: Dict[str, int], translate: bool) -> Dict[str, Any]:
+    """
+    Analyzes one file for main, errors are returned instead of raised so one bad file does not stop a batch.
+    Обрабатывает один файл для main, ошибки возвращаются, а не выбрасываются, чтобы один плохой файл
+    не останавливал пакет.
+    """
+    errors: List[str]
+    try:
+        return {"file": path, "report": analyze_file(path, exam_marks, translate)}
+    except OSError as error:
+        errors = [str(error)]
+    except StudentsImportError as error:
+        errors = error.errors
+    return {"file": path, "errors": errors}
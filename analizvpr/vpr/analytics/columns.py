@@ -0,0 +1,89 @@
+from array import array
+from typing import List, Any, Iterable, Union
+
+from vpr.analytics.records import StudentRecord, TaskSchema
+
+
+class ClassColumns:
+    """
+    Compact columnar view of a class, built in a single pass over the students.
+    Компактное поколоночное представление класса, строится за один проход по ученикам.
+
+    Rows of the mark, points and task columns belong to present students only,
+    presence of every student in the list is kept in the presence bitmask.
+    Строки колонок оценок, баллов и заданий относятся только к присутствующим ученикам,
+    присутствие каждого ученика из списка хранится в битовой маске presence.
+    """
+
+    def __init__(self, all_students: Iterable[StudentRecord], schema: TaskSchema):
+        self.total_count = 0
+        self.present_count = 0
+        self.presence = 0
+        self.schema = schema
+        self.exam_marks = array("b")
+        self.quarter_marks = array("b")
+        self.exam_points = array("i")
+        self.task_scores = array("h")
+
+        for position, student in enumerate(all_students):
+            self.total_count += 1
+            if student.is_present is not True:
+                continue
+
+            self.presence |= 1 << position
+            self.present_count += 1
+            self.exam_marks.append(self._to_int(student.exam_mark))
+            self.quarter_marks.append(self._to_int(student.third_quarter))
+            self.task_scores.extend(student.scores)
+            self.exam_points.append(student.exam_points)
+
+    @classmethod
+    def from_buffers(cls, schema: TaskSchema, total_count: int, presence: memoryview, exam_marks: memoryview,
+                     quarter_marks: memoryview, exam_points: memoryview, task_scores: memoryview) -> "ClassColumns":
+        """
+        Wraps ready columns, e.g. zero-copy slices of a mapped archive, without a pass over the students,
+        presence is the little-endian bitmask bytes.
+        Оборачивает готовые колонки, например, срезы отображенного архива без копирования, без прохода
+        по ученикам, presence - байты битовой маски в порядке little-endian.
+        """
+        columns = cls((), schema)
+        columns.total_count = total_count
+        columns.present_count = len(exam_points)
+        columns.presence = int.from_bytes(presence, "little")
+        columns.exam_marks = exam_marks
+        columns.quarter_marks = quarter_marks
+        columns.exam_points = exam_points
+        columns.task_scores = task_scores
+        return columns
+
+    @property
+    def task_keys(self) -> List[str]:
+        return list(self.schema.task_keys)
+
+    @property
+    def tasks_count(self) -> int:
+        return len(self.schema)
+
+    def is_present(self, position: int) -> bool:
+        return bool(self.presence >> position & 1)
+
+    def marks(self, mark_type: str) -> Union[array, memoryview]:
+        """
+        Returns the marks column of present students by the mark type value.
+        Возвращает колонку оценок присутствующих учеников по значению типа оценки.
+        """
+        return self.exam_marks if mark_type == "exam_mark" else self.quarter_marks
+
+    def task_column(self, task_index: int) -> array:
+        """
+        Returns the scores of all present students for one task.
+        Возвращает баллы всех присутствующих учеников за одно задание.
+        """
+        column = self.task_scores[task_index::self.tasks_count]
+        if isinstance(column, memoryview):
+            column = array(column.format, column.tobytes())
+        return column
+
+    @staticmethod
+    def _to_int(value: Any) -> int:
+        return value if isinstance(value, int) else 0
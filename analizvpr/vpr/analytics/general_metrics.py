@@ -1,9 +1,14 @@
 from collections import Counter
 from typing import List, Dict, Any, Set
 
+from vpr.analytics.aggregates import ClassAggregates
 from vpr.analytics.base_metric import BaseMetric, MarkType, BaseVerification
+from vpr.analytics.columns import ClassColumns
+from vpr.analytics.profiling import measure, VERIFICATION
+from vpr.analytics.records import StudentRecord
+from vpr.analytics.rules import RuleSet
 from vpr.analytics.student import Students
-from vpr.analytics.utils import calculate_exam_points, get_percentage, get_task_keys
+from vpr.analytics.utils import get_percentage
 
 
 class TotalStudentsMetric(BaseMetric):
@@ -12,9 +17,10 @@ class TotalStudentsMetric(BaseMetric):
     Метрика для расчёта количества всех учеников в классе.
     """
     metric_name = "total_students"
+    inputs = ("aggregates",)
 
-    def calculate(self, students_data: Students) -> int:
-        return len(students_data.get_all)
+    def calculate(self, aggregates: ClassAggregates) -> int:
+        return aggregates.total_count
 
 
 class StudentsPresentExamMetric(BaseMetric):
@@ -23,9 +29,10 @@ class StudentsPresentExamMetric(BaseMetric):
     Метрика для расчёта количества присутствующих на экзамене учеников.
     """
     metric_name = "students_present_exam"
+    inputs = ("present_count",)
 
-    def calculate(self, student_data: Students) -> int:
-        return len(student_data.get_present)
+    def calculate(self, present_count: int) -> int:
+        return present_count
 
 
 class ListStudentsAndMarksMetric(BaseMetric):
@@ -34,27 +41,43 @@ class ListStudentsAndMarksMetric(BaseMetric):
     Метрика для формирования списка имен учеников с оценками за 3-ю четверть и экзамен.
     """
     metric_name = "list_students_and_marks"
+    inputs = ("students", "columns")
 
-    def calculate(self, students_data: Students) -> List[Dict[str, Any]]:
+    def calculate(self, students_data: Students, columns: ClassColumns) -> List[Dict[str, Any]]:
         student_list = []
+        exam_points = iter(columns.exam_points)
 
-        for student in students_data.get_all:
+        for position, student in enumerate(students_data.get_all):
             student_data = {
-                "student_name": student.get("student_name", "Неизвестный"),
-                "exam_mark": student.get("exam_mark", "-"),
-                "exam_points": calculate_exam_points(student) if student.get("is_present") is True else "-",
+                "student_name": student.student_name,
+                "exam_mark": student.exam_mark,
+                "exam_points": next(exam_points) if columns.is_present(position) else "-",
             }
             student_list.append(student_data)
         return student_list
 
+    @staticmethod
+    def get_student_row(student: StudentRecord) -> Dict[str, Any]:
+        """
+        Returns the row of one student, e.g. to replace it in the list after the student is corrected.
+        Возвращает строку одного ученика, например, чтобы заменить ее в списке после исправления ученика.
+        """
+        return {
+            "student_name": student.student_name,
+            "exam_mark": student.exam_mark,
+            "exam_points": student.exam_points if student.is_present is True else "-",
+        }
+
 
 class BaseCounterMarksMetric(BaseMetric):
     """
     Base class for counting the number of marks.
     Базовый класс для подсчёта количества оценок.
     """
-    def calculate(self, students_data: Students) -> Counter:
-        return Counter(student.get(self.mark_type.value, 0) for student in students_data)
+    inputs = ("aggregates",)
+
+    def calculate(self, aggregates: ClassAggregates) -> Counter:
+        return Counter(aggregates.marks[self.mark_type.value])
 
 
 class CounterMarksThirdQuarterMetric(BaseCounterMarksMetric):
@@ -83,10 +106,12 @@ class BaseRateMetric(BaseMetric):
     metric_name: str = None
     mark_type: MarkType = None
     good_marks: Set = None
+    inputs = ("aggregates", "present_count")
 
-    def calculate(self, students_data: Students) -> float:
-        good_marks = sum(1 for student in students_data if student.get(self.mark_type.value) in self.good_marks)
-        return get_percentage(good_marks, len(students_data.get_present))
+    def calculate(self, aggregates: ClassAggregates, present_count: int) -> float:
+        marks = aggregates.marks[self.mark_type.value]
+        good_marks = sum(count for mark, count in marks.items() if mark in self.good_marks)
+        return get_percentage(good_marks, present_count)
 
 
 class QualityThirdQuarterMetric(BaseRateMetric):
@@ -134,12 +159,13 @@ class BaseAverageMarkMetric(BaseMetric):
     Base class for metrics that calculate the average mark.
     Базовый класс для метрик, вычисляющих среднюю оценку.
     """
+    inputs = ("average_marks",)
 
-    def calculate(self, students_data: Students) -> float:
-        sum_marks = sum(student.get(self.mark_type.value, 0) for student in students_data)
-        if sum_marks == 0:
+    def calculate(self, average_marks: Dict[str, float]) -> float:
+        average_mark = average_marks[self.mark_type.value]
+        if average_mark == 0:
             return 0
-        return round(sum_marks / len(students_data.get_present), 2)
+        return round(average_mark, 2)
 
 
 class AverageMarkThirdQuarterMetric(BaseAverageMarkMetric):
@@ -166,21 +192,13 @@ class AverageSolvedExamTasks(BaseMetric):
     Метрика для вычисления среднего количества решенных задач на экзамене.
     """
     metric_name = "average_solved_exam_tasks"
+    inputs = ("aggregates", "present_count")
 
-    def calculate(self, students_data: Students) -> float:
-        sum_solved_tasks = self.__get_sum_solved_tasks(students_data)
+    def calculate(self, aggregates: ClassAggregates, present_count: int) -> float:
+        sum_solved_tasks = aggregates.solved_tasks
         if sum_solved_tasks == 0:
             return 0
-        return round(sum_solved_tasks / len(students_data.get_present), 2)
-
-    @staticmethod
-    def __get_sum_solved_tasks(students_data: Students) -> int:
-        sum_solved_tasks = 0
-        for student in students_data:
-            for item in student:
-                if item.startswith('task_') and student.get(item, 0) > 0:
-                    sum_solved_tasks += 1
-        return sum_solved_tasks
+        return round(sum_solved_tasks / present_count, 2)
 
 
 class ImproveMarkMetric(BaseMetric):
@@ -192,14 +210,12 @@ class ImproveMarkMetric(BaseMetric):
     mark_exam = MarkType.EXAM
     mark_third_quarter = MarkType.THIRD_QUARTER
 
-    def calculate(self, students_data: Students) -> str:
-        count_changes = sum(1 for student in students_data if self.__verify_improve(student))
-        percentage_changes = get_percentage(count_changes, len(students_data.get_present))
-        return f"{percentage_changes}% ({count_changes} чел.)"
+    inputs = ("aggregates", "present_count")
 
-    @classmethod
-    def __verify_improve(cls, student: Dict[str, Any]) -> bool:
-        return student.get(cls.mark_exam.value, 0) > student.get(cls.mark_third_quarter.value, 0)
+    def calculate(self, aggregates: ClassAggregates, present_count: int) -> str:
+        count_changes = aggregates.improved
+        percentage_changes = get_percentage(count_changes, present_count)
+        return f"{percentage_changes}% ({count_changes} чел.)"
 
 
 class ReduceMarkMetric(BaseMetric):
@@ -211,38 +227,51 @@ class ReduceMarkMetric(BaseMetric):
     mark_exam = MarkType.EXAM
     mark_third_quarter = MarkType.THIRD_QUARTER
 
-    def calculate(self, students_data: Students) -> str:
-        count_changes = sum(1 for student in students_data if self.__verify_reduce(student))
-        percentage_changes = get_percentage(count_changes, len(students_data.get_present))
-        return f"{percentage_changes}% ({count_changes} чел.)"
+    inputs = ("aggregates", "present_count")
 
-    @classmethod
-    def __verify_reduce(cls, student: Dict[str, Any]) -> bool:
-        return student.get(cls.mark_exam.value, 0) < student.get(cls.mark_third_quarter.value, 0)
+    def calculate(self, aggregates: ClassAggregates, present_count: int) -> str:
+        count_changes = aggregates.reduced
+        percentage_changes = get_percentage(count_changes, present_count)
+        return f"{percentage_changes}% ({count_changes} чел.)"
 
 
 class VerificationResults(BaseMetric):
     """
     Metric for verifying the reliability of results.
     Метрика для проверки достоверности результатов.
+
+    Checks of the class statistics are made by the compiled rule set in one pass over the aggregates and the row
+    inputs of its enabled row rules, verifications are an extension point for checks outside the rules.
+    Проверки статистик класса выполняет скомпилированный набор правил за один проход по агрегатам и строковым
+    входным данным его включенных строковых правил, верификации - точка расширения для проверок вне правил.
     """
     metric_name = "verification_results"
     good_result = "результат достоверный"
     bad_result = "результат недостоверный"
 
-    def __init__(self, verifications: List):
+    def __init__(self, verifications: List, rules: RuleSet = None, mark_threshold: int = None):
         self.verifications = [v for v in verifications if isinstance(v, BaseVerification)]
-
-    def calculate(self, students_data: Students) -> str:
-        verifications_bad_result = self.__get_bad_verifications(students_data)
+        self.rules = rules
+        self.mark_threshold = mark_threshold
+        inputs = ["aggregates", *rules.inputs] if rules is not None else []
+        inputs.extend(name for v in self.verifications for name in v.inputs)
+        self.inputs = tuple(dict.fromkeys(inputs))
+
+    def calculate(self, *inputs) -> str:
+        verifications_bad_result = self.__get_bad_verifications(dict(zip(self.inputs, inputs)))
         if verifications_bad_result:
             return self.bad_result + ", так как " + '; '.join([v for v in verifications_bad_result])
         return self.good_result
 
-    def __get_bad_verifications(self, students_data: Students) -> List:
+    def __get_bad_verifications(self, values: Dict[str, Any]) -> List:
         bad_verifications = []
+        if self.rules is not None:
+            with measure(VERIFICATION, "rules"):
+                fired = self.rules.evaluate(values["aggregates"], self.mark_threshold, values)
+            bad_verifications.extend(rule["message"] for rule in fired)
         for verification in self.verifications:
-            check = verification.get_verification(students_data)
+            with measure(VERIFICATION, type(verification).__name__):
+                check = verification.get_verification(*(values[name] for name in verification.inputs))
             if check is False:
                 bad_verifications.append(verification.bad_message)
         return bad_verifications
@@ -255,29 +284,24 @@ class PopularMistakes(BaseMetric):
     """
     metric_name = "popular_mistakes"
     CRITICAL_MISTAKE_PERCENTAGE = 20
+    inputs = ("aggregates", "present_count")
 
-    def calculate(self, students_data: Students) -> str:
-        count_tasks_mistakes = self.__get_count_tasks_mistakes(students_data)
-        popular_mistakes = self.__get_popular_mistakes(students_data, count_tasks_mistakes)
+    def calculate(self, aggregates: ClassAggregates, present_count: int) -> str:
+        count_tasks_mistakes = self.__get_count_tasks_mistakes(aggregates)
+        popular_mistakes = self.__get_popular_mistakes(present_count, count_tasks_mistakes)
         return popular_mistakes if popular_mistakes else "отсутствуют"
 
     @classmethod
-    def __get_popular_mistakes(cls, students_data: Students, count_tasks_mistakes: Counter) -> Dict[str, str]:
+    def __get_popular_mistakes(cls, present_count: int, count_tasks_mistakes: Counter) -> Dict[str, str]:
         popular_mistakes = {}
 
         for task_name, count_mistakes in count_tasks_mistakes.items():
-            students_mistakes_percentage = get_percentage(count_mistakes, len(students_data.get_present))
+            students_mistakes_percentage = get_percentage(count_mistakes, present_count)
             if students_mistakes_percentage >= cls.CRITICAL_MISTAKE_PERCENTAGE:
                 task_name = task_name.replace("task_", "Задание ")
                 popular_mistakes[task_name] = f"{count_mistakes} / {students_mistakes_percentage}%"
         return popular_mistakes
 
     @staticmethod
-    def __get_count_tasks_mistakes(students_data: Students) -> Counter:
-        count_mistakes = Counter()
-        task_keys = get_task_keys(student=students_data.get_present[0])
-
-        for task in task_keys:
-            count_mistakes[task] = sum(1 for student in students_data if student.get(task, 0) == 0)
-
-        return count_mistakes
+    def __get_count_tasks_mistakes(aggregates: ClassAggregates) -> Counter:
+        return Counter(dict(zip(aggregates.task_keys, aggregates.task_mistakes)))
@@ -0,0 +1,307 @@
+import codecs
+import csv
+import io
+import posixpath
+import re
+from typing import List, Dict, Any, Iterable, Iterator, IO, Optional, TYPE_CHECKING
+
+from vpr.analytics.records import TASK_MIN_POINTS, TASK_MAX_POINTS
+
+if TYPE_CHECKING:
+    import zipfile
+
+
+STUDENT_NAME_COLUMN = "student_name"
+IS_PRESENT_COLUMN = "is_present"
+THIRD_QUARTER_COLUMN = "third_quarter"
+
+column_aliases = {
+    "student_name": STUDENT_NAME_COLUMN,
+    "имя ученика": STUDENT_NAME_COLUMN,
+    "ученик": STUDENT_NAME_COLUMN,
+    "is_present": IS_PRESENT_COLUMN,
+    "присутствие на экзамене": IS_PRESENT_COLUMN,
+    "присутствие": IS_PRESENT_COLUMN,
+    "third_quarter": THIRD_QUARTER_COLUMN,
+    "оценка за 3-ю четверть": THIRD_QUARTER_COLUMN,
+    "3-я четверть": THIRD_QUARTER_COLUMN,
+}
+
+TASK_COLUMN_PATTERN = re.compile(r"^(?:task_|задание\s*)(\d+)$")
+TRUE_VALUES = {"1", "true", "yes", "да", "+", "присутствовал", "присутствует"}
+FALSE_VALUES = {"", "0", "false", "no", "нет", "-", "отсутствовал", "отсутствует"}
+
+QUARTER_MARKS = range(2, 6)
+TASK_POINTS = range(TASK_MIN_POINTS, TASK_MAX_POINTS + 1)
+
+XLSX_NAMESPACE = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+XLSX_RELATIONSHIP_NAMESPACE = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+XLSX_PACKAGE_NAMESPACE = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+XLSX_SHEET_PATTERN = re.compile(r"^xl/worksheets/sheet(\d*)\.xml$")
+
+# Russian Excel saves "CSV" in Windows-1251, it is used when the beginning of a file is not valid UTF-8
+# Русский Excel сохраняет "CSV" в Windows-1251, она используется, если начало файла не является корректным UTF-8
+CSV_FALLBACK_ENCODING = "cp1251"
+CSV_ENCODING_SAMPLE_SIZE = 64 * 1024
+
+
+class StudentsImportError(ValueError):
+    """
+    Error raised when a students file can not be imported, contains the list of found problems.
+    Ошибка, возникающая, если файл с учениками невозможно импортировать, содержит список найденных проблем.
+    """
+
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        super().__init__("; ".join(errors))
+
+
+def read_students_file(file: IO[bytes], filename: str) -> List[Dict[str, Any]]:
+    """
+    Reads students data from a CSV or XLSX file and validates it.
+    Читает данные учеников из CSV или XLSX файла и проверяет их.
+    """
+    if filename.lower().endswith(".xlsx"):
+        rows = iter_xlsx_rows(file)
+    elif filename.lower().endswith((".csv", ".txt")):
+        rows = iter_csv_rows(file)
+    else:
+        raise StudentsImportError(["Поддерживаются только файлы CSV и XLSX"])
+    return parse_students_rows(rows)
+
+
+def iter_csv_rows(file: IO[bytes]) -> Iterator[List[str]]:
+    """
+    Lazily reads rows of a CSV file, the delimiter (comma, semicolon or tab) and the encoding (UTF-8 or
+    Windows-1251) are detected automatically.
+    Лениво читает строки CSV файла, разделитель (запятая, точка с запятой или табуляция) и кодировка (UTF-8 или
+    Windows-1251) определяются автоматически.
+    """
+    text = io.TextIOWrapper(file, encoding=_detect_csv_encoding(file), newline="")
+    try:
+        first_line = text.readline()
+        try:
+            dialect = csv.Sniffer().sniff(first_line, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader([first_line], dialect)
+        yield from csv.reader(text, dialect)
+    except UnicodeDecodeError:
+        raise StudentsImportError(["Не удалось прочитать файл: сохраните CSV в кодировке UTF-8 или Windows-1251"])
+
+
+def _detect_csv_encoding(file: IO[bytes]) -> str:
+    sample = file.read(CSV_ENCODING_SAMPLE_SIZE)
+    file.seek(0)
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+    except UnicodeDecodeError:
+        return CSV_FALLBACK_ENCODING
+    return "utf-8-sig"
+
+
+def iter_xlsx_rows(file: IO[bytes]) -> Iterator[List[str]]:
+    """
+    Lazily reads rows of the first worksheet of an XLSX file without third-party libraries.
+    Лениво читает строки первого листа XLSX файла без сторонних библиотек.
+    """
+    # zipfile and ElementTree are imported only for XLSX files to keep the startup of CSV jobs short
+    # zipfile и ElementTree импортируются только для XLSX файлов, чтобы не замедлять запуск заданий с CSV
+    import zipfile
+    from xml.etree.ElementTree import iterparse
+
+    try:
+        archive = zipfile.ZipFile(file)
+    except zipfile.BadZipFile:
+        raise StudentsImportError(["Файл XLSX поврежден"])
+
+    with archive:
+        shared_strings = _read_xlsx_shared_strings(archive)
+        first_sheet = _get_xlsx_first_sheet(archive)
+        if first_sheet is None:
+            raise StudentsImportError(["В файле XLSX нет листов"])
+
+        with archive.open(first_sheet) as sheet:
+            for _, element in iterparse(sheet):
+                if element.tag != f"{XLSX_NAMESPACE}row":
+                    continue
+                row = []
+                for cell in element.iter(f"{XLSX_NAMESPACE}c"):
+                    column = _xlsx_column_index(cell.get("r", ""), default=len(row))
+                    row.extend([""] * (column - len(row)))
+                    row.append(_xlsx_cell_value(cell, shared_strings))
+                element.clear()
+                yield row
+
+
+def parse_students_rows(rows: Iterable[List[str]]) -> List[Dict[str, Any]]:
+    """
+    Converts table rows (the first one is the header) to students data in the StudentsDataForm format.
+    Преобразует строки таблицы (первая - заголовок) в данные учеников в формате StudentsDataForm.
+
+    Values are validated column by column with the same rules as in StudentsDataForm,
+    all problems are collected and raised together in StudentsImportError.
+    Значения проверяются по колонкам по тем же правилам, что и в StudentsDataForm,
+    все проблемы собираются и выбрасываются вместе в StudentsImportError.
+    """
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        raise StudentsImportError(["Файл пуст"])
+
+    columns = _parse_header(header)
+    task_columns = sorted((key for key in columns if key.startswith("task_")), key=lambda key: int(key[5:]))
+    if not task_columns:
+        raise StudentsImportError(["В файле нет колонок с заданиями (task_1, Задание 1, ...)"])
+
+    table = {key: [] for key in columns}
+    for row in rows:
+        if not any(value.strip() for value in row):
+            continue
+        for key, index in columns.items():
+            table[key].append(row[index].strip() if index < len(row) else "")
+
+    students_count = len(table[task_columns[0]])
+    if not students_count:
+        raise StudentsImportError(["В файле нет учеников"])
+
+    errors = []
+    names = table.get(STUDENT_NAME_COLUMN) or [""] * students_count
+    presence = _parse_presence(table.get(IS_PRESENT_COLUMN), students_count, errors)
+    quarter_marks = _parse_numbers(table.get(THIRD_QUARTER_COLUMN) or [""] * students_count, presence,
+                                   QUARTER_MARKS, "Оценка за 3-ю четверть", "Укажите оценку", errors)
+    tasks = {key: _parse_numbers(table[key], presence, TASK_POINTS, f"Задание {key[5:]}", "Укажите балл", errors)
+             for key in task_columns}
+    if errors:
+        raise StudentsImportError(errors)
+
+    students_data = []
+    for i in range(students_count):
+        student = {
+            "student_name": names[i] or "Неизвестно",
+            "is_present": presence[i],
+            "third_quarter": quarter_marks[i],
+        }
+        for key in task_columns:
+            student[key] = tasks[key][i]
+        students_data.append(student)
+    return students_data
+
+
+def _parse_header(header: List[str]) -> Dict[str, int]:
+    columns = {}
+    for index, title in enumerate(header):
+        title = " ".join(title.strip().lower().split())
+        task_match = TASK_COLUMN_PATTERN.match(title)
+        key = f"task_{int(task_match.group(1))}" if task_match else column_aliases.get(title)
+        if key is not None and key not in columns:
+            columns[key] = index
+    return columns
+
+
+def _parse_presence(values: Optional[List[str]], students_count: int, errors: List[str]) -> List[bool]:
+    if values is None:
+        return [True] * students_count
+
+    presence = []
+    for row_number, value in enumerate(values, start=2):
+        value = value.lower()
+        if value not in TRUE_VALUES and value not in FALSE_VALUES:
+            errors.append(f"Строка {row_number}, присутствие на экзамене: недопустимое значение «{value}»")
+        presence.append(value in TRUE_VALUES)
+    return presence
+
+
+def _parse_numbers(values: List[str], presence: List[bool], allowed: range, column_title: str,
+                   missing_message: str, errors: List[str]) -> List[Optional[int]]:
+    numbers = []
+    for row_number, (value, is_present) in enumerate(zip(values, presence), start=2):
+        if value == "":
+            if is_present:
+                errors.append(f"Строка {row_number}, {column_title}: {missing_message}")
+            numbers.append(None)
+            continue
+        try:
+            number = float(value.replace(",", "."))
+        except ValueError:
+            number = None
+        if number is None or not number.is_integer():
+            errors.append(f"Строка {row_number}, {column_title}: введите целое число")
+            numbers.append(None)
+            continue
+        number = int(number)
+        if number not in allowed:
+            errors.append(f"Строка {row_number}, {column_title}: значение должно быть от {allowed.start} "
+                          f"до {allowed.stop - 1}")
+        numbers.append(number)
+    return numbers
+
+
+def _get_xlsx_first_sheet(archive: "zipfile.ZipFile") -> Optional[str]:
+    """
+    Returns the path of the first sheet in the order of xl/workbook.xml, which is not the order of file names
+    (sheet10.xml sorts before sheet2.xml). Without the workbook, the sheet with the smallest number is taken.
+    Возвращает путь первого листа в порядке xl/workbook.xml, который не совпадает с порядком имен файлов
+    (sheet10.xml сортируется раньше sheet2.xml). Без книги берется лист с наименьшим номером.
+    """
+    from xml.etree.ElementTree import fromstring
+
+    names = set(archive.namelist())
+    if {"xl/workbook.xml", "xl/_rels/workbook.xml.rels"} <= names:
+        sheet = fromstring(archive.read("xl/workbook.xml")).find(f"{XLSX_NAMESPACE}sheets/{XLSX_NAMESPACE}sheet")
+        if sheet is not None:
+            relation_id = sheet.get(f"{XLSX_RELATIONSHIP_NAMESPACE}id")
+            relations = fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+            for relation in relations.iter(f"{XLSX_PACKAGE_NAMESPACE}Relationship"):
+                if relation.get("Id") == relation_id:
+                    target = relation.get("Target", "")
+                    path = target[1:] if target.startswith("/") else posixpath.normpath(f"xl/{target}")
+                    if path in names:
+                        return path
+
+    sheets = []
+    for name in names:
+        match = XLSX_SHEET_PATTERN.match(name)
+        if match:
+            sheets.append((int(match.group(1) or 0), name))
+    return min(sheets)[1] if sheets else None
+
+
+def _read_xlsx_shared_strings(archive: "zipfile.ZipFile") -> List[str]:
+    from xml.etree.ElementTree import iterparse
+
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return []
+
+    shared_strings = []
+    with archive.open("xl/sharedStrings.xml") as strings:
+        for _, element in iterparse(strings):
+            if element.tag == f"{XLSX_NAMESPACE}si":
+                shared_strings.append("".join(text.text or "" for text in element.iter(f"{XLSX_NAMESPACE}t")))
+                element.clear()
+    return shared_strings
+
+
+def _xlsx_column_index(reference: str, default: int) -> int:
+    letters = "".join(char for char in reference if char.isalpha())
+    if not letters:
+        return default
+    index = 0
+    for char in letters.upper():
+        index = index * 26 + ord(char) - ord("A") + 1
+    return index - 1
+
+
+def _xlsx_cell_value(cell, shared_strings: List[str]) -> str:
+    cell_type = cell.get("t")
+    if cell_type == "inlineStr":
+        return "".join(text.text or "" for text in cell.iter(f"{XLSX_NAMESPACE}t"))
+
+    value = cell.find(f"{XLSX_NAMESPACE}v")
+    if value is None or value.text is None:
+        return ""
+    if cell_type == "s":
+        return shared_strings[int(value.text)]
+    if cell_type == "b":
+        return "1" if value.text == "1" else "0"
+    return value.text
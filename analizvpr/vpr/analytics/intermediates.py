@@ -0,0 +1,86 @@
+from typing import Dict, List
+
+from vpr.analytics.aggregates import ClassAggregates
+from vpr.analytics.base_metric import BaseIntermediate, MarkType
+from vpr.analytics.columns import ClassColumns
+from vpr.analytics.similarity import find_similar_pairs, MIN_SIMILARITY_TASKS, SimilarPair
+from vpr.analytics.student import Students
+
+
+class ColumnsIntermediate(BaseIntermediate):
+    """
+    Columnar view of the class.
+    Поколоночное представление класса.
+    """
+    name = "columns"
+
+    def calculate(self, students_data: Students) -> ClassColumns:
+        return students_data.columns
+
+
+class AggregatesIntermediate(BaseIntermediate):
+    """
+    Running aggregates of the class.
+    Накопительные агрегаты класса.
+    """
+    name = "aggregates"
+
+    def calculate(self, students_data: Students) -> ClassAggregates:
+        return students_data.aggregates
+
+
+class PresentCountIntermediate(BaseIntermediate):
+    """
+    Number of students present at the exam.
+    Количество присутствующих на экзамене учеников.
+    """
+    name = "present_count"
+    inputs = ("aggregates",)
+
+    def calculate(self, aggregates: ClassAggregates) -> int:
+        return aggregates.present_count
+
+
+class AverageMarksIntermediate(BaseIntermediate):
+    """
+    Unrounded average marks of present students for each mark type.
+    Неокругленные средние оценки присутствующих учеников для каждого типа оценки.
+    """
+    name = "average_marks"
+    inputs = ("aggregates", "present_count")
+
+    def calculate(self, aggregates: ClassAggregates, present_count: int) -> Dict[str, float]:
+        if not present_count:
+            return {mark_type.value: 0 for mark_type in MarkType}
+        return {mark_type.value: aggregates.marks_sum(mark_type.value) / present_count for mark_type in MarkType}
+
+
+class SimilarPairsIntermediate(BaseIntermediate):
+    """
+    Pairs of positions of present students with improbably coinciding task scores, see find_similar_pairs.
+    Works shorter than MIN_SIMILARITY_TASKS tasks are not checked, calculated only for the opt-in rule
+    similar_answers.
+    Пары позиций присутствующих учеников с маловероятно совпадающими баллами за задания, см. find_similar_pairs.
+    Работы короче MIN_SIMILARITY_TASKS заданий не проверяются, рассчитывается только для включаемого по запросу
+    правила similar_answers.
+    """
+    name = "similar_pairs"
+    inputs = ("columns",)
+
+    def calculate(self, columns: ClassColumns) -> List[SimilarPair]:
+        tasks_count = columns.tasks_count
+        if tasks_count < MIN_SIMILARITY_TASKS:
+            return []
+        positions = [position for position in range(columns.total_count) if columns.is_present(position)]
+        vectors = ((position, columns.task_scores[row * tasks_count:(row + 1) * tasks_count])
+                   for row, position in enumerate(positions))
+        return find_similar_pairs(vectors)
+
+
+default_intermediates = [
+    ColumnsIntermediate(),
+    AggregatesIntermediate(),
+    PresentCountIntermediate(),
+    AverageMarksIntermediate(),
+    SimilarPairsIntermediate(),
+]
@@ -0,0 +1,192 @@
+from collections import Counter
+from math import sqrt
+from typing import List, Dict, Any, Iterable, Optional, Union
+
+from vpr.analytics.columns import ClassColumns
+from vpr.analytics.records import StudentRecord, TaskSchema
+
+
+MAX_TASK_SCORE = 2
+
+
+class ItemAnalysis:
+    """
+    Item analysis of exam tasks: solve rate, partial credit rate, mean score and point-biserial discrimination
+    of every task against the total points.
+    Анализ заданий экзамена: доля решивших, доля получивших частичный балл, средний балл и точечно-бисериальная
+    дискриминативность каждого задания относительно суммы баллов.
+
+    Only integer counts and sums are kept, so the analysis of classes is merged exactly into the analysis
+    of a school or a whole wave, and the statistics are finalized from the merged sums.
+    Хранятся только целые количества и суммы, поэтому анализ классов точно объединяется в анализ школы
+    или всего проведения, а статистики вычисляются из объединенных сумм.
+    """
+
+    def __init__(self):
+        self.schema = TaskSchema()
+        self.present_count = 0
+        self.total_sum = 0
+        self.total_square_sum = 0
+        self.score_counts: List[Counter] = []
+        self.score_sums: List[int] = []
+        self.square_sums: List[int] = []
+        self.total_products: List[int] = []
+
+    @classmethod
+    def from_columns(cls, columns: ClassColumns) -> "ItemAnalysis":
+        """
+        Builds the analysis in one pass over the students × tasks score matrix of the class.
+        Строит анализ за один проход по матрице баллов ученики × задания класса.
+        """
+        analysis = cls()
+        analysis._set_schema(columns.schema)
+        analysis.present_count = columns.present_count
+        tasks_count = columns.tasks_count
+        scores = columns.task_scores
+        for row, total in enumerate(columns.exam_points):
+            analysis.total_sum += total
+            analysis.total_square_sum += total * total
+            for task_index, score in enumerate(scores[row * tasks_count:(row + 1) * tasks_count]):
+                analysis.score_counts[task_index][score] += 1
+                analysis.score_sums[task_index] += score
+                analysis.square_sums[task_index] += score * score
+                analysis.total_products[task_index] += score * total
+        return analysis
+
+    @classmethod
+    def combine(cls, partials: Iterable["ItemAnalysis"]) -> "ItemAnalysis":
+        analysis = cls()
+        for partial in partials:
+            analysis.merge(partial)
+        return analysis
+
+    def merge(self, other: "ItemAnalysis") -> "ItemAnalysis":
+        """
+        Adds the analysis of another group of students with the same tasks.
+        Добавляет анализ другой группы учеников с теми же заданиями.
+        """
+        if other.schema:
+            if not self.schema:
+                self._set_schema(other.schema)
+            elif self.schema.task_keys != other.schema.task_keys:
+                raise ValueError("Нельзя объединить результаты работ с разными заданиями")
+
+        self.present_count += other.present_count
+        self.total_sum += other.total_sum
+        self.total_square_sum += other.total_square_sum
+        for task_index in range(len(other.schema)):
+            self.score_counts[task_index].update(other.score_counts[task_index])
+            self.score_sums[task_index] += other.score_sums[task_index]
+            self.square_sums[task_index] += other.square_sums[task_index]
+            self.total_products[task_index] += other.total_products[task_index]
+        return self
+
+    def add_student(self, student: Union[Dict[str, Any], StudentRecord], sign: int = 1) -> None:
+        """
+        Applies (sign=1) or reverts (sign=-1) the scores of one student in O(tasks), absent students are skipped.
+        Применяет (sign=1) или отменяет (sign=-1) баллы одного ученика за O(заданий), отсутствующие пропускаются.
+        """
+        if student.get("is_present") is not True:
+            return
+        if not self.schema:
+            self._set_schema(student.schema if isinstance(student, StudentRecord) else TaskSchema.from_student(student))
+        student = StudentRecord.adapt(student, self.schema)
+
+        total = student.exam_points
+        self.present_count += sign
+        self.total_sum += sign * total
+        self.total_square_sum += sign * total * total
+        for task_index, score in enumerate(student.scores):
+            counter = self.score_counts[task_index]
+            counter[score] += sign
+            if counter[score] <= 0:
+                del counter[score]
+            self.score_sums[task_index] += sign * score
+            self.square_sums[task_index] += sign * score * score
+            self.total_products[task_index] += sign * score * total
+
+    def remove_student(self, student: Union[Dict[str, Any], StudentRecord]) -> None:
+        self.add_student(student, sign=-1)
+
+    def replace_student(self, old_student: Union[Dict[str, Any], StudentRecord],
+                        new_student: Union[Dict[str, Any], StudentRecord]) -> None:
+        """
+        Replaces the scores of one student, e.g. after a teacher has corrected a task score.
+        Заменяет баллы одного ученика, например, после исправления учителем балла за задание.
+        """
+        self.remove_student(old_student)
+        self.add_student(new_student)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "task_keys": list(self.schema.task_keys),
+            "present_count": self.present_count,
+            "total_sum": self.total_sum,
+            "total_square_sum": self.total_square_sum,
+            "score_counts": [dict(counter) for counter in self.score_counts],
+            "score_sums": list(self.score_sums),
+            "square_sums": list(self.square_sums),
+            "total_products": list(self.total_products),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ItemAnalysis":
+        """
+        Restores the analysis from to_dict, also after a JSON round trip that turned integer keys into strings.
+        Восстанавливает анализ из to_dict, в том числе после JSON, превратившего целые ключи в строки.
+        """
+        analysis = cls()
+        analysis.schema = TaskSchema(data["task_keys"])
+        analysis.present_count = data["present_count"]
+        analysis.total_sum = data["total_sum"]
+        analysis.total_square_sum = data["total_square_sum"]
+        analysis.score_counts = [Counter({int(score): count for score, count in counter.items()})
+                                 for counter in data["score_counts"]]
+        analysis.score_sums = list(data["score_sums"])
+        analysis.square_sums = list(data["square_sums"])
+        analysis.total_products = list(data["total_products"])
+        return analysis
+
+    def get_items(self) -> List[Dict[str, Any]]:
+        """
+        Returns the statistics of every task, rates are fractions of present students.
+        Возвращает статистики каждого задания, доли считаются от присутствующих учеников.
+        """
+        count = self.present_count
+        items = []
+        for task_index, task in enumerate(self.schema.task_keys):
+            counter = self.score_counts[task_index]
+            partial = sum(students for score, students in counter.items() if 0 < score < MAX_TASK_SCORE)
+            items.append({
+                "task": task,
+                "solve_rate": self._rate(count - counter[0], count),
+                "partial_rate": self._rate(partial, count),
+                "mean_score": round(self.score_sums[task_index] / count, 4) if count else None,
+                "discrimination": self._get_discrimination(task_index),
+            })
+        return items
+
+    def _get_discrimination(self, task_index: int) -> Optional[float]:
+        """
+        Pearson correlation of the task score with the total points, for 0/1 tasks it is the point-biserial one.
+        Корреляция Пирсона балла за задание с суммой баллов, для заданий 0/1 это точечно-бисериальная корреляция.
+        """
+        count = self.present_count
+        score_sum = self.score_sums[task_index]
+        score_variance = count * self.square_sums[task_index] - score_sum * score_sum
+        total_variance = count * self.total_square_sum - self.total_sum * self.total_sum
+        if score_variance <= 0 or total_variance <= 0:
+            return None
+        covariance = count * self.total_products[task_index] - score_sum * self.total_sum
+        return round(covariance / sqrt(score_variance * total_variance), 4)
+
+    def _set_schema(self, schema: TaskSchema) -> None:
+        self.schema = schema
+        self.score_counts = [Counter() for _ in range(len(schema))]
+        self.score_sums = [0] * len(schema)
+        self.square_sums = [0] * len(schema)
+        self.total_products = [0] * len(schema)
+
+    @staticmethod
+    def _rate(part: int, whole: int) -> Optional[float]:
+        return round(part / whole, 4) if whole else None
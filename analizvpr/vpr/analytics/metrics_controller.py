@@ -1,42 +1,87 @@
-from typing import Dict, Any, List
+from collections.abc import Mapping
+from typing import Dict, Any, List, Iterable, Iterator, Tuple
 
-from vpr.analytics.base_metric import BaseMetric
+from vpr.analytics.aggregates import ClassAggregates
+from vpr.analytics.base_metric import BaseMetric, BaseIntermediate
 from vpr.analytics.general_metrics import TotalStudentsMetric, CounterMarksThirdQuarterMetric, \
     StudentsPresentExamMetric, ListStudentsAndMarksMetric, CounterMarksExamMetric, QualityThirdQuarterMetric, \
     QualityExamMetric, SuccessThirdQuarterMetric, SuccessExamMetric, AverageMarkThirdQuarterMetric, \
     AverageMarkExamMetric, AverageSolvedExamTasks, ImproveMarkMetric, ReduceMarkMetric, PopularMistakes, \
     VerificationResults
+from vpr.analytics.intermediates import default_intermediates
+from vpr.analytics.profiling import measure, METRIC, INTERMEDIATE, STUDENTS
+from vpr.analytics.records import StudentRecord
 from vpr.analytics.student import Students
-from vpr.analytics.utils import translate_russian
-from vpr.analytics.verification_metrics import VerificationPresent, VerificationMarkThreshold, VerificationAverageMarks
+from vpr.analytics.utils import translate_russian, translate_keys, translation_dictionary
+from vpr.analytics.rules import RuleSet, MEASURES, get_rule_set
+
+
+# Inputs that need rows of single students and cannot be restored from merged aggregates
+# Входные данные, которым нужны строки отдельных учеников и которые нельзя восстановить из объединенных агрегатов
+ROW_INPUTS = {"students", "columns", "similar_pairs"}
 
 
 class MetricsController:
     """
     Class for calculating all general_metrics.
     Класс для расчета всех general_metrics.
+
+    Metrics and intermediate results form a dependency graph by their inputs and outputs,
+    every intermediate result is calculated at most once per report and only if a requested metric needs it.
+    Метрики и промежуточные результаты образуют граф зависимостей по своим inputs и outputs,
+    каждый промежуточный результат рассчитывается не более одного раза за отчет и только если он нужен
+    запрошенной метрике.
     """
-    def __init__(self, students_data: Students, metrics: List):
+    def __init__(self, students_data: Students, metrics: List, intermediates: List = None):
         self.students = students_data if isinstance(students_data, Students) else None
         self.metrics = [m for m in metrics if isinstance(m, BaseMetric)]
 
-    def calculate_metrics(self) -> Dict[str, Any]:
+        intermediates = default_intermediates if intermediates is None else intermediates
+        self.providers = {i.name: i for i in intermediates if isinstance(i, BaseIntermediate)}
+        for metric in self.metrics:
+            self.providers.update({name: metric for name in metric.outputs})
+        self.values = {"students": self.students}
+
+    def calculate_metrics(self, outputs: Iterable[str] = None) -> Dict[str, Any]:
         """
-        Generates calculation results for general_metrics.
-        Генерирует результаты расчетов general_metrics.
+        Generates calculation results for general_metrics, only for the names from outputs if they are given.
+        Генерирует результаты расчетов general_metrics, только для имен из outputs, если они указаны.
         """
+        requested = None if outputs is None else set(outputs)
         calculations = {}
         for metric in self.metrics:
-            calculations[metric.metric_name] = metric.calculate(self.students)
+            if requested is None or metric.metric_name in requested:
+                calculations[metric.metric_name] = self.resolve(metric.metric_name)
         return calculations
 
+    def resolve(self, name: str, resolving: Tuple[str, ...] = ()) -> Any:
+        """
+        Returns the value of a metric or an intermediate result, calculating its inputs first.
+        Возвращает значение метрики или промежуточного результата, предварительно рассчитав его inputs.
+        """
+        if name in self.values:
+            return self.values[name]
+        if name in resolving:
+            raise ValueError(f"Циклическая зависимость метрик: {' -> '.join(resolving + (name,))}")
+
+        provider = self.providers.get(name)
+        if provider is None:
+            raise KeyError(f"Неизвестные входные данные метрики: {name}")
 
-@translate_russian
-def get_report(data) -> Dict[str, Any]:
-    students_data = data.get("students_data")
-    mark_threshold = data.get('mark_3')
+        inputs = [self.resolve(input_name, resolving + (name,)) for input_name in provider.inputs]
+        with measure(METRIC if isinstance(provider, BaseMetric) else INTERMEDIATE, name):
+            self.values[name] = provider.calculate(*inputs)
+        return self.values[name]
 
-    metrics = [
+
+def get_metrics(mark_threshold: int = None, rules: RuleSet = None) -> List[BaseMetric]:
+    """
+    Returns all metrics of the report in the order they are shown, results are verified by rules
+    (the default rule set if not given).
+    Возвращает все метрики отчета в порядке их вывода, результаты проверяются правилами rules
+    (набором по умолчанию, если он не задан).
+    """
+    return [
         TotalStudentsMetric(),
         StudentsPresentExamMetric(),
         ListStudentsAndMarksMetric(),
@@ -52,13 +97,128 @@ def get_report(data) -> Dict[str, Any]:
         ImproveMarkMetric(),
         ReduceMarkMetric(),
         PopularMistakes(),
-        VerificationResults(
-            [VerificationPresent(),
-             VerificationAverageMarks(),
-             VerificationMarkThreshold(mark_threshold=mark_threshold)
-             ]),
+        VerificationResults([], rules=get_rule_set(rules), mark_threshold=mark_threshold),
     ]
 
-    students = Students(students_data)
-    mc = MetricsController(students_data=students, metrics=metrics)
-    return mc.calculate_metrics()
+
+class LazyReport(Mapping):
+    """
+    Report of a class whose metrics are calculated on first access and memoized, keys are English metric names.
+    Only the intermediate results needed by the accessed metrics are calculated.
+    Отчет класса, метрики которого рассчитываются при первом обращении и запоминаются, ключи - английские
+    названия метрик. Рассчитываются только промежуточные результаты, нужные запрошенным метрикам.
+    """
+
+    def __init__(self, data, aggregates: ClassAggregates = None):
+        self.students_data = data.get("students_data")
+        self.aggregates = aggregates
+        self.metrics = get_metrics(data.get('mark_3'), get_rule_set(data.get('verification_rules')))
+        self.metric_names = tuple(metric.metric_name for metric in self.metrics)
+        self._controller = None
+
+    @property
+    def controller(self) -> MetricsController:
+        if self._controller is None:
+            with measure(STUDENTS, "construction"):
+                students = Students(self.students_data, aggregates=self.aggregates)
+            self._controller = MetricsController(students_data=students, metrics=self.metrics)
+        return self._controller
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self.metric_names:
+            raise KeyError(name)
+        return self.controller.resolve(name)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.metric_names)
+
+    def __len__(self) -> int:
+        return len(self.metric_names)
+
+    def __contains__(self, name) -> bool:
+        return name in self.metric_names
+
+    def subset(self, names: Iterable[str]) -> Dict[str, Any]:
+        """
+        Returns only the named metrics, raises KeyError for an unknown name.
+        Возвращает только указанные метрики, для неизвестного названия выбрасывает KeyError.
+        """
+        return {name: self[name] for name in names}
+
+
+def calculate_report(data, aggregates: ClassAggregates = None, metrics: Iterable[str] = None) -> Dict[str, Any]:
+    """
+    Calculates the report of a class with stable English metric keys, e.g. for JSON export.
+    Precalculated aggregates of the class can be passed in aggregates, names in metrics limit the report to them.
+    Рассчитывает отчет класса со стабильными английскими ключами метрик, например, для выгрузки в JSON.
+    В aggregates можно передать заранее рассчитанные агрегаты класса, названия в metrics ограничивают ими отчет.
+    """
+    report = LazyReport(data, aggregates=aggregates)
+    return report.subset(metrics) if metrics is not None else dict(report)
+
+
+@translate_russian
+def get_report(data, aggregates: ClassAggregates = None) -> Dict[str, Any]:
+    """
+    Calculates the report of a class with Russian metric names for the results page.
+    Рассчитывает отчет класса с русскими названиями метрик для страницы результатов.
+    """
+    return calculate_report(data, aggregates=aggregates)
+
+
+def get_report_and_aggregates(data) -> Tuple[Dict[str, Any], ClassAggregates]:
+    """
+    Calculates the report of a class with Russian metric names and returns it with the aggregates of the class,
+    which allow update_report to recalculate it after a student is corrected.
+    Рассчитывает отчет класса с русскими названиями метрик и возвращает его вместе с агрегатами класса,
+    которые позволяют update_report пересчитать его после исправления ученика.
+    """
+    report = LazyReport(data)
+    return translate_keys(dict(report)), report.controller.resolve("aggregates")
+
+
+def update_report(report: Dict[str, Any], data, aggregates: ClassAggregates, index: int) -> Dict[str, Any]:
+    """
+    Updates the report of get_report after the student with the index in data has been replaced in it
+    and in aggregates: the row of the student is replaced in the list of students and only metrics of aggregates
+    are recalculated, without a pass over the class. Enabled rules that need rows of students are checked
+    by the full recalculation.
+    Обновляет отчет get_report после замены ученика с индексом index в data и в aggregates: строка ученика
+    заменяется в списке учеников, и пересчитываются только метрики агрегатов, без прохода по классу.
+    Включенные правила, которым нужны строки учеников, проверяются полным пересчетом.
+    """
+    rules = get_rule_set(data.get("verification_rules"))
+    if rules.inputs:
+        return get_report(data, aggregates=aggregates)
+
+    student = StudentRecord.adapt(data["students_data"][index], aggregates.schema)
+    list_key = translation_dictionary["list_students_and_marks"]
+    report = dict(report)
+    report[list_key] = list(report[list_key])
+    report[list_key][index] = ListStudentsAndMarksMetric.get_student_row(student)
+    report.update(translate_keys(calculate_aggregates_report(aggregates, data.get("mark_3"), rules=rules)))
+    return report
+
+
+def calculate_aggregates_report(aggregates: ClassAggregates, mark_threshold: int = None,
+                                metrics: Iterable[str] = None, rules: RuleSet = None) -> Dict[str, Any]:
+    """
+    Finalizes the report with English metric keys from aggregates, e.g. merged aggregates of a school or a region.
+    Metrics that need rows of single students, such as the list of students, are skipped,
+    names in metrics limit the report to them.
+    Формирует отчет с английскими ключами метрик из агрегатов, например, объединенных агрегатов школы или региона.
+    Метрики, которым нужны строки отдельных учеников, такие как список учеников, пропускаются,
+    названия в metrics ограничивают ими отчет.
+    """
+    aggregate_metrics = []
+    for metric in get_metrics(mark_threshold, rules):
+        if isinstance(metric, VerificationResults):
+            rules = metric.rules.only(MEASURES) if metric.rules.inputs else metric.rules
+            metric = VerificationResults([verification for verification in metric.verifications
+                                          if not ROW_INPUTS & set(verification.inputs)],
+                                         rules=rules, mark_threshold=metric.mark_threshold)
+        if not ROW_INPUTS & set(metric.inputs):
+            aggregate_metrics.append(metric)
+    mc = MetricsController(students_data=None, metrics=aggregate_metrics)
+    mc.values["aggregates"] = aggregates
+    return mc.calculate_metrics(outputs=metrics)
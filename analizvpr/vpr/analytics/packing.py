@@ -0,0 +1,61 @@
+import base64
+import json
+import zlib
+from typing import Dict, Any, List, Optional, Union
+
+
+PACKED_FORMAT = 1
+COMPRESS_MIN_SIZE = 1024
+
+
+def pack_students_data(students_data: List[Dict[str, Any]], compress: bool = True) -> Dict[str, Any]:
+    """
+    Packs students data into a compact JSON compatible dict: a header of key schemas and a row of values
+    per student, so keys like student_name and task_1..task_30 are stored once instead of in every student.
+    Упаковывает данные учеников в компактный словарь, совместимый с JSON: заголовок схем ключей и строка
+    значений на ученика, поэтому ключи вроде student_name и task_1..task_30 хранятся один раз, а не у каждого ученика.
+
+    Students with different keys (e.g. absent ones without exam_mark and task scores) get their own schema,
+    so packing keeps every value and the order of keys. With compress, packed data of at least
+    COMPRESS_MIN_SIZE characters is compressed with zlib into one base64 string.
+    Ученики с разными ключами (например, отсутствующие без exam_mark и баллов) получают свою схему,
+    поэтому упаковка сохраняет все значения и порядок ключей. С compress упакованные данные размером не менее
+    COMPRESS_MIN_SIZE символов сжимаются zlib в одну строку base64.
+    """
+    schemas: Dict[tuple, int] = {}
+    rows = []
+    for student in students_data:
+        schema_index = schemas.setdefault(tuple(student), len(schemas))
+        rows.append([schema_index, *student.values()])
+    schemas_list = [list(keys) for keys in schemas]
+
+    if compress:
+        dump = json.dumps([schemas_list, rows], ensure_ascii=False, separators=(",", ":"))
+        if len(dump) >= COMPRESS_MIN_SIZE:
+            compressed = base64.b64encode(zlib.compress(dump.encode("utf-8"))).decode("ascii")
+            return {"format": PACKED_FORMAT, "compressed": compressed}
+    return {"format": PACKED_FORMAT, "schemas": schemas_list, "rows": rows}
+
+
+def unpack_students_data(value: Union[Dict[str, Any], List[Dict[str, Any]], None]
+                         ) -> Optional[List[Dict[str, Any]]]:
+    """
+    Restores students data from pack_students_data. Lists of student dicts, e.g. from old sessions,
+    and None are returned as they are.
+    Восстанавливает данные учеников из pack_students_data. Списки словарей учеников, например, из старых сессий,
+    и None возвращаются как есть.
+    """
+    if not is_packed(value):
+        return value
+    if value["format"] != PACKED_FORMAT:
+        raise ValueError(f"Неизвестный формат упакованных данных учеников: {value['format']}")
+
+    if "compressed" in value:
+        schemas, rows = json.loads(zlib.decompress(base64.b64decode(value["compressed"])).decode("utf-8"))
+    else:
+        schemas, rows = value["schemas"], value["rows"]
+    return [dict(zip(schemas[row[0]], row[1:])) for row in rows]
+
+
+def is_packed(value: Any) -> bool:
+    return isinstance(value, dict) and "format" in value
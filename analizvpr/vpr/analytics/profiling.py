@@ -0,0 +1,215 @@
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Tuple
+
+
+STUDENTS = "students"
+METRIC = "metric"
+INTERMEDIATE = "intermediate"
+VERIFICATION = "verification"
+
+
+class Timing:
+    """
+    Accumulated cost of one step of the report: calls, wall time and memory measured with tracemalloc.
+    peak_bytes is the largest rise of traced memory above its level at the start of a call, so it counts
+    temporary allocations freed inside the step, retained_bytes is the memory the calls left allocated.
+    Накопленная стоимость одного шага отчета: вызовы, время выполнения и память, измеренная tracemalloc.
+    peak_bytes - наибольший подъем отслеживаемой памяти над ее уровнем в начале вызова, поэтому он учитывает
+    временные выделения, освобожденные внутри шага, retained_bytes - память, оставшаяся выделенной после вызовов.
+    """
+    __slots__ = ("calls", "seconds", "retained_bytes", "peak_bytes")
+
+    def __init__(self, calls: int = 0, seconds: float = 0.0, retained_bytes: int = 0, peak_bytes: int = 0):
+        self.calls = calls
+        self.seconds = seconds
+        self.retained_bytes = retained_bytes
+        self.peak_bytes = peak_bytes
+
+    def add(self, other: "Timing") -> None:
+        self.calls += other.calls
+        self.seconds += other.seconds
+        self.retained_bytes += other.retained_bytes
+        self.peak_bytes = max(self.peak_bytes, other.peak_bytes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"calls": self.calls, "ms": round(self.seconds * 1000, 3), "retained_bytes": self.retained_bytes,
+                "peak_bytes": self.peak_bytes}
+
+
+class ReportProfiler:
+    """
+    Collects timings of metrics, intermediate results, verifications and Students construction
+    while it is active, e.g. during one request.
+    Собирает замеры метрик, промежуточных результатов, проверок и создания Students,
+    пока он активен, например, в течение одного запроса.
+
+    Memory is measured with tracemalloc only if trace_memory is set, as tracing slows Python down.
+    Память измеряется с помощью tracemalloc, только если задан trace_memory, так как трассировка
+    замедляет Python.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.timings: Dict[Tuple[str, str], Timing] = {}
+        self._started_tracing = False
+        self._token = None
+        # peaks of traced memory of the open measured blocks, as a nested block resets the tracemalloc peak
+        # пики отслеживаемой памяти открытых замеряемых блоков, так как вложенный блок сбрасывает пик tracemalloc
+        self._peaks: List[int] = []
+
+    def __enter__(self) -> "ReportProfiler":
+        self.start()
+        self._token = _active_profiler.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _active_profiler.reset(self._token)
+        self.finish()
+
+    def start(self) -> None:
+        if self.trace_memory and not _tracemalloc().is_tracing():
+            _tracemalloc().start()
+            self._started_tracing = True
+
+    def finish(self) -> None:
+        """
+        Stops memory tracing started by the profiler and adds its timings to the registry.
+        Останавливает отслеживание памяти, начатое профилировщиком, и добавляет его замеры в реестр.
+        """
+        if self._started_tracing:
+            _tracemalloc().stop()
+            self._started_tracing = False
+        registry.add(self)
+
+    @contextmanager
+    def activate(self):
+        """
+        Makes the started profiler active for the block without finishing it, e.g. for every chunk
+        of a streamed response, which may be produced in another context than the view.
+        Делает начатый профилировщик активным на время блока, не завершая его, например, для каждой части
+        потокового ответа, которая может создаваться в другом контексте, чем представление.
+        """
+        token = _active_profiler.set(self)
+        try:
+            yield self
+        finally:
+            _active_profiler.reset(token)
+
+    @contextmanager
+    def measure(self, kind: str, name: str):
+        trace_memory = self.trace_memory and _tracemalloc().is_tracing()
+        memory_before = 0
+        if trace_memory:
+            memory_before, peak_before = _tracemalloc().get_traced_memory()
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], peak_before)
+            _tracemalloc().reset_peak()
+            self._peaks.append(memory_before)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            retained = peak = 0
+            if trace_memory:
+                memory_after, peak_after = _tracemalloc().get_traced_memory()
+                peak_memory = max(self._peaks.pop(), peak_after)
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak_memory)
+                retained = max(memory_after - memory_before, 0)
+                peak = peak_memory - memory_before
+            self.timings.setdefault((kind, name), Timing()).add(Timing(1, seconds, retained, peak))
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """
+        Returns timings as a list of dicts for a structured log entry.
+        Возвращает замеры списком словарей для структурированной записи в лог.
+        """
+        return [{"kind": kind, "name": name, **timing.to_dict()} for (kind, name), timing in self.timings.items()]
+
+    def server_timing(self) -> str:
+        """
+        Returns timings in the format of the Server-Timing response header, they are shown by browser dev tools.
+        Возвращает замеры в формате заголовка ответа Server-Timing, их показывают инструменты разработчика браузера.
+        """
+        return ", ".join(f"{kind}-{name};dur={timing.seconds * 1000:.3f}"
+                         for (kind, name), timing in self.timings.items())
+
+
+class ProfilingRegistry:
+    """
+    Timings of all profiled reports of the process, exported in the Prometheus text format.
+    Замеры всех профилированных отчетов процесса, выгружаемые в текстовом формате Prometheus.
+    """
+
+    def __init__(self):
+        self.timings: Dict[Tuple[str, str], Timing] = {}
+        self.reports = 0
+        self._lock = threading.Lock()
+
+    def add(self, profiler: ReportProfiler) -> None:
+        if not profiler.timings:
+            return
+        with self._lock:
+            self.reports += 1
+            for key, timing in profiler.timings.items():
+                self.timings.setdefault(key, Timing()).add(timing)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.timings.clear()
+            self.reports = 0
+
+    def to_prometheus(self) -> str:
+        """
+        Returns accumulated timings as counters in the Prometheus text exposition format.
+        Возвращает накопленные замеры как счетчики в текстовом формате Prometheus.
+        """
+        with self._lock:
+            timings = sorted(self.timings.items())
+            reports = self.reports
+
+        lines = [
+            "# HELP vpr_profiled_reports_total Number of profiled reports.",
+            "# TYPE vpr_profiled_reports_total counter",
+            f"vpr_profiled_reports_total {reports}",
+        ]
+        for metric, field, help_text in (
+                ("vpr_report_step_calls_total", "calls", "Number of calls of a report step."),
+                ("vpr_report_step_seconds_total", "seconds", "Wall time spent in a report step."),
+                ("vpr_report_step_retained_bytes_total", "retained_bytes",
+                 "Memory left allocated by a report step, measured with tracemalloc."),
+                ("vpr_report_step_peak_bytes", "peak_bytes",
+                 "Largest rise of memory during a report step, measured with tracemalloc.")):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {'gauge' if field == 'peak_bytes' else 'counter'}")
+            for (kind, name), timing in timings:
+                lines.append(f'{metric}{{kind="{kind}",name="{name}"}} {getattr(timing, field)}')
+        return "\n".join(lines) + "\n"
+
+
+def measure(kind: str, name: str):
+    """
+    Measures the block with the active profiler, does nothing if profiling is not active.
+    Замеряет блок активным профилировщиком, ничего не делает, если профилирование не активно.
+    """
+    profiler = _active_profiler.get()
+    return profiler.measure(kind, name) if profiler is not None else nullcontext()
+
+
+def get_active_profiler() -> Optional[ReportProfiler]:
+    return _active_profiler.get()
+
+
+def _tracemalloc():
+    # tracemalloc is imported only when memory is traced, importing it slows down the start of the analytics CLI
+    # tracemalloc импортируется только при отслеживании памяти, его импорт замедляет запуск CLI аналитики
+    import tracemalloc
+    return tracemalloc
+
+
+_active_profiler: ContextVar[Optional[ReportProfiler]] = ContextVar("vpr_report_profiler", default=None)
+registry = ProfilingRegistry()
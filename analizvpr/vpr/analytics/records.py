@@ -0,0 +1,132 @@
+from array import array
+from typing import Dict, Any, Iterable, Tuple, Union
+
+
+TASK_PREFIX = "task_"
+RECORD_FIELDS = ("student_name", "is_present", "third_quarter", "exam_mark")
+# Points for one task, shared by the input form and the file import
+# Баллы за одно задание, общие для формы ввода и импорта из файла
+TASK_MIN_POINTS = 0
+TASK_MAX_POINTS = 2
+
+
+class TaskSchema:
+    """
+    Names of exam tasks, one object is shared by all student records of a class.
+    Названия заданий экзамена, один объект общий для всех записей учеников класса.
+    """
+    __slots__ = ("task_keys", "task_indexes")
+
+    def __init__(self, task_keys: Iterable[str] = ()):
+        self.task_keys: Tuple[str, ...] = tuple(task_keys)
+        self.task_indexes: Dict[str, int] = {task: index for index, task in enumerate(self.task_keys)}
+
+    def __len__(self) -> int:
+        return len(self.task_keys)
+
+    def __getstate__(self):
+        return self.task_keys
+
+    def __setstate__(self, task_keys):
+        self.__init__(task_keys)
+
+    def scores(self, student: Dict[str, Any]) -> array:
+        """
+        Returns task scores of a student dict in the order of the schema, missing and empty scores are 0.
+        Возвращает баллы за задания из словаря ученика в порядке схемы, отсутствующие и пустые баллы равны 0.
+        """
+        return array("h", (_to_int(student.get(task)) for task in self.task_keys))
+
+    @classmethod
+    def from_student(cls, student: Dict[str, Any]) -> "TaskSchema":
+        return cls(task for task in student if task.startswith(TASK_PREFIX))
+
+    @classmethod
+    def from_students(cls, students_data: Iterable[Union[Dict[str, Any], "StudentRecord"]]) -> "TaskSchema":
+        """
+        Returns the schema of the first present student, as the metrics did with get_task_keys.
+        Возвращает схему первого присутствующего ученика, как метрики делали с помощью get_task_keys.
+        """
+        for student in students_data:
+            if isinstance(student, StudentRecord):
+                if student.is_present is True:
+                    return student.schema
+            elif student.get("is_present") is True:
+                return cls.from_student(student)
+        return cls()
+
+
+class StudentRecord:
+    """
+    Compact record of one student with task scores in a fixed-width array ordered by the task schema.
+    Компактная запись одного ученика с баллами за задания в массиве фиксированной ширины в порядке схемы заданий.
+
+    get and __getitem__ keep compatibility with the normalized student dict.
+    get и __getitem__ сохраняют совместимость с нормализованным словарем ученика.
+    """
+    __slots__ = ("student_name", "is_present", "third_quarter", "exam_mark", "scores", "schema")
+
+    def __init__(self, student_name: Any = "Неизвестный", is_present: Any = False, third_quarter: Any = "-",
+                 exam_mark: Any = "-", scores: array = None, schema: TaskSchema = None):
+        self.student_name = student_name
+        self.is_present = is_present
+        self.third_quarter = third_quarter
+        self.exam_mark = exam_mark
+        self.scores = scores if scores is not None else array("h")
+        self.schema = schema if schema is not None else TaskSchema()
+
+    @classmethod
+    def from_dict(cls, student: Dict[str, Any], schema: TaskSchema) -> "StudentRecord":
+        """
+        Builds a record from a student dict with the same defaults as normalize_student_data.
+        Строит запись из словаря ученика с теми же значениями по умолчанию, что и normalize_student_data.
+        """
+        is_present = student.get("is_present", False)
+        return cls(
+            student_name=student.get("student_name", "Неизвестный"),
+            is_present=is_present,
+            third_quarter=student.get("third_quarter", "-"),
+            exam_mark=student.get("exam_mark", "-"),
+            scores=schema.scores(student) if is_present is True else None,
+            schema=schema,
+        )
+
+    @classmethod
+    def adapt(cls, student: Union[Dict[str, Any], "StudentRecord"], schema: TaskSchema) -> "StudentRecord":
+        """
+        Returns the record itself or converts an old-style student dict to a record.
+        Возвращает саму запись или преобразует словарь ученика старого формата в запись.
+        """
+        return student if isinstance(student, StudentRecord) else cls.from_dict(student, schema)
+
+    @property
+    def exam_points(self) -> int:
+        return sum(self.scores)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in RECORD_FIELDS:
+            return getattr(self, key)
+        index = self.schema.task_indexes.get(key)
+        if index is None or index >= len(self.scores):
+            return default
+        return self.scores[index]
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, self)
+        if value is self:
+            raise KeyError(key)
+        return value
+
+    def to_dict(self) -> Dict[str, Any]:
+        student = {
+            "student_name": self.student_name,
+            "is_present": self.is_present,
+            "third_quarter": self.third_quarter,
+            "exam_mark": self.exam_mark,
+        }
+        student.update(zip(self.schema.task_keys, self.scores))
+        return student
+
+
+def _to_int(value: Any) -> int:
+    return value if isinstance(value, int) else 0
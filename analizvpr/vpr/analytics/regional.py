@@ -0,0 +1,64 @@
+from typing import Dict, Any, Iterable, List, NamedTuple, Tuple
+
+from vpr.analytics.aggregates import ClassAggregates
+from vpr.analytics.batch import map_unordered
+from vpr.analytics.metrics_controller import calculate_aggregates_report
+from vpr.analytics.student import Students
+
+
+class RegionAggregates(NamedTuple):
+    """
+    Aggregates of every school of a region and of the whole region.
+    Агрегаты каждой школы региона и всего региона.
+    """
+    schools: List[ClassAggregates]
+    region: ClassAggregates
+
+
+def get_class_aggregates(data: Dict[str, Any]) -> ClassAggregates:
+    """
+    Returns the mergeable aggregates of one class.
+    Возвращает объединяемые агрегаты одного класса.
+    """
+    return Students(data.get("students_data") or []).aggregates
+
+
+def aggregate_region(schools: Iterable[Iterable[Dict[str, Any]]], max_workers: int = None) -> RegionAggregates:
+    """
+    Builds aggregates hierarchically: class -> school -> region.
+    Строит агрегаты иерархически: класс -> школа -> регион.
+
+    Classes of all schools are aggregated in one process pool and merged into their school as soon as they
+    are finished, so students of the region are never held in memory at once.
+    Классы всех школ агрегируются в одном пуле процессов и объединяются в агрегаты своей школы сразу по
+    готовности, поэтому ученики региона никогда не хранятся в памяти одновременно.
+    """
+    school_aggregates: List[ClassAggregates] = []
+
+    def arguments():
+        for school_index, classes in enumerate(schools):
+            school_aggregates.append(ClassAggregates())
+            for data in classes:
+                yield school_index, data
+
+    for school_index, aggregates in map_unordered(_aggregate_class, arguments(), max_workers=max_workers):
+        school_aggregates[school_index].merge(aggregates)
+
+    return RegionAggregates(schools=school_aggregates, region=ClassAggregates.combine(school_aggregates))
+
+
+def get_region_reports(schools: Iterable[Iterable[Dict[str, Any]]], mark_threshold: int = None,
+                       max_workers: int = None) -> Dict[str, Any]:
+    """
+    Returns reports with English metric keys for every school of a region and for the whole region.
+    Возвращает отчеты с английскими ключами метрик для каждой школы региона и для всего региона.
+    """
+    aggregates = aggregate_region(schools, max_workers=max_workers)
+    return {
+        "schools": [calculate_aggregates_report(school, mark_threshold) for school in aggregates.schools],
+        "region": calculate_aggregates_report(aggregates.region, mark_threshold),
+    }
+
+
+def _aggregate_class(school_index: int, data: Dict[str, Any]) -> Tuple[int, ClassAggregates]:
+    return school_index, get_class_aggregates(data)
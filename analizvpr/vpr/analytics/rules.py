@@ -0,0 +1,198 @@
+import operator
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple, Union
+
+from vpr.analytics.aggregates import ClassAggregates
+from vpr.analytics.similarity import SimilarPair
+from vpr.analytics.utils import get_percentage, get_rules_digest
+
+
+def _present_percentage(aggregates: ClassAggregates, mark_threshold: Optional[int]) -> float:
+    return get_percentage(aggregates.present_count, aggregates.total_count)
+
+
+def _absent_percentage(aggregates: ClassAggregates, mark_threshold: Optional[int]) -> float:
+    return get_percentage(aggregates.total_count - aggregates.present_count, aggregates.total_count)
+
+
+def _average_marks_difference(aggregates: ClassAggregates, mark_threshold: Optional[int]) -> float:
+    present_count = aggregates.present_count
+    if not present_count:
+        return 0
+    exam_average = aggregates.marks_sum("exam_mark") / present_count
+    quarter_average = aggregates.marks_sum("third_quarter") / present_count
+    return abs(exam_average - quarter_average)
+
+
+def _mark_threshold_percentage(aggregates: ClassAggregates, mark_threshold: Optional[int]) -> Optional[float]:
+    if not mark_threshold or not isinstance(mark_threshold, int):
+        return None
+    return get_percentage(aggregates.exam_points[mark_threshold], aggregates.present_count)
+
+
+def _reduced_percentage(aggregates: ClassAggregates, mark_threshold: Optional[int]) -> float:
+    return get_percentage(aggregates.reduced, aggregates.present_count)
+
+
+def _improved_percentage(aggregates: ClassAggregates, mark_threshold: Optional[int]) -> float:
+    return get_percentage(aggregates.improved, aggregates.present_count)
+
+
+# Measured values of a class that rules can check, all of them are read from the aggregates in O(1)
+# Измеряемые значения класса, которые могут проверять правила, все они читаются из агрегатов за O(1)
+MEASURES: Dict[str, Callable[[ClassAggregates, Optional[int]], Optional[float]]] = {
+    "present_percentage": _present_percentage,
+    "absent_percentage": _absent_percentage,
+    "average_marks_difference": _average_marks_difference,
+    "mark_threshold_percentage": _mark_threshold_percentage,
+    "reduced_percentage": _reduced_percentage,
+    "improved_percentage": _improved_percentage,
+}
+
+
+def _similar_pairs_count(similar_pairs: List[SimilarPair]) -> int:
+    return len(similar_pairs)
+
+
+# Measured values that need rows of single students: the name of the intermediate result they are measured from
+# and the measure function, they can not be measured from stored or merged aggregates
+# Измеряемые значения, которым нужны строки отдельных учеников: название промежуточного результата, по которому
+# они измеряются, и функция измерения, их нельзя измерить по сохраненным или объединенным агрегатам
+ROW_MEASURES: Dict[str, Tuple[str, Callable[[Any], Optional[float]]]] = {
+    "similar_pairs_count": ("similar_pairs", _similar_pairs_count),
+}
+
+OPERATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+
+DEFAULT_VERIFICATION_RULES = (
+    {"name": "present", "measure": "absent_percentage", "operator": ">", "threshold": 25,
+     "message": "кол-во неявившихся учеников > {threshold}%"},
+    {"name": "average_marks", "measure": "average_marks_difference", "operator": ">=", "threshold": 0.5,
+     "message": "отличие средних баллов и предыдущей четверти >= {threshold} баллов"},
+    {"name": "mark_threshold", "measure": "mark_threshold_percentage", "operator": ">=", "threshold": 25,
+     "message": "на нижней границе 3-ки >= {threshold}% учеников"},
+    # opt-in, enabled with {"name": "similar_answers", "enabled": True}, see find_similar_pairs
+    # включается по запросу с помощью {"name": "similar_answers", "enabled": True}, см. find_similar_pairs
+    {"name": "similar_answers", "measure": "similar_pairs_count", "operator": ">", "threshold": 0, "enabled": False,
+     "message": "есть ученики с маловероятно совпадающими баллами за задания"},
+)
+
+
+class RuleSet:
+    """
+    Verification rules compiled from a declarative config: a rule fires, i.e. the result is doubtful,
+    when its measured value compared by its operator with its threshold is true.
+    Правила проверки, скомпилированные из декларативной конфигурации: правило срабатывает, то есть результат
+    сомнителен, когда его измеренное значение, сравненное его оператором с его порогом, истинно.
+
+    Compilation resolves measures and operators once, every measure used by several rules is calculated once,
+    so evaluation of a class is a single pass over the compiled checks.
+    Компиляция один раз находит измерения и операторы, измерение, используемое несколькими правилами,
+    рассчитывается один раз, поэтому проверка класса - один проход по скомпилированным проверкам.
+    """
+
+    def __init__(self, rules: Iterable[Dict[str, Any]] = DEFAULT_VERIFICATION_RULES):
+        self.rules = [dict(rule) for rule in rules if rule.get("enabled", True)]
+        measure_names: Dict[str, int] = {}
+        checks = []
+        for rule in self.rules:
+            name = rule.get("name") or rule.get("measure")
+            if rule.get("measure") not in MEASURES and rule.get("measure") not in ROW_MEASURES:
+                raise ValueError(f"Неизвестное измерение в правиле {name}: {rule.get('measure')}")
+            if rule.get("operator") not in OPERATORS:
+                raise ValueError(f"Неизвестный оператор в правиле {name}: {rule.get('operator')}")
+            if not isinstance(rule.get("threshold"), (int, float)):
+                raise ValueError(f"Порог правила {name} должен быть числом")
+
+            measure_index = measure_names.setdefault(rule["measure"], len(measure_names))
+            message = rule.get("message", f"{rule['measure']} {rule['operator']} {{threshold}}")
+            checks.append((name, rule["measure"], measure_index, OPERATORS[rule["operator"]], rule["threshold"],
+                           message.format(threshold=rule["threshold"])))
+        # (measure function, name of its row input or None for measures of the aggregates)
+        # (функция измерения, название ее строковых входных данных или None для измерений агрегатов)
+        self._measures: Tuple[Tuple[Callable, Optional[str]], ...] = tuple(
+            (MEASURES[name], None) if name in MEASURES else (ROW_MEASURES[name][1], ROW_MEASURES[name][0])
+            for name in measure_names)
+        self._checks = tuple(checks)
+        self.inputs: Tuple[str, ...] = tuple(dict.fromkeys(
+            input_name for _, input_name in self._measures if input_name is not None))
+
+    @classmethod
+    def from_config(cls, *overrides: Optional[Iterable[Dict[str, Any]]]) -> "RuleSet":
+        """
+        Builds the rule set from the default rules updated by override lists, applied in order:
+        a rule with the name of an existing rule updates it, e.g. {"name": "present", "threshold": 30},
+        {"enabled": False} turns it off, rules with new names are added.
+        Строит набор правил из правил по умолчанию, обновленных списками переопределений, применяемыми по порядку:
+        правило с именем существующего правила обновляет его, например, {"name": "present", "threshold": 30},
+        {"enabled": False} отключает его, правила с новыми именами добавляются.
+        """
+        rules = {rule["name"]: dict(rule) for rule in DEFAULT_VERIFICATION_RULES}
+        for override in overrides:
+            for rule in override or ():
+                rules.setdefault(rule.get("name") or rule.get("measure"), {}).update(rule)
+        return cls(rules.values())
+
+    def only(self, measures: Iterable[str]) -> "RuleSet":
+        """
+        Returns the rule set with only the rules of the named measures.
+        Возвращает набор только с правилами указанных измерений.
+        """
+        measures = set(measures)
+        return RuleSet(rule for rule in self.rules if rule["measure"] in measures)
+
+    def evaluate(self, aggregates: ClassAggregates, mark_threshold: int = None,
+                 inputs: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """
+        Returns the fired rules with their measured values, rules whose value can not be measured do not fire.
+        Row measures are measured from inputs by the names in self.inputs, without them their rules do not fire.
+        Возвращает сработавшие правила с их измеренными значениями, правила, значение которых не измерить,
+        не срабатывают. Строковые измерения измеряются по inputs по названиям из self.inputs, без них
+        их правила не срабатывают.
+        """
+        inputs = inputs or {}
+        values = [measure(aggregates, mark_threshold) if input_name is None
+                  else measure(inputs[input_name]) if input_name in inputs else None
+                  for measure, input_name in self._measures]
+        fired = []
+        for name, measure, measure_index, compare, threshold, message in self._checks:
+            value = values[measure_index]
+            if value is not None and compare(value, threshold):
+                fired.append({"rule": name, "measure": measure, "value": value, "threshold": threshold,
+                              "message": message})
+        return fired
+
+
+# Least recently used compiled rule sets are evicted beyond this number
+# Наименее недавно использованные скомпилированные наборы вытесняются сверх этого количества
+MAX_COMPILED_RULE_SETS = 128
+_compiled_rule_sets: "OrderedDict[str, RuleSet]" = OrderedDict()
+
+
+def get_rule_set(rules: Union[RuleSet, Iterable[Dict[str, Any]], None]) -> RuleSet:
+    """
+    Returns the compiled rule set for a config: a RuleSet as is, overrides of the default rules compiled
+    with from_config, the default rule set for None. Compiled overrides are cached by their digest (LRU),
+    so every report with the same rules uses one compiled rule set.
+    Возвращает скомпилированный набор правил для конфигурации: RuleSet как есть, переопределения правил
+    по умолчанию компилируются from_config, для None - набор по умолчанию. Скомпилированные переопределения
+    кешируются по их хешу (LRU), поэтому все отчеты с одинаковыми правилами используют один скомпилированный набор.
+    """
+    if rules is None:
+        return default_rules
+    if isinstance(rules, RuleSet):
+        return rules
+
+    rules = list(rules)
+    digest = get_rules_digest(rules)
+    rule_set = _compiled_rule_sets.get(digest)
+    if rule_set is None:
+        rule_set = _compiled_rule_sets[digest] = RuleSet.from_config(rules)
+        if len(_compiled_rule_sets) > MAX_COMPILED_RULE_SETS:
+            _compiled_rule_sets.popitem(last=False)
+    else:
+        _compiled_rule_sets.move_to_end(digest)
+    return rule_set
+
+
+default_rules = RuleSet()
@@ -0,0 +1,172 @@
+from collections import Counter, defaultdict
+from itertools import combinations, product
+from typing import List, Dict, Hashable, Iterable, NamedTuple, Optional, Sequence, Tuple
+
+
+TASKS_PER_DIFFERENCE = 15
+MIN_SIMILARITY_TASKS = 10
+SIMILARITY_SIGNIFICANCE = 0.001
+MAX_SIMILAR_PAIRS = 1000
+
+
+class SimilarPair(NamedTuple):
+    """
+    Two students with near-identical task scores, p_value is the probability that a student agrees with
+    the rarer of the two works in as many tasks by chance.
+    Два ученика с почти совпадающими баллами за задания, p_value - вероятность, что ученик случайно совпадет
+    с более редкой из двух работ в стольких же заданиях.
+    """
+    first: Hashable
+    second: Hashable
+    differences: int
+    p_value: float
+
+
+def get_max_differences(tasks_count: int) -> int:
+    """
+    Returns how many tasks compared vectors may differ in: one per TASKS_PER_DIFFERENCE tasks.
+    Возвращает, во скольких заданиях могут отличаться сравниваемые векторы: одно на TASKS_PER_DIFFERENCE заданий.
+    """
+    return tasks_count // TASKS_PER_DIFFERENCE
+
+
+def find_similar_pairs(vectors: Iterable[Tuple[Hashable, Sequence[int]]], max_differences: Optional[int] = None,
+                       significance: float = SIMILARITY_SIGNIFICANCE,
+                       max_pairs: int = MAX_SIMILAR_PAIRS) -> List[SimilarPair]:
+    """
+    Returns pairs of keys of students whose task score vectors differ in at most max_differences tasks
+    (by default get_max_differences of the number of tasks) and coincide too well to be chance,
+    the least probable pairs first, at most max_pairs of them.
+    Возвращает пары ключей учеников, векторы баллов за задания которых отличаются не более чем в max_differences
+    заданиях (по умолчанию get_max_differences от числа заданий) и совпадают слишком хорошо, чтобы быть случайностью,
+    начиная с наименее вероятных пар, не более max_pairs пар.
+
+    The chance of a coincidence is calculated from the frequencies of scores of every task among the compared
+    students: agreements with a work are independent tasks agreeing with the probability of its score, so
+    the p-value is the tail of their Poisson binomial distribution. A pair is reported if its p-value multiplied
+    by the number of compared pairs is at most significance, so among honest students a pair is reported
+    with a probability of at most significance. Common works, e.g. all tasks solved, are never reported.
+    Вероятность совпадения рассчитывается по частотам баллов каждого задания среди сравниваемых учеников:
+    совпадения с работой - независимые задания, совпадающие с вероятностью ее балла, поэтому p-значение - хвост
+    их распределения Пуассона-биномиального. Пара выводится, если ее p-значение, умноженное на число сравниваемых
+    пар, не больше significance, поэтому среди честных учеников пара выводится с вероятностью не больше
+    significance. Частые работы, например, с решенными всеми заданиями, никогда не выводятся.
+
+    Pairs are not joined transitively, so chains of similar works do not merge into one large group.
+    Instead of comparing every pair, each vector is split into max_differences + 1 bands packed into integers
+    and put into a bucket per band. Vectors with at most max_differences different tasks have at least one
+    equal band, so they always meet in a bucket, and only vectors of the same bucket are compared.
+    Пары не объединяются транзитивно, поэтому цепочки похожих работ не сливаются в одну большую группу.
+    Вместо сравнения всех пар каждый вектор делится на max_differences + 1 полос, упакованных в целые числа,
+    и кладется в корзину для каждой полосы. У векторов, отличающихся не более чем в max_differences заданиях,
+    хотя бы одна полоса совпадает, поэтому они всегда встречаются в корзине, и сравниваются только векторы
+    одной корзины.
+    """
+    # identical vectors are grouped by the dict at once, buckets hold only distinct patterns
+    # одинаковые векторы сразу группируются словарем, в корзинах лежат только различные шаблоны
+    patterns: Dict[Tuple[int, ...], List[Hashable]] = defaultdict(list)
+    for key, scores in vectors:
+        patterns[tuple(scores)].append(key)
+
+    lengths: Dict[int, List[Tuple[int, ...]]] = defaultdict(list)
+    for row in patterns:
+        lengths[len(row)].append(row)
+
+    pairs = []
+    for length, rows in lengths.items():
+        counts = [len(patterns[row]) for row in rows]
+        students_count = sum(counts)
+        limit = significance / (students_count * (students_count - 1) / 2) if students_count > 1 else 0
+        allowed = max_differences if max_differences is not None else get_max_differences(length)
+        tails = _ChanceTails(rows, counts)
+        # a pair is never less probable than an exact copy of either of its works, so only works whose exact copy
+        # is improbable enough are compared
+        # пара никогда не менее вероятна, чем точная копия любой из ее работ, поэтому сравниваются только работы,
+        # точная копия которых достаточно маловероятна
+        candidates = [index for index in range(len(rows)) if tails.get_exact(index) <= limit]
+
+        for index in candidates:
+            p_value = tails.get(index, length)
+            if counts[index] > 1 and p_value <= limit:
+                pairs.extend(SimilarPair(first, second, 0, p_value)
+                             for first, second in combinations(patterns[rows[index]], 2))
+
+        base = max((max(row, default=0) for row in rows), default=0) + 1
+        buckets = defaultdict(list)
+        for index in candidates:
+            for band, (start, stop) in enumerate(_get_bands(length, allowed + 1)):
+                buckets[band, _pack(rows[index][start:stop], base)].append(index)
+
+        compared = set()
+        for indexes in buckets.values():
+            for first, second in combinations(indexes, 2):
+                if (first, second) in compared:
+                    continue
+                compared.add((first, second))
+                differences = _count_differences(rows[first], rows[second])
+                if differences > allowed:
+                    continue
+                p_value = max(tails.get(first, length - differences), tails.get(second, length - differences))
+                if p_value <= limit:
+                    pairs.extend(SimilarPair(first_key, second_key, differences, p_value)
+                                 for first_key, second_key in product(patterns[rows[first]], patterns[rows[second]]))
+
+    pairs.sort(key=lambda pair: pair.p_value)
+    return pairs[:max_pairs]
+
+
+class _ChanceTails:
+    """
+    Probabilities that a random student agrees with a pattern in at least a given number of tasks,
+    calculated on first use for each pattern.
+    Вероятности, что случайный ученик совпадет с шаблоном не менее чем в заданном числе заданий,
+    рассчитываемые при первом обращении для каждого шаблона.
+    """
+
+    def __init__(self, rows: List[Tuple[int, ...]], counts: List[int]):
+        self.rows = rows
+        students_count = sum(counts)
+        frequencies = [Counter() for _ in range(len(rows[0]) if rows else 0)]
+        for row, count in zip(rows, counts):
+            for task_index, score in enumerate(row):
+                frequencies[task_index][score] += count
+        self.probabilities = [{score: count / students_count for score, count in task.items()}
+                              for task in frequencies]
+        self.tails: Dict[int, List[float]] = {}
+
+    def get_exact(self, index: int) -> float:
+        probability = 1.0
+        for task_index, score in enumerate(self.rows[index]):
+            probability *= self.probabilities[task_index][score]
+        return probability
+
+    def get(self, index: int, agreements: int) -> float:
+        tails = self.tails.get(index)
+        if tails is None:
+            distribution = [1.0]
+            for task_index, score in enumerate(self.rows[index]):
+                probability = self.probabilities[task_index][score]
+                distribution = [a * (1 - probability) + b * probability
+                                for a, b in zip(distribution + [0.0], [0.0] + distribution)]
+            tails = self.tails[index] = [sum(distribution[agreements:]) for agreements in range(len(distribution))]
+        return tails[agreements]
+
+
+def _get_bands(length: int, bands_count: int) -> List[Tuple[int, int]]:
+    if bands_count > length:
+        # any two vectors are near-identical, one empty band puts them all into one bucket
+        # любые два вектора почти совпадают, одна пустая полоса кладет их все в одну корзину
+        return [(0, 0)]
+    bounds = [length * band // bands_count for band in range(bands_count + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def _pack(scores: Sequence[int], base: int) -> int:
+    packed = 0
+    for score in scores:
+        packed = packed * base + score
+    return packed
+
+
+def _count_differences(first: Sequence[int], second: Sequence[int]) -> int:
+    return sum(1 for a, b in zip(first, second) if a != b)
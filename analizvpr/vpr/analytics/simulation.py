@@ -0,0 +1,79 @@
+from bisect import bisect_right
+from typing import Dict, Any, Iterable, Iterator, List, Tuple
+
+from vpr.analytics.aggregates import ClassAggregates
+from vpr.analytics.utils import get_percentage
+from vpr.analytics.rules import RuleSet, get_rule_set
+
+
+Boundaries = Tuple[int, int, int]
+
+
+class BoundarySimulator:
+    """
+    What-if simulator of exam marks for candidate lower boundaries of marks 3, 4 and 5.
+    Симулятор оценок за экзамен для вариантов нижних границ баллов 3, 4 и 5.
+
+    The histogram of exam points of a class or merged aggregates of a region is turned into prefix sums once,
+    so the number of students below any boundary is one lookup and a candidate costs O(1) instead of
+    add_marks_to_students and a full report.
+    Гистограмма экзаменационных баллов класса или объединенных агрегатов региона один раз превращается
+    в префиксные суммы, поэтому число учеников ниже любой границы находится одним обращением, и вариант стоит O(1)
+    вместо add_marks_to_students и полного отчета.
+    """
+
+    def __init__(self, aggregates: ClassAggregates, rules: RuleSet = None):
+        exam_points = aggregates.exam_points
+        self.aggregates = aggregates
+        self.threshold_rules = get_rule_set(rules).only(("mark_threshold_percentage",))
+        self.present_count = aggregates.present_count
+        self.max_points = max(exam_points, default=0)
+        # below[points] - number of students with fewer points, below[max_points + 1] - all students
+        # below[points] - число учеников с меньшим количеством баллов, below[max_points + 1] - все ученики
+        self.below = [0] * (self.max_points + 2)
+        for points in range(self.max_points + 1):
+            self.below[points + 1] = self.below[points] + exam_points.get(points, 0)
+
+    def count_below(self, points: int) -> int:
+        return self.below[min(max(points, 0), self.max_points + 1)]
+
+    def simulate(self, points_for_3: int, points_for_4: int, points_for_5: int) -> Dict[str, Any]:
+        """
+        Returns the distribution of exam marks, quality, success, the average mark and whether the rules
+        of the mark 3 boundary pass for one set of boundaries, as the report would show them.
+        Возвращает распределение оценок за экзамен, качество, успеваемость, средний балл и то, проходят ли
+        правила нижней границы 3-ки, для одного набора границ, как их показал бы отчет.
+        """
+        below_3, below_4, below_5 = sorted(self.count_below(points)
+                                           for points in (points_for_3, points_for_4, points_for_5))
+        marks = {2: below_3, 3: below_4 - below_3, 4: below_5 - below_4, 5: self.present_count - below_5}
+        marks_sum = sum(mark * count for mark, count in marks.items())
+        return {
+            "points_for_3": points_for_3,
+            "points_for_4": points_for_4,
+            "points_for_5": points_for_5,
+            "marks_exam": marks,
+            "quality_exam": get_percentage(marks[4] + marks[5], self.present_count),
+            "success_exam": get_percentage(self.present_count - marks[2], self.present_count),
+            "average_mark_exam": round(marks_sum / self.present_count, 2) if self.present_count else 0,
+            "mark_threshold_verified": not self.threshold_rules.evaluate(self.aggregates, points_for_3),
+        }
+
+    def simulate_grid(self, candidates: Iterable[Boundaries]) -> List[Dict[str, Any]]:
+        return [self.simulate(*boundaries) for boundaries in candidates]
+
+
+def get_boundaries_grid(points_for_3: Iterable[int], points_for_4: Iterable[int],
+                        points_for_5: Iterable[int]) -> Iterator[Boundaries]:
+    """
+    Yields all combinations of candidate boundaries that GradeAndExamForm accepts: 3 < 4 < 5.
+    Candidates of higher marks are skipped with a binary search, so the work depends on the number of combinations.
+    Отдает все сочетания вариантов границ, которые принимает GradeAndExamForm: 3 < 4 < 5.
+    Варианты старших оценок пропускаются бинарным поиском, поэтому работа зависит от количества сочетаний.
+    """
+    points_for_4 = sorted(set(points_for_4))
+    points_for_5 = sorted(set(points_for_5))
+    for points_3 in sorted(set(points_for_3)):
+        for points_4 in points_for_4[bisect_right(points_for_4, points_3):]:
+            for points_5 in points_for_5[bisect_right(points_for_5, points_4):]:
+                yield points_3, points_4, points_5
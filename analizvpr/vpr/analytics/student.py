@@ -1,6 +1,10 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Union
 
-from vpr.analytics.utils import normalize_student_data
+from vpr.analytics.aggregates import ClassAggregates
+from vpr.analytics.archive import ArchiveClass
+from vpr.analytics.columns import ClassColumns
+from vpr.analytics.items import ItemAnalysis
+from vpr.analytics.records import StudentRecord, TaskSchema
 
 
 class Students:
@@ -9,19 +13,53 @@ class Students:
     Класс для работы со списком учеников.
     """
 
-    def __init__(self, students_data: List[Dict[str, Any]]):
-        self._all_students = [normalize_student_data(student) for student in students_data]
+    def __init__(self, students_data: Union[List[Union[Dict[str, Any], StudentRecord]], ArchiveClass],
+                 aggregates: ClassAggregates = None):
         self._present_students = None
+        if isinstance(students_data, ArchiveClass):
+            # columns of an archived class are ready, its records are decoded only if a metric needs them
+            # колонки класса из архива готовы, его записи декодируются, только если они нужны метрике
+            self.schema = students_data.schema
+            self._archive_class = students_data
+            self._all_students = None
+            self._columns = students_data.columns
+        else:
+            self.schema = TaskSchema.from_students(students_data)
+            self._archive_class = None
+            self._all_students = [StudentRecord.adapt(student, self.schema) for student in students_data]
+            self._columns = None
+        self._aggregates = aggregates
+        self._item_analysis = None
 
     @property
-    def get_all(self):
+    def get_all(self) -> List[StudentRecord]:
+        if self._all_students is None:
+            self._all_students = list(self._archive_class)
         return self._all_students
 
     @property
-    def get_present(self):
+    def get_present(self) -> List[StudentRecord]:
         if self._present_students is None:
-            self._present_students = [student for student in self._all_students if student.get('is_present') is True]
+            self._present_students = [student for student in self.get_all if student.is_present is True]
         return self._present_students
 
+    @property
+    def columns(self) -> ClassColumns:
+        if self._columns is None:
+            self._columns = ClassColumns(self.get_all, self.schema)
+        return self._columns
+
+    @property
+    def aggregates(self) -> ClassAggregates:
+        if self._aggregates is None:
+            self._aggregates = ClassAggregates.from_columns(self.columns)
+        return self._aggregates
+
+    @property
+    def item_analysis(self) -> ItemAnalysis:
+        if self._item_analysis is None:
+            self._item_analysis = ItemAnalysis.from_columns(self.columns)
+        return self._item_analysis
+
     def __iter__(self):
         return iter(self.get_present)
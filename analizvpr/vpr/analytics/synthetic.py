@@ -0,0 +1,77 @@
+import random
+from typing import List, Dict, Any, Sequence
+
+
+DEFAULT_MARK_DISTRIBUTION = (0.1, 0.4, 0.35, 0.15)
+
+
+def generate_class(students_count: int = 25, tasks_count: int = 15, absence_rate: float = 0.1,
+                   mark_distribution: Sequence[float] = DEFAULT_MARK_DISTRIBUTION, max_task_points: int = 2,
+                   grade: int = 5, rng: random.Random = None) -> Dict[str, Any]:
+    """
+    Generates a synthetic class in the format of the session data filled by the wizard.
+    Генерирует синтетический класс в формате данных сессии, заполняемых мастером ввода.
+
+    Marks for the 3rd quarter (2-5) are drawn from mark_distribution, task scores of a student
+    are drawn from a binomial distribution whose probability grows with the mark of the student.
+    Оценки за 3-ю четверть (2-5) выбираются по mark_distribution, баллы ученика за задания
+    выбираются из биномиального распределения, вероятность которого растет вместе с его оценкой.
+    """
+    rng = rng or random.Random()
+    max_points = tasks_count * max_task_points
+    students_data = []
+
+    for number in range(1, students_count + 1):
+        student = {"student_name": str(grade * 10000 + number), "is_present": rng.random() >= absence_rate}
+        if not student["is_present"]:
+            student["third_quarter"] = None
+            student.update({f"task_{i}": None for i in range(1, tasks_count + 1)})
+            students_data.append(student)
+            continue
+
+        third_quarter = rng.choices((2, 3, 4, 5), weights=mark_distribution)[0]
+        solve_probability = 0.15 + (third_quarter - 2) * 0.25
+        student["third_quarter"] = third_quarter
+        for i in range(1, tasks_count + 1):
+            student[f"task_{i}"] = sum(rng.random() < solve_probability for _ in range(max_task_points))
+        students_data.append(student)
+
+    return {
+        "grade": grade,
+        "students_count": students_count,
+        "exercises_count": tasks_count,
+        "points_for_3": max(1, max_points // 4),
+        "points_for_4": max(2, max_points // 2),
+        "points_for_5": max(3, max_points * 3 // 4),
+        "students_data": students_data,
+    }
+
+
+def generate_school(classes_count: int = 10, rng: random.Random = None, **class_options) -> List[Dict[str, Any]]:
+    """
+    Generates classes of one school, class_options are passed to generate_class.
+    Генерирует классы одной школы, class_options передаются в generate_class.
+    """
+    rng = rng or random.Random()
+    return [generate_class(rng=rng, **class_options) for _ in range(classes_count)]
+
+
+def generate_region(schools_count: int = 20, classes_count: int = 10, rng: random.Random = None,
+                    **class_options) -> List[List[Dict[str, Any]]]:
+    """
+    Generates schools of a region, each school is a list of classes.
+    Генерирует школы региона, каждая школа - список классов.
+    """
+    rng = rng or random.Random()
+    return [generate_school(classes_count, rng=rng, **class_options) for _ in range(schools_count)]
+
+
+def merge_classes(classes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merges classes with the same tasks and boundaries into one dataset, e.g. to analyze a whole school at once.
+    Объединяет классы с одинаковыми заданиями и границами в один набор данных, например, для анализа всей школы.
+    """
+    merged = dict(classes[0])
+    merged["students_data"] = [student for class_data in classes for student in class_data["students_data"]]
+    merged["students_count"] = len(merged["students_data"])
+    return merged
@@ -1,4 +1,10 @@
-from typing import Dict, Any, List
+import hashlib
+import json
+from bisect import bisect_right
+from operator import mul
+from typing import Dict, Any, List, Optional, Iterable, Sequence
+
+from vpr.analytics.records import TaskSchema
 
 
 translation_dictionary = {
@@ -27,14 +33,19 @@ def translate_russian(function):
     Decorator that translates dictionary keys from English to Russian using translation_dictionary.
     Декоратор, переводящий ключи словаря с английского на русский, используя translation_dictionary.
     """
-    def wrapper(data: Dict[str, Any]) -> Dict[str, Any]:
-        result = function(data)
-        translated_result = {translation_dictionary.get(k, k): v
-                             for k, v in result.items()}
-        return translated_result
+    def wrapper(data: Dict[str, Any], *args, **kwargs) -> Dict[str, Any]:
+        return translate_keys(function(data, *args, **kwargs))
     return wrapper
 
 
+def translate_keys(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Translates dictionary keys from English to Russian using translation_dictionary.
+    Переводит ключи словаря с английского на русский, используя translation_dictionary.
+    """
+    return {translation_dictionary.get(k, k): v for k, v in result.items()}
+
+
 def get_task_keys(student: Dict[str, Any]) -> List[str]:
     """
     Returns a list of task names from the student’s data.
@@ -48,7 +59,8 @@ def get_average_mark(students_data, mark_type) -> float:
     Returns an average_mark of mark_type.
     Возвращает среднюю оценку, указанную mark_type.
     """
-    return sum(student.get(mark_type) for student in students_data) / len(students_data.get_present)
+    aggregates = students_data.aggregates
+    return aggregates.marks_sum(mark_type) / aggregates.present_count
 
 
 def normalize_student_data(student: Dict[str, Any]) -> Dict[str, Any]:
@@ -73,6 +85,31 @@ def normalize_student_data(student: Dict[str, Any]) -> Dict[str, Any]:
     return normalize_data
 
 
+def get_dataset_fingerprint(students_data: List[Dict[str, Any]], mark_threshold: Optional[int] = None,
+                            rules: Optional[List[Dict[str, Any]]] = None) -> str:
+    """
+    Returns a stable hash of normalized students data, the mark 3 threshold and the verification rules overrides,
+    so cached reports change together with the rules.
+    Возвращает стабильный хеш нормализованных данных учеников, границы оценки 3 и переопределений правил проверки,
+    поэтому закешированные отчеты меняются вместе с правилами.
+    """
+    normalized_data = [normalize_student_data(student) for student in students_data or []]
+    fingerprint_data = [normalized_data, mark_threshold]
+    if rules:
+        fingerprint_data.append(get_rules_digest(rules))
+    dump = json.dumps(fingerprint_data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(dump.encode("utf-8")).hexdigest()
+
+
+def get_rules_digest(rules: Iterable[Dict[str, Any]]) -> str:
+    """
+    Returns a stable hash of a list of verification rules overrides.
+    Возвращает стабильный хеш списка переопределений правил проверки.
+    """
+    dump = json.dumps(list(rules), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(dump.encode("utf-8")).hexdigest()
+
+
 def get_percentage(part: int, whole: int, decimal_places: int = 2) -> float:
     """
     Calculates the percentage based on a partial and total value, rounding to the specified decimal places.
@@ -93,27 +130,57 @@ def calculate_exam_points(student: Dict[str, Any]) -> int:
     return sum(value for task, value in student.items() if task.startswith("task_") and isinstance(value, int))
 
 
+def sum_task_scores(scores_matrix: Iterable[Sequence[int]], weights: Sequence[int] = None) -> List[int]:
+    """
+    Sums task scores of every row of the students × tasks matrix, multiplying them by task weights if given.
+    Суммирует баллы за задания в каждой строке матрицы ученики × задания, умножая их на веса заданий, если они заданы.
+    """
+    if weights is None:
+        return [sum(row) for row in scores_matrix]
+    return [sum(map(mul, row, weights)) for row in scores_matrix]
+
+
+def grade_points(points: Iterable[int], boundaries: Sequence[int], marks: Sequence[Any] = None) -> List[Any]:
+    """
+    Maps exam points to marks by the lower points boundaries of marks with a binary search.
+    Переводит экзаменационные баллы в оценки по нижним границам баллов оценок с помощью бинарного поиска.
+
+    boundaries are lower boundaries of all marks except the lowest one, marks are all marks from the lowest,
+    by default 2, 3, 4, ... (for boundaries of 3, 4 and 5 it is the usual 2-5 scale).
+    boundaries - нижние границы всех оценок, кроме самой низкой, marks - все оценки, начиная с самой низкой,
+    по умолчанию 2, 3, 4, ... (для границ 3, 4 и 5 это обычная шкала 2-5).
+    """
+    boundaries = sorted(boundaries)
+    if marks is None:
+        marks = range(2, len(boundaries) + 3)
+    if len(marks) != len(boundaries) + 1:
+        raise ValueError("Количество оценок должно быть на одну больше количества границ")
+    return [marks[bisect_right(boundaries, point)] for point in points]
+
+
+def grade_scores(scores_matrix: Iterable[Sequence[int]], boundaries: Sequence[int], weights: Sequence[int] = None,
+                 marks: Sequence[Any] = None) -> List[Any]:
+    """
+    Assigns marks to a whole students × tasks matrix of scores.
+    Назначает оценки сразу всей матрице баллов ученики × задания.
+    """
+    return grade_points(sum_task_scores(scores_matrix, weights), boundaries, marks)
+
+
 def add_marks_to_students(student_data: List[Dict[str, Any]], marks_data: Dict[str, int]) -> List[Dict[str, Any]]:
     """
     Assigns an exam mark to each student based on their exam points.
     Присваивает каждому ученику оценку за экзамен на основе набранных баллов.
     """
+    updated_data = list(student_data)
+    present_students = [student for student in updated_data if student.get('is_present', False)]
+    if not present_students:
+        return updated_data
 
-    updated_data = []
-    for student in student_data:
-        if not student.get('is_present', False):
-            updated_data.append(student)
-            continue
-
-        exam_points = calculate_exam_points(student)
-
-        exam_mark = 2
-        for key in marks_data:
-            if exam_points < marks_data[key]:
-                break
-            exam_mark += 1
+    schema = TaskSchema.from_student(present_students[0])
+    scores_matrix = [schema.scores(student) for student in present_students]
+    exam_marks = grade_scores(scores_matrix, list(marks_data.values()))
 
+    for student, exam_mark in zip(present_students, exam_marks):
         student['exam_mark'] = exam_mark
-        updated_data.append(student)
-
     return updated_data
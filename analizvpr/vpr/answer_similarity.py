@@ -0,0 +1,63 @@
+from typing import Dict, Any, Iterator, List, Tuple
+
+from vpr.analytics.similarity import find_similar_pairs
+from vpr.models import StudentResult
+
+
+def iter_score_vectors(exam_wave_id: int, class_group_id: int = None,
+                       school_id: int = None) -> Iterator[Tuple[Tuple[int, int, str], List[int]]]:
+    """
+    Yields task score vectors of present students of an exam wave in one streamed query,
+    keys are (class_group_id, position, student_name).
+    Отдает векторы баллов за задания присутствующих учеников проведения ВПР одним потоковым запросом,
+    ключи - (class_group_id, position, student_name).
+    """
+    rows = StudentResult.objects.filter(exam_wave_id=exam_wave_id, is_present=True)
+    if class_group_id is not None:
+        rows = rows.filter(class_group_id=class_group_id)
+    if school_id is not None:
+        rows = rows.filter(class_group__school_id=school_id)
+    rows = (rows
+            .order_by("pk", "task_scores__task_number")
+            .values_list("pk", "class_group_id", "position", "student_name", "task_scores__points"))
+
+    current_pk, key, scores = None, None, []
+    for pk, group_id, position, student_name, points in rows.iterator():
+        if pk != current_pk:
+            if current_pk is not None:
+                yield key, scores
+            current_pk, key, scores = pk, (group_id, position, student_name), []
+        if points is not None:
+            scores.append(points)
+    if current_pk is not None:
+        yield key, scores
+
+
+def get_wave_similar_pairs(exam_wave_id: int, class_group_id: int = None, school_id: int = None,
+                           max_differences: int = None) -> Dict[str, Any]:
+    """
+    Returns pairs of students with improbably coinciding task scores within and across the classes of an exam wave,
+    optionally only of one class or one school, the least probable pairs first.
+    Возвращает пары учеников с маловероятно совпадающими баллами за задания внутри классов проведения ВПР и между
+    ними, при необходимости только одного класса или одной школы, начиная с наименее вероятных пар.
+    """
+    checked_count = 0
+
+    def vectors():
+        nonlocal checked_count
+        for key, scores in iter_score_vectors(exam_wave_id, class_group_id, school_id):
+            checked_count += 1
+            yield key, scores
+
+    pairs = find_similar_pairs(vectors(), max_differences=max_differences)
+    return {
+        "exam_wave_id": exam_wave_id,
+        "checked_count": checked_count,
+        "pairs": [{"students": [_student(pair.first), _student(pair.second)], "differences": pair.differences,
+                   "p_value": pair.p_value} for pair in pairs],
+    }
+
+
+def _student(key: Tuple[int, int, str]) -> Dict[str, Any]:
+    class_group_id, position, student_name = key
+    return {"class_group_id": class_group_id, "position": position, "student_name": student_name}
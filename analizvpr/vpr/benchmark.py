@@ -0,0 +1,129 @@
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Callable
+
+from vpr.analytics.base_metric import BaseIntermediate
+from vpr.analytics.general_metrics import VerificationResults
+from vpr.analytics.metrics_controller import MetricsController, get_metrics, get_report
+from vpr.analytics.student import Students
+from vpr.analytics.synthetic import generate_region, merge_classes
+from vpr.analytics.utils import add_marks_to_students
+from vpr.utils import get_exam_marks, prepare_report_context
+
+
+SCENARIOS = ("class", "school", "region")
+
+
+def time_call(function: Callable[..., Any], repeat: int, setup: Callable[[], List[Any]] = None) -> Dict[str, float]:
+    """
+    Calls the function repeat times and returns the best, median and mean time in milliseconds.
+    If setup is given, it is called untimed before every call and returns the arguments of the function.
+    Вызывает функцию repeat раз и возвращает лучшее, медианное и среднее время в миллисекундах.
+    Если задан setup, он вызывается без замера перед каждым вызовом и возвращает аргументы функции.
+    """
+    timings = []
+    for _ in range(repeat):
+        args = setup() if setup is not None else []
+        started = time.perf_counter()
+        function(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {"best_ms": min(timings), "median_ms": statistics.median(timings), "mean_ms": statistics.fmean(timings),
+            "repeat": repeat}
+
+
+def benchmark_dataset(data: Dict[str, Any], repeat: int) -> Dict[str, Dict[str, float]]:
+    """
+    Times every stage of the analytics pipeline on one dataset: intermediate results (columns, aggregates,
+    similar pairs and others) and metrics are timed separately on their resolved inputs.
+    Замеряет время каждого этапа конвейера аналитики на одном наборе данных: промежуточные результаты (столбцы,
+    агрегаты, похожие пары и другие) и метрики замеряются отдельно на их рассчитанных входных данных.
+    """
+    results = {}
+    students_data = data["students_data"]
+    exam_marks = get_exam_marks(data)
+
+    results["add_marks_to_students"] = time_call(lambda: add_marks_to_students(students_data, exam_marks), repeat)
+    data = dict(data, students_data=add_marks_to_students(students_data, exam_marks), mark_3=data["points_for_3"])
+    results["students_construction"] = time_call(lambda: Students(data["students_data"]), repeat)
+
+    controller = MetricsController(Students(data["students_data"]), get_metrics(data["mark_3"]))
+    for name, provider in controller.providers.items():
+        if not isinstance(provider, BaseIntermediate):
+            continue
+        if "students" in provider.inputs:
+            # Students memoizes its columns and aggregates, so every call gets new students
+            # Students запоминает свои столбцы и агрегаты, поэтому каждый вызов получает новых учеников
+            def setup(provider=provider):
+                fresh = Students(data["students_data"])
+                return [fresh if input_name == "students" else controller.resolve(input_name)
+                        for input_name in provider.inputs]
+        else:
+            def setup(provider=provider):
+                return [controller.resolve(input_name) for input_name in provider.inputs]
+        results[f"intermediate.{name}"] = time_call(provider.calculate, repeat, setup)
+    for metric in controller.metrics:
+        inputs = [controller.resolve(name) for name in metric.inputs]
+        results[f"metric.{metric.metric_name}"] = time_call(lambda: metric.calculate(*inputs), repeat)
+        if isinstance(metric, VerificationResults):
+            aggregates = controller.resolve("aggregates")
+            results["verification.rules"] = time_call(
+                lambda: metric.rules.evaluate(aggregates, metric.mark_threshold), repeat)
+            for verification in metric.verifications:
+                verification_inputs = [controller.resolve(name) for name in verification.inputs]
+                results[f"verification.{type(verification).__name__}"] = time_call(
+                    lambda: verification.get_verification(*verification_inputs), repeat)
+
+    results["get_report"] = time_call(lambda: get_report(data), repeat)
+    results["get_report+prepare_report_context"] = time_call(
+        lambda: prepare_report_context({}, get_report(data)), repeat)
+    return results
+
+
+def run_benchmarks(scenarios: List[str] = SCENARIOS, students_count: int = 25, tasks_count: int = 15,
+                   absence_rate: float = 0.1, mark_distribution: List[float] = None, classes_count: int = 10,
+                   schools_count: int = 20, repeat: int = 5, seed: int = 0) -> Dict[str, Any]:
+    """
+    Generates synthetic data and benchmarks a single class, a whole school and a whole region merged into one dataset.
+    Генерирует синтетические данные и замеряет один класс, целую школу и целый регион, объединенные в один набор.
+    """
+    class_options = {"students_count": students_count, "tasks_count": tasks_count, "absence_rate": absence_rate}
+    if mark_distribution:
+        class_options["mark_distribution"] = mark_distribution
+
+    region = generate_region(schools_count, classes_count, rng=random.Random(seed), **class_options)
+    datasets = {
+        "class": lambda: region[0][0],
+        "school": lambda: merge_classes(region[0]),
+        "region": lambda: merge_classes([class_data for school in region for class_data in school]),
+    }
+
+    results = {}
+    for scenario in scenarios:
+        data = datasets[scenario]()
+        results[scenario] = {"students": len(data["students_data"]), "stages": benchmark_dataset(data, repeat)}
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": _get_git_commit(),
+        "python": platform.python_version(),
+        "parameters": dict(class_options, classes_count=classes_count, schools_count=schools_count,
+                           repeat=repeat, seed=seed),
+        "results": results,
+    }
+
+
+def save_benchmarks(benchmarks: Dict[str, Any], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as output:
+        json.dump(benchmarks, output, ensure_ascii=False, indent=2)
+
+
+def _get_git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
@@ -1,4 +1,14 @@
+from functools import lru_cache
+from itertools import islice
+
 from django import forms
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from vpr.analytics.importers import read_students_file, StudentsImportError
+from vpr.analytics.records import TASK_MIN_POINTS, TASK_MAX_POINTS
+from vpr.analytics.simulation import get_boundaries_grid
+from vpr.analytics.utils import get_task_keys
 
 
 class GradeAndExamForm(forms.Form):
@@ -49,7 +59,109 @@ class GradeAndExamForm(forms.Form):
         return cd
 
 
+MAX_SIMULATED_BOUNDARIES = 10000
+MAX_SIMULATED_POINTS = 1000
+
+
+class PointsListField(forms.CharField):
+    """
+    List of candidate boundary points written as numbers and ranges, e.g. "6,8,10-12".
+    Список вариантов граничных баллов, записанный числами и диапазонами, например, "6,8,10-12".
+    """
+
+    def to_python(self, value):
+        value = super().to_python(value)
+        if value in self.empty_values:
+            return []
+        points = set()
+        for part in value.replace(" ", "").split(","):
+            first, dash, last = part.partition("-")
+            if not first.isdigit() or (dash and not last.isdigit()):
+                raise forms.ValidationError(f"Неверное значение «{part}», ожидаются числа и диапазоны вида 6-12")
+            first, last = int(first), int(last or first)
+            if last > MAX_SIMULATED_POINTS:
+                raise forms.ValidationError(f"Баллы не могут быть больше {MAX_SIMULATED_POINTS}")
+            points.update(range(first, last + 1))
+        return sorted(points)
+
+
+class BoundarySimulationForm(forms.Form):
+    """
+    Candidate lower boundaries of marks 3, 4 and 5 for the what-if simulator.
+    Варианты нижних границ баллов 3, 4 и 5 для симулятора оценок.
+    """
+    points_for_3 = PointsListField(label='Варианты нижней границы баллов для 3-ки')
+    points_for_4 = PointsListField(label='Варианты нижней границы баллов для 4-ки')
+    points_for_5 = PointsListField(label='Варианты нижней границы баллов для 5-ки')
+
+    def clean(self):
+        cd = super().clean()
+        if self.errors:
+            return cd
+        grid = get_boundaries_grid(cd["points_for_3"], cd["points_for_4"], cd["points_for_5"])
+        cd["boundaries"] = list(islice(grid, MAX_SIMULATED_BOUNDARIES + 1))
+        if not cd["boundaries"]:
+            raise forms.ValidationError("Нет вариантов, в которых баллы для 3-ки ниже, чем для 4-ки, а для 4-ки ниже, "
+                                        "чем для 5-ки")
+        if len(cd["boundaries"]) > MAX_SIMULATED_BOUNDARIES:
+            raise forms.ValidationError(f"Слишком много вариантов границ, допускается не более "
+                                        f"{MAX_SIMULATED_BOUNDARIES}")
+        return cd
+
+
+TASK_POINTS = {str(points): points for points in range(TASK_MIN_POINTS, TASK_MAX_POINTS + 1)}
+
+
+class TaskScoreInput(forms.NumberInput):
+    """
+    Number input of the task grid rendered without the template engine, the markup is the same as of NumberInput.
+    Числовое поле таблицы заданий, выводимое без шаблонизатора, разметка такая же, как у NumberInput.
+    """
+
+    def render(self, name, value, attrs=None, renderer=None):
+        value = self.format_value(value)
+        return format_html('<input type="{}" name="{}"{}{}>', self.input_type, name,
+                           format_html(' value="{}"', value) if value is not None else "",
+                           self.render_attrs(self.build_attrs(self.attrs, attrs)))
+
+    @staticmethod
+    def render_attrs(attrs):
+        """
+        Renders attributes in their order like django/forms/widgets/attrs.html.
+        Выводит атрибуты в их порядке, как django/forms/widgets/attrs.html.
+        """
+        return mark_safe("".join(format_html(" {}", name) if value is True else format_html(' {}="{}"', name, value)
+                                 for name, value in attrs.items() if value is not False))
+
+
+class TaskScoreField(forms.IntegerField):
+    """
+    Score for one task: usual scores are taken as is, other values are cleaned by IntegerField
+    with its error messages.
+    Балл за одно задание: обычные баллы принимаются как есть, остальные значения проверяются IntegerField
+    с его сообщениями об ошибках.
+    """
+    widget = TaskScoreInput
+
+    def clean(self, value):
+        points = TASK_POINTS.get(value)
+        if points is not None:
+            return points
+        return super().clean(value)
+
+
+def get_task_field(number: int) -> TaskScoreField:
+    return TaskScoreField(
+        label=f'Задание {number}',
+        required=False,
+        initial=0,
+        min_value=TASK_MIN_POINTS,
+        max_value=TASK_MAX_POINTS,
+        widget=TaskScoreInput(attrs={"class": "form-control", "style": "width: 100px;"}))
+
+
 class StudentsDataForm(forms.Form):
+    exercises_count = 0
 
     student_name = forms.CharField(
         label='Имя ученика',
@@ -71,19 +183,16 @@ class StudentsDataForm(forms.Form):
 
     def __init__(self, *args, **kwargs):
         """
-        Initializes the form with dynamically created fields for exercises.
-        Инициализирует форму с динамически создаваемыми полями для заданий.
+        Initializes the form, fields for exercises missing in the form class are created dynamically.
+        Инициализирует форму, поля для заданий, отсутствующие в классе формы, создаются динамически.
         """
-        self.exercises_count = kwargs.pop('exercises_count', 0)
+        exercises_count = kwargs.pop('exercises_count', self.exercises_count)
         super().__init__(*args, **kwargs)
-        for i in range(self.exercises_count):
-            self.fields[f'task_{i+1}'] = forms.IntegerField(
-                label=f'Задание {i+1}',
-                required=False,
-                initial=0,
-                min_value=0,
-                max_value=2,
-                widget=forms.NumberInput(attrs={"class": "form-control", "style": "width: 100px;"}))
+        for i in range(self.exercises_count, exercises_count):
+            self.fields[f'task_{i+1}'] = get_task_field(i + 1)
+        for i in range(exercises_count, self.exercises_count):
+            del self.fields[f'task_{i+1}']
+        self.exercises_count = exercises_count
 
     def clean(self):
         cleaned_data = super().clean()
@@ -106,6 +215,54 @@ class StudentsDataForm(forms.Form):
         return cleaned_data
 
 
+@lru_cache(maxsize=None)
+def get_students_data_form_class(exercises_count: int) -> type:
+    """
+    Returns the form class with declared fields for exercises_count tasks, built once per process.
+    Возвращает класс формы с объявленными полями для exercises_count заданий, создается один раз на процесс.
+    """
+    task_fields = {f'task_{i}': get_task_field(i) for i in range(1, exercises_count + 1)}
+    return type(f"StudentsDataForm{exercises_count}", (StudentsDataForm,),
+                {"exercises_count": exercises_count, **task_fields})
+
+
+@lru_cache(maxsize=None)
+def get_students_data_formset_class(exercises_count: int) -> type:
+    """
+    Returns the formset class for exercises_count tasks, built once per process.
+    Возвращает класс formset для exercises_count заданий, создается один раз на процесс.
+    """
+    return forms.formset_factory(get_students_data_form_class(exercises_count), extra=0)
+
+
+class StudentsFileUploadForm(forms.Form):
+
+    students_file = forms.FileField(
+        label='Файл с результатами (CSV или XLSX)',
+        widget=forms.ClearableFileInput(attrs={"class": "form-control", "accept": ".csv,.xlsx"}))
+
+    def __init__(self, *args, **kwargs):
+        self.exercises_count = kwargs.pop('exercises_count', None)
+        super().__init__(*args, **kwargs)
+
+    def clean_students_file(self):
+        """
+        Parses and validates the uploaded file, saves the students data to self.students_data.
+        Разбирает и проверяет загруженный файл, сохраняет данные учеников в self.students_data.
+        """
+        students_file = self.cleaned_data['students_file']
+        try:
+            self.students_data = read_students_file(students_file, students_file.name)
+        except StudentsImportError as error:
+            raise forms.ValidationError(error.errors)
+
+        tasks_count = len(get_task_keys(self.students_data[0]))
+        if self.exercises_count and tasks_count != self.exercises_count:
+            raise forms.ValidationError(f'Количество заданий в файле ({tasks_count}) '
+                                        f'не совпадает с указанным ({self.exercises_count})')
+        return students_file
+
+
 class EmailForm(forms.Form):
     name = forms.CharField(
         label='Ваше имя',
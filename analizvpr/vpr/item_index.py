@@ -0,0 +1,43 @@
+from typing import Dict, Any
+
+from vpr.analytics.items import ItemAnalysis
+from vpr.analytics.student import Students
+from vpr.models import WaveAggregate
+from vpr.storage import load_students_data
+
+
+def get_wave_item_analysis(exam_wave_id: int, class_group_id: int = None, school_id: int = None) -> Dict[str, Any]:
+    """
+    Returns the item analysis of an exam wave merged from the stored analysis of its classes,
+    optionally only of one class or one school.
+    Возвращает анализ заданий проведения ВПР, объединенный из сохраненного анализа его классов,
+    при необходимости только одного класса или одной школы.
+    """
+    rows = WaveAggregate.objects.filter(exam_wave_id=exam_wave_id)
+    if class_group_id is not None:
+        rows = rows.filter(class_group_id=class_group_id)
+    if school_id is not None:
+        rows = rows.filter(class_group__school_id=school_id)
+
+    classes_count = 0
+    analysis = ItemAnalysis()
+    for row in rows.iterator():
+        classes_count += 1
+        analysis.merge(get_stored_item_analysis(row))
+    return {"exam_wave_id": exam_wave_id, "classes_count": classes_count,
+            "present_count": analysis.present_count, "tasks": analysis.get_items()}
+
+
+def get_stored_item_analysis(row: WaveAggregate) -> ItemAnalysis:
+    """
+    Returns the item analysis of a stored class, rows saved before it was kept are filled from the saved scores once.
+    Возвращает анализ заданий сохраненного класса, строки, сохраненные до его появления, один раз заполняются
+    по сохраненным баллам.
+    """
+    if row.item_analysis:
+        return ItemAnalysis.from_dict(row.item_analysis)
+
+    analysis = Students(load_students_data(row.class_group_id, row.exam_wave_id)).item_analysis
+    row.item_analysis = analysis.to_dict()
+    row.save(update_fields=["item_analysis"])
+    return analysis
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from vpr.benchmark import SCENARIOS, run_benchmarks, save_benchmarks
+
+
+class Command(BaseCommand):
+    """
+    Benchmarks the analytics pipeline on synthetic data and saves the timings to a JSON file.
+    Замеряет производительность конвейера аналитики на синтетических данных и сохраняет замеры в JSON файл.
+    """
+    help = "Замеряет время расчета отчетов на синтетических классах, школах и регионах"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scenario", choices=SCENARIOS, action="append", dest="scenarios")
+        parser.add_argument("--students", type=int, default=25, help="учеников в классе")
+        parser.add_argument("--tasks", type=int, default=15, help="заданий в работе")
+        parser.add_argument("--absence-rate", type=float, default=0.1, help="доля отсутствующих учеников")
+        parser.add_argument("--mark-distribution", type=float, nargs=4, metavar=("P2", "P3", "P4", "P5"),
+                            help="распределение оценок за 3-ю четверть")
+        parser.add_argument("--classes", type=int, default=10, help="классов в школе")
+        parser.add_argument("--schools", type=int, default=20, help="школ в регионе")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", default="benchmark_results.json", help="файл для результатов")
+
+    def handle(self, *args, **options):
+        benchmarks = run_benchmarks(
+            scenarios=options["scenarios"] or SCENARIOS,
+            students_count=options["students"],
+            tasks_count=options["tasks"],
+            absence_rate=options["absence_rate"],
+            mark_distribution=options["mark_distribution"],
+            classes_count=options["classes"],
+            schools_count=options["schools"],
+            repeat=options["repeat"],
+            seed=options["seed"],
+        )
+        save_benchmarks(benchmarks, options["output"])
+
+        for scenario, result in benchmarks["results"].items():
+            self.stdout.write(f"{scenario} ({result['students']} учеников):")
+            for stage, timing in result["stages"].items():
+                self.stdout.write(f"  {stage}: {timing['best_ms']:.3f} мс")
+        self.stdout.write(self.style.SUCCESS(f"Результаты сохранены в {options['output']}"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from vpr.analytics.archive import write_archive
+from vpr.report_export import iter_saved_classes
+
+
+class Command(BaseCommand):
+    """
+    Writes saved classes into a memory-mapped columnar archive, which reports can be calculated from
+    without the database, e.g. with export_reports --archive.
+    Записывает сохраненные классы в поколоночный архив, отображаемый в память, по которому можно рассчитывать
+    отчеты без базы данных, например, с помощью export_reports --archive.
+    """
+    help = "Записывает результаты сохраненных классов в поколоночный архив"
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="файл архива, например, wave.vpra")
+        parser.add_argument("--exam-wave", type=int, help="только классы этого проведения ВПР")
+
+    def handle(self, *args, **options):
+        try:
+            count = write_archive(options["output"], iter_saved_classes(options["exam_wave"]))
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(f"Записано классов: {count} в {options['output']}"))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from vpr.analytics.archive import ResultsArchive
+from vpr.report_export import iter_saved_classes, iter_class_reports, to_ndjson_line
+
+
+class Command(BaseCommand):
+    """
+    Exports reports of saved classes as NDJSON with English metric keys, one class per line.
+    Выгружает отчеты сохраненных классов в NDJSON с английскими ключами метрик, по одному классу в строке.
+    """
+    help = "Выгружает отчеты сохраненных классов в формате NDJSON, по одному классу в строке"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--exam-wave", type=int, help="только классы этого проведения ВПР")
+        parser.add_argument("--workers", type=int, default=1, help="количество процессов для расчета отчетов")
+        parser.add_argument("--output", help="файл для отчетов, по умолчанию stdout")
+        parser.add_argument("--archive", help="читать классы из архива результатов вместо базы данных")
+
+    def handle(self, *args, **options):
+        if options["archive"]:
+            try:
+                classes = ResultsArchive(options["archive"]).datasets()
+            except (OSError, ValueError) as error:
+                raise CommandError(error)
+            if options["exam_wave"] is not None:
+                classes = (data for data in classes if data.get("exam_wave_id") == options["exam_wave"])
+        else:
+            classes = iter_saved_classes(options["exam_wave"])
+        reports = iter_class_reports(classes, max_workers=options["workers"])
+
+        if not options["output"]:
+            for item in reports:
+                self.stdout.write(to_ndjson_line(item), ending="")
+            return
+
+        with open(options["output"], "w", encoding="utf-8") as output:
+            for item in reports:
+                output.write(to_ndjson_line(item))
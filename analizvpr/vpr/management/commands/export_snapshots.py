@@ -0,0 +1,38 @@
+import os
+
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+
+from vpr.analytics.metrics_controller import get_report
+from vpr.report_cache import get_data_fingerprint, get_report_cache_alias, get_report_cache_timeout
+from vpr.report_export import iter_saved_classes
+from vpr.utils import prepare_report_context
+
+
+class Command(BaseCommand):
+    """
+    Exports reports of saved classes as standalone HTML pages ready for printing or saving to PDF.
+    Выгружает отчеты сохраненных классов отдельными HTML страницами, готовыми для печати или сохранения в PDF.
+    """
+    help = "Выгружает отчеты сохраненных классов в HTML файлы, по одному файлу на класс"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--exam-wave", type=int, help="только классы этого проведения ВПР")
+        parser.add_argument("--output-dir", default="snapshots", help="папка для HTML файлов")
+
+    def handle(self, *args, **options):
+        os.makedirs(options["output_dir"], exist_ok=True)
+
+        count = 0
+        for class_data in iter_saved_classes(options["exam_wave"]):
+            context = prepare_report_context({"Title": "Анализ ВПР"}, get_report(class_data))
+            context["report_fingerprint"] = get_data_fingerprint(class_data)
+            context["report_cache"] = get_report_cache_alias()
+            context["report_cache_timeout"] = get_report_cache_timeout()
+
+            file_name = f"class_{class_data['class_group_id']}_wave_{class_data['exam_wave_id']}.html"
+            with open(os.path.join(options["output_dir"], file_name), "w", encoding="utf-8") as snapshot:
+                snapshot.write(render_to_string("vpr/report/results_snapshot.html", context))
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Сохранено отчетов: {count} в {options['output_dir']}"))
@@ -0,0 +1,37 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from vpr.analytics.cli import analyze_file
+from vpr.analytics.importers import StudentsImportError
+
+
+class Command(BaseCommand):
+    """
+    Imports a class from a CSV or XLSX file and prints its report in JSON.
+    Импортирует класс из CSV или XLSX файла и выводит его отчет в JSON.
+    """
+    help = "Импортирует результаты класса из CSV или XLSX файла и выводит отчет в формате JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV или XLSX файл с результатами учеников")
+        parser.add_argument("--points-for-3", type=int, required=True)
+        parser.add_argument("--points-for-4", type=int, required=True)
+        parser.add_argument("--points-for-5", type=int, required=True)
+        parser.add_argument("--output", help="файл для отчета, по умолчанию stdout")
+
+    def handle(self, *args, **options):
+        exam_marks = {f"points_for_{i}": options[f"points_for_{i}"] for i in range(3, 6)}
+        try:
+            report = analyze_file(options["path"], exam_marks, translate=True)
+        except OSError as error:
+            raise CommandError(error)
+        except StudentsImportError as error:
+            raise CommandError("\n".join(error.errors))
+
+        content = json.dumps(report, ensure_ascii=False, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                output.write(content)
+        else:
+            self.stdout.write(content)
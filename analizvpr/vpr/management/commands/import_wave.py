@@ -0,0 +1,66 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from vpr.analytics.importers import read_students_file, StudentsImportError
+from vpr.analytics.utils import add_marks_to_students, get_task_keys
+from vpr.models import ClassGroup, ExamWave, School
+from vpr.storage import save_wave_results
+
+
+class Command(BaseCommand):
+    """
+    Imports results of a class in one more exam wave from a CSV or XLSX file, e.g. to follow the class over years.
+    Импортирует результаты класса еще в одном проведении ВПР из CSV или XLSX файла, например, чтобы следить
+    за классом по годам.
+    """
+    help = "Сохраняет результаты класса в новом проведении ВПР из CSV или XLSX файла"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV или XLSX файл с результатами учеников")
+        parser.add_argument("--class-group", type=int, help="существующий класс, по умолчанию создается новый")
+        parser.add_argument("--school", type=int, help="школа нового класса")
+        parser.add_argument("--class-name", default="", help="название нового класса")
+        parser.add_argument("--grade", type=int, required=True)
+        parser.add_argument("--title", default="")
+        parser.add_argument("--held-on", type=date.fromisoformat, default=date.today(), help="дата в формате ГГГГ-ММ-ДД")
+        parser.add_argument("--points-for-3", type=int, required=True)
+        parser.add_argument("--points-for-4", type=int, required=True)
+        parser.add_argument("--points-for-5", type=int, required=True)
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["path"], "rb") as students_file:
+                students_data = read_students_file(students_file, options["path"])
+        except OSError as error:
+            raise CommandError(error)
+        except StudentsImportError as error:
+            raise CommandError("\n".join(error.errors))
+
+        exam_marks = {f"points_for_{i}": options[f"points_for_{i}"] for i in range(3, 6)}
+        students_data = add_marks_to_students(students_data, exam_marks)
+
+        with transaction.atomic():
+            class_group = self.get_class_group(options)
+            exam_wave = ExamWave.objects.create(title=options["title"], held_on=options["held_on"],
+                                                grade=options["grade"],
+                                                exercises_count=len(get_task_keys(students_data[0])), **exam_marks)
+            save_wave_results(class_group, exam_wave, students_data)
+        self.stdout.write(self.style.SUCCESS(f"Сохранено учеников: {len(students_data)}, класс {class_group.pk}, "
+                                             f"проведение ВПР {exam_wave.pk}"))
+
+    @staticmethod
+    def get_class_group(options) -> ClassGroup:
+        if options["class_group"] is not None:
+            class_group = ClassGroup.objects.filter(pk=options["class_group"]).first()
+            if class_group is None:
+                raise CommandError(f"Класс {options['class_group']} не найден")
+            return class_group
+
+        school = None
+        if options["school"] is not None:
+            school = School.objects.filter(pk=options["school"]).first()
+            if school is None:
+                raise CommandError(f"Школа {options['school']} не найдена")
+        return ClassGroup.objects.create(school=school, grade=options["grade"], name=options["class_name"])
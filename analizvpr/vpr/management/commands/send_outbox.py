@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from vpr.outbox import send_outbox
+
+
+class Command(BaseCommand):
+    """
+    Sends queued emails from the outbox in batches.
+    Отправляет письма из очереди пачками.
+    """
+    help = "Отправляет письма из очереди, с --loop работает как фоновый обработчик"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--max-attempts", type=int)
+        parser.add_argument("--loop", action="store_true", help="не завершаться, проверять очередь постоянно")
+        parser.add_argument("--interval", type=float, default=10, help="пауза между проверками в секундах")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_outbox(options["batch_size"], options["max_attempts"])
+            if sent or failed:
+                self.stdout.write(f"Отправлено: {sent}, с ошибкой: {failed}")
+            if not options["loop"]:
+                break
+            if sent + failed < options["batch_size"]:
+                time.sleep(options["interval"])
@@ -0,0 +1,40 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from vpr.verification_rules import verify_saved_classes
+
+
+class Command(BaseCommand):
+    """
+    Re-verifies saved classes with the configured rules and prints the fired rules as NDJSON.
+    Повторно проверяет сохраненные классы настроенными правилами и выводит сработавшие правила в NDJSON.
+    """
+    help = "Повторно проверяет достоверность результатов сохраненных классов и выводит NDJSON, по классу в строке"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--exam-wave", type=int, help="только классы этого проведения ВПР")
+        parser.add_argument("--rules", help="JSON файл с правилами, дополняющими правила из настроек")
+        parser.add_argument("--fired-only", action="store_true",
+                            help="выводить только классы со сработавшими правилами")
+        parser.add_argument("--output", help="файл для результатов, по умолчанию stdout")
+
+    def handle(self, *args, **options):
+        rules = None
+        if options["rules"]:
+            try:
+                with open(options["rules"], encoding="utf-8") as rules_file:
+                    rules = json.load(rules_file)
+            except (OSError, ValueError) as error:
+                raise CommandError(error)
+
+        output = open(options["output"], "w", encoding="utf-8") if options["output"] else self.stdout
+        try:
+            for result in verify_saved_classes(options["exam_wave"], rules):
+                if result["fired"] or not options["fired_only"]:
+                    output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        except ValueError as error:
+            raise CommandError(error)
+        finally:
+            if output is not self.stdout:
+                output.close()
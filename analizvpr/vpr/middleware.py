@@ -0,0 +1,84 @@
+import json
+import logging
+from typing import Iterable, Iterator
+
+from django.conf import settings
+
+from vpr.analytics.profiling import ReportProfiler
+
+
+logger = logging.getLogger("vpr.profiling")
+
+
+class ReportProfilingMiddleware:
+    """
+    Profiles reports calculated during a request if VPR_PROFILING is set.
+    Профилирует отчеты, рассчитанные во время запроса, если задан VPR_PROFILING.
+
+    Timings are written to the "vpr.profiling" log as JSON, sent in the Server-Timing header (except for
+    streaming responses, see _profile_stream) and added to the counters served by the metrics endpoint.
+    Memory is traced only with VPR_PROFILING_TRACEMALLOC.
+    Замеры пишутся в лог "vpr.profiling" в формате JSON, передаются в заголовке Server-Timing (кроме
+    потоковых ответов, см. _profile_stream) и добавляются к счетчикам, которые отдает эндпоинт metrics.
+    Память отслеживается только с VPR_PROFILING_TRACEMALLOC.
+
+    The middleware is enabled in the project settings, without VPR_PROFILING it only passes requests through:
+    Middleware подключается в настройках проекта, без VPR_PROFILING он только пропускает запросы:
+
+        MIDDLEWARE = [
+            ...,
+            "vpr.middleware.ReportProfilingMiddleware",
+        ]
+        VPR_PROFILING = True
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, "VPR_PROFILING", False):
+            return self.get_response(request)
+
+        profiler = ReportProfiler(trace_memory=getattr(settings, "VPR_PROFILING_TRACEMALLOC", False))
+        profiler.start()
+        try:
+            with profiler.activate():
+                response = self.get_response(request)
+        except BaseException:
+            profiler.finish()
+            raise
+
+        if response.streaming and not getattr(response, "is_async", False):
+            response.streaming_content = self._profile_stream(request, profiler, response.streaming_content)
+            return response
+
+        profiler.finish()
+        self._log(request, profiler)
+        if profiler.timings:
+            response["Server-Timing"] = profiler.server_timing()
+        return response
+
+    def _profile_stream(self, request, profiler: ReportProfiler, content: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Yields the body of a streaming response with the profiler active, reports of streaming views are calculated
+        while the body is sent. The headers are sent before it, so timings of these responses are only logged
+        and counted, the Server-Timing header is not set.
+        Отдает тело потокового ответа с активным профилировщиком, отчеты потоковых представлений рассчитываются
+        во время отправки тела. Заголовки отправляются раньше него, поэтому замеры таких ответов только пишутся
+        в лог и учитываются в счетчиках, заголовок Server-Timing не задается.
+        """
+        chunks = iter(content)
+        try:
+            while True:
+                with profiler.activate():
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            profiler.finish()
+            self._log(request, profiler)
+
+    def _log(self, request, profiler: ReportProfiler) -> None:
+        if profiler.timings:
+            logger.info(json.dumps({"path": request.path, "timings": profiler.to_list()}, ensure_ascii=False))
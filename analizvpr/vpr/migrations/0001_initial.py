@@ -0,0 +1,109 @@
+# Generated by Django 5.1.6 on 2026-10-17 12:12
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamWave',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(blank=True, max_length=255, verbose_name='Название')),
+                ('held_on', models.DateField(default=datetime.date.today, verbose_name='Дата проведения')),
+                ('grade', models.PositiveSmallIntegerField(verbose_name='Номер класса')),
+                ('exercises_count', models.PositiveSmallIntegerField(verbose_name='Количество заданий')),
+                ('points_for_3', models.PositiveSmallIntegerField(verbose_name='Нижняя граница баллов для 3-ки')),
+                ('points_for_4', models.PositiveSmallIntegerField(verbose_name='Нижняя граница баллов для 4-ки')),
+                ('points_for_5', models.PositiveSmallIntegerField(verbose_name='Нижняя граница баллов для 5-ки')),
+            ],
+            options={
+                'verbose_name': 'Проведение ВПР',
+                'verbose_name_plural': 'Проведения ВПР',
+                'indexes': [models.Index(fields=['held_on', 'grade'], name='vpr_examwav_held_on_3c1b1a_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='School',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, verbose_name='Название')),
+                ('region', models.CharField(blank=True, max_length=255, verbose_name='Регион')),
+            ],
+            options={
+                'verbose_name': 'Школа',
+                'verbose_name_plural': 'Школы',
+                'indexes': [models.Index(fields=['region', 'name'], name='vpr_school_region_ba2605_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ClassGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grade', models.PositiveSmallIntegerField(verbose_name='Номер класса')),
+                ('name', models.CharField(blank=True, max_length=20, verbose_name='Название')),
+                ('school', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='class_groups', to='vpr.school', verbose_name='Школа')),
+            ],
+            options={
+                'verbose_name': 'Класс',
+                'verbose_name_plural': 'Классы',
+            },
+        ),
+        migrations.CreateModel(
+            name='StudentResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(verbose_name='Номер в списке')),
+                ('student_name', models.CharField(max_length=255, verbose_name='Имя ученика')),
+                ('is_present', models.BooleanField(verbose_name='Присутствие на экзамене')),
+                ('third_quarter', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Оценка за 3-ю четверть')),
+                ('exam_mark', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Оценка за ВПР')),
+                ('exam_points', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Баллы за ВПР')),
+                ('class_group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='vpr.classgroup', verbose_name='Класс')),
+                ('exam_wave', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='vpr.examwave', verbose_name='Проведение ВПР')),
+            ],
+            options={
+                'verbose_name': 'Результат ученика',
+                'verbose_name_plural': 'Результаты учеников',
+                'ordering': ['position'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_number', models.PositiveSmallIntegerField(verbose_name='Номер задания')),
+                ('points', models.PositiveSmallIntegerField(verbose_name='Баллы')),
+                ('student_result', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_scores', to='vpr.studentresult', verbose_name='Результат ученика')),
+            ],
+            options={
+                'verbose_name': 'Баллы за задание',
+                'verbose_name_plural': 'Баллы за задания',
+                'ordering': ['task_number'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='classgroup',
+            index=models.Index(fields=['school', 'grade'], name='vpr_classgr_school__d8f75a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentresult',
+            index=models.Index(fields=['class_group', 'exam_wave', 'is_present'], name='vpr_student_class_g_02f8fc_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='studentresult',
+            constraint=models.UniqueConstraint(fields=('exam_wave', 'class_group', 'position'), name='unique_student_position'),
+        ),
+        migrations.AddConstraint(
+            model_name='taskscore',
+            constraint=models.UniqueConstraint(fields=('student_result', 'task_number'), name='unique_student_task'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.1.6 on 2026-10-17 12:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vpr', '0002_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaveAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('held_on', models.DateField(verbose_name='Дата проведения')),
+                ('aggregates', models.JSONField(verbose_name='Агрегаты')),
+            ],
+            options={
+                'verbose_name': 'Агрегаты класса',
+                'verbose_name_plural': 'Агрегаты классов',
+                'ordering': ['held_on'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Student',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, verbose_name='Имя')),
+                ('class_group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='students', to='vpr.classgroup', verbose_name='Класс')),
+            ],
+            options={
+                'verbose_name': 'Ученик',
+                'verbose_name_plural': 'Ученики',
+            },
+        ),
+        migrations.AddField(
+            model_name='studentresult',
+            name='student',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='results', to='vpr.student', verbose_name='Ученик'),
+        ),
+        migrations.AddIndex(
+            model_name='studentresult',
+            index=models.Index(fields=['student', 'exam_wave'], name='vpr_student_student_62e0e9_idx'),
+        ),
+        migrations.AddField(
+            model_name='waveaggregate',
+            name='class_group',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wave_aggregates', to='vpr.classgroup', verbose_name='Класс'),
+        ),
+        migrations.AddField(
+            model_name='waveaggregate',
+            name='exam_wave',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aggregates', to='vpr.examwave', verbose_name='Проведение ВПР'),
+        ),
+        migrations.AddConstraint(
+            model_name='student',
+            constraint=models.UniqueConstraint(fields=('class_group', 'name'), name='unique_class_student'),
+        ),
+        migrations.AddIndex(
+            model_name='waveaggregate',
+            index=models.Index(fields=['class_group', 'held_on'], name='vpr_waveagg_class_g_208840_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='waveaggregate',
+            constraint=models.UniqueConstraint(fields=('class_group', 'exam_wave'), name='unique_wave_aggregate'),
+        ),
+    ]
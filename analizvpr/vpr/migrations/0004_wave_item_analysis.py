@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vpr', '0003_student_waveaggregate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='waveaggregate',
+            name='item_analysis',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Анализ заданий'),
+        ),
+    ]
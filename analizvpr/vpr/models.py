@@ -1,3 +1,197 @@
+from datetime import date
+
 from django.db import models
+from django.utils import timezone
+
+
+class School(models.Model):
+    """
+    School that classes belong to.
+    Школа, к которой относятся классы.
+    """
+    name = models.CharField(verbose_name="Название", max_length=255)
+    region = models.CharField(verbose_name="Регион", max_length=255, blank=True)
+
+    class Meta:
+        verbose_name = "Школа"
+        verbose_name_plural = "Школы"
+        indexes = [models.Index(fields=["region", "name"])]
+
+    def __str__(self):
+        return self.name
+
+
+class ClassGroup(models.Model):
+    """
+    School class whose results are analyzed.
+    Школьный класс, результаты которого анализируются.
+    """
+    school = models.ForeignKey(School, verbose_name="Школа", on_delete=models.CASCADE, related_name="class_groups",
+                               null=True, blank=True)
+    grade = models.PositiveSmallIntegerField(verbose_name="Номер класса")
+    name = models.CharField(verbose_name="Название", max_length=20, blank=True)
+
+    class Meta:
+        verbose_name = "Класс"
+        verbose_name_plural = "Классы"
+        indexes = [models.Index(fields=["school", "grade"])]
+
+    def __str__(self):
+        return self.name or str(self.grade)
+
+
+class ExamWave(models.Model):
+    """
+    One VPR sitting with its number of tasks and points boundaries for marks.
+    Одно проведение ВПР с количеством заданий и границами баллов для оценок.
+    """
+    title = models.CharField(verbose_name="Название", max_length=255, blank=True)
+    held_on = models.DateField(verbose_name="Дата проведения", default=date.today)
+    grade = models.PositiveSmallIntegerField(verbose_name="Номер класса")
+    exercises_count = models.PositiveSmallIntegerField(verbose_name="Количество заданий")
+    points_for_3 = models.PositiveSmallIntegerField(verbose_name="Нижняя граница баллов для 3-ки")
+    points_for_4 = models.PositiveSmallIntegerField(verbose_name="Нижняя граница баллов для 4-ки")
+    points_for_5 = models.PositiveSmallIntegerField(verbose_name="Нижняя граница баллов для 5-ки")
+
+    class Meta:
+        verbose_name = "Проведение ВПР"
+        verbose_name_plural = "Проведения ВПР"
+        indexes = [models.Index(fields=["held_on", "grade"])]
+
+    def __str__(self):
+        return self.title or f"ВПР {self.grade} класс, {self.held_on}"
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the wave and copies its date to the aggregates of its classes, which keep it for trend queries.
+        Сохраняет проведение и копирует его дату в агрегаты его классов, которые хранят ее для запросов трендов.
+        """
+        super().save(*args, **kwargs)
+        self.aggregates.exclude(held_on=self.held_on).update(held_on=self.held_on)
+
+
+class Student(models.Model):
+    """
+    Student of a class, links results of the student in different exam waves.
+    Ученик класса, связывает результаты ученика в разных проведениях ВПР.
+    """
+    class_group = models.ForeignKey(ClassGroup, verbose_name="Класс", on_delete=models.CASCADE, related_name="students")
+    name = models.CharField(verbose_name="Имя", max_length=255)
+
+    class Meta:
+        verbose_name = "Ученик"
+        verbose_name_plural = "Ученики"
+        constraints = [
+            models.UniqueConstraint(fields=["class_group", "name"], name="unique_class_student"),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class StudentResult(models.Model):
+    """
+    Result of one student in one exam wave.
+    Результат одного ученика в одном проведении ВПР.
+    """
+    class_group = models.ForeignKey(ClassGroup, verbose_name="Класс", on_delete=models.CASCADE,
+                                    related_name="results")
+    exam_wave = models.ForeignKey(ExamWave, verbose_name="Проведение ВПР", on_delete=models.CASCADE,
+                                  related_name="results")
+    student = models.ForeignKey(Student, verbose_name="Ученик", on_delete=models.SET_NULL, related_name="results",
+                                null=True, blank=True)
+    position = models.PositiveSmallIntegerField(verbose_name="Номер в списке")
+    student_name = models.CharField(verbose_name="Имя ученика", max_length=255)
+    is_present = models.BooleanField(verbose_name="Присутствие на экзамене")
+    third_quarter = models.PositiveSmallIntegerField(verbose_name="Оценка за 3-ю четверть", null=True, blank=True)
+    exam_mark = models.PositiveSmallIntegerField(verbose_name="Оценка за ВПР", null=True, blank=True)
+    exam_points = models.PositiveSmallIntegerField(verbose_name="Баллы за ВПР", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Результат ученика"
+        verbose_name_plural = "Результаты учеников"
+        ordering = ["position"]
+        constraints = [
+            models.UniqueConstraint(fields=["exam_wave", "class_group", "position"], name="unique_student_position"),
+        ]
+        indexes = [models.Index(fields=["class_group", "exam_wave", "is_present"]),
+                   models.Index(fields=["student", "exam_wave"])]
+
+    def __str__(self):
+        return self.student_name
+
+
+class TaskScore(models.Model):
+    """
+    Points of a student for one exam task.
+    Баллы ученика за одно задание экзамена.
+    """
+    student_result = models.ForeignKey(StudentResult, verbose_name="Результат ученика", on_delete=models.CASCADE,
+                                       related_name="task_scores")
+    task_number = models.PositiveSmallIntegerField(verbose_name="Номер задания")
+    points = models.PositiveSmallIntegerField(verbose_name="Баллы")
+
+    class Meta:
+        verbose_name = "Баллы за задание"
+        verbose_name_plural = "Баллы за задания"
+        ordering = ["task_number"]
+        constraints = [
+            models.UniqueConstraint(fields=["student_result", "task_number"], name="unique_student_task"),
+        ]
+
+    def __str__(self):
+        return f"Задание {self.task_number}: {self.points}"
+
+
+class WaveAggregate(models.Model):
+    """
+    Precalculated aggregates and item analysis of a class in one exam wave, trends and task statistics
+    are built from them without reading the scores.
+    Заранее рассчитанные агрегаты и анализ заданий класса в одном проведении ВПР, тренды и статистики заданий
+    строятся по ним без чтения баллов.
+    """
+    class_group = models.ForeignKey(ClassGroup, verbose_name="Класс", on_delete=models.CASCADE,
+                                    related_name="wave_aggregates")
+    exam_wave = models.ForeignKey(ExamWave, verbose_name="Проведение ВПР", on_delete=models.CASCADE,
+                                  related_name="aggregates")
+    # copy of exam_wave.held_on for the trend index, kept up to date by ExamWave.save
+    # копия exam_wave.held_on для индекса трендов, поддерживается в актуальном состоянии ExamWave.save
+    held_on = models.DateField(verbose_name="Дата проведения")
+    aggregates = models.JSONField(verbose_name="Агрегаты")
+    item_analysis = models.JSONField(verbose_name="Анализ заданий", default=dict, blank=True)
+
+    class Meta:
+        verbose_name = "Агрегаты класса"
+        verbose_name_plural = "Агрегаты классов"
+        ordering = ["held_on"]
+        constraints = [
+            models.UniqueConstraint(fields=["class_group", "exam_wave"], name="unique_wave_aggregate"),
+        ]
+        indexes = [models.Index(fields=["class_group", "held_on"])]
+
+    def __str__(self):
+        return f"{self.class_group}, {self.exam_wave}"
+
+
+class OutboxMessage(models.Model):
+    """
+    Email message waiting in the outbox to be sent by the background worker.
+    Письмо, ожидающее в очереди отправки фоновым обработчиком.
+    """
+    subject = models.CharField(verbose_name="Тема", max_length=255)
+    message = models.TextField(verbose_name="Текст")
+    from_email = models.CharField(verbose_name="Отправитель", max_length=255)
+    recipients = models.JSONField(verbose_name="Получатели", default=list)
+    created_at = models.DateTimeField(verbose_name="Создано", auto_now_add=True)
+    next_attempt_at = models.DateTimeField(verbose_name="Следующая попытка", default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(verbose_name="Попыток отправки", default=0)
+    last_error = models.TextField(verbose_name="Последняя ошибка", blank=True)
+    sent_at = models.DateTimeField(verbose_name="Отправлено", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Письмо в очереди"
+        verbose_name_plural = "Очередь писем"
+        indexes = [models.Index(fields=["sent_at", "next_attempt_at"])]
 
-# Create your models here.
+    def __str__(self):
+        return self.subject
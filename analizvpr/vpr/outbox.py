@@ -0,0 +1,102 @@
+import logging
+from datetime import timedelta
+from typing import List, Tuple
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from vpr.models import OutboxMessage
+
+
+logger = logging.getLogger("vpr.outbox")
+
+
+def queue_mail(subject: str, message: str, from_email: str, recipient_list: List[str]) -> OutboxMessage:
+    """
+    Puts an email into the outbox instead of sending it during the request.
+    Ставит письмо в очередь вместо отправки во время запроса.
+    """
+    return OutboxMessage.objects.create(subject=subject, message=message, from_email=from_email,
+                                        recipients=list(recipient_list))
+
+
+def send_outbox(batch_size: int = 50, max_attempts: int = None) -> Tuple[int, int]:
+    """
+    Sends a batch of due messages over one SMTP connection, returns the numbers of sent and failed messages.
+    Отправляет пачку готовых к отправке писем через одно SMTP соединение, возвращает количество
+    отправленных и неотправленных писем.
+
+    Failed messages are retried later with an exponential backoff, at most max_attempts times, a message that
+    has used all attempts is logged as an error to the "vpr.outbox" logger and stays in the outbox unsent.
+    Неотправленные письма повторяются позже с экспоненциальной задержкой, не более max_attempts раз, письмо,
+    исчерпавшее все попытки, записывается как ошибка в журнал "vpr.outbox" и остается в очереди неотправленным.
+    """
+    max_attempts = max_attempts or getattr(settings, "VPR_OUTBOX_MAX_ATTEMPTS", 5)
+    messages = _claim_messages(batch_size, max_attempts)
+    if not messages:
+        return 0, 0
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as error:
+        for outbox_message in messages:
+            _schedule_retry(outbox_message, error, max_attempts)
+        return 0, len(messages)
+
+    sent, failed = 0, 0
+    try:
+        for outbox_message in messages:
+            email = EmailMessage(subject=outbox_message.subject, body=outbox_message.message,
+                                 from_email=outbox_message.from_email, to=outbox_message.recipients,
+                                 connection=connection)
+            try:
+                email.send()
+            except Exception as error:
+                _schedule_retry(outbox_message, error, max_attempts)
+                failed += 1
+            else:
+                outbox_message.sent_at = timezone.now()
+                outbox_message.save(update_fields=["sent_at"])
+                sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def get_retry_delay(attempts: int) -> timedelta:
+    """
+    Returns the delay before the next attempt: the base delay doubled for every failed attempt, at most one day.
+    Возвращает задержку до следующей попытки: базовая задержка, удваиваемая за каждую неудачную попытку,
+    не более суток.
+    """
+    base_delay = getattr(settings, "VPR_OUTBOX_RETRY_DELAY", 60)
+    return timedelta(seconds=min(base_delay * 2 ** (attempts - 1), 24 * 60 * 60))
+
+
+@transaction.atomic
+def _claim_messages(batch_size: int, max_attempts: int) -> List[OutboxMessage]:
+    """
+    Selects due messages and moves their next attempt forward, so that other workers skip them while they are sent.
+    Выбирает готовые к отправке письма и переносит их следующую попытку, чтобы другие обработчики пропускали
+    их во время отправки.
+    """
+    now = timezone.now()
+    messages = list(OutboxMessage.objects
+                    .select_for_update(skip_locked=True)
+                    .filter(sent_at__isnull=True, attempts__lt=max_attempts, next_attempt_at__lte=now)
+                    .order_by("next_attempt_at")[:batch_size])
+    OutboxMessage.objects.filter(pk__in=[m.pk for m in messages]).update(next_attempt_at=now + get_retry_delay(1))
+    return messages
+
+
+def _schedule_retry(outbox_message: OutboxMessage, error: Exception, max_attempts: int) -> None:
+    outbox_message.attempts += 1
+    outbox_message.last_error = str(error) or type(error).__name__
+    outbox_message.next_attempt_at = timezone.now() + get_retry_delay(outbox_message.attempts)
+    outbox_message.save(update_fields=["attempts", "last_error", "next_attempt_at"])
+    if outbox_message.attempts >= max_attempts:
+        logger.error("Письмо %s не отправлено после %s попыток: %s", outbox_message.pk, outbox_message.attempts,
+                     outbox_message.last_error)
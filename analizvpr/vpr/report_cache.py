@@ -0,0 +1,138 @@
+from typing import Dict, Any, List, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.utils import make_template_fragment_key
+
+from vpr.analytics.metrics_controller import get_report_and_aggregates, update_report
+from vpr.analytics.rules import get_rule_set
+from vpr.analytics.utils import get_dataset_fingerprint
+
+
+REPORT_KEY_PREFIX = "vpr:report:"
+AGGREGATES_KEY_PREFIX = "vpr:aggregates:"
+HITS_KEY = "vpr:report-cache:hits"
+MISSES_KEY = "vpr:report-cache:misses"
+SESSION_FINGERPRINT_KEY = "report_fingerprint"
+REPORT_FRAGMENTS = ("vpr_report", "vpr_report_snapshot")
+
+
+def get_report_cache():
+    """
+    Returns the cache for reports, set by the VPR_REPORT_CACHE alias from CACHES ("default" if not set).
+    The backend (locmem, file-based or database), TTL and the MAX_ENTRIES eviction limit are configured in CACHES.
+    Возвращает кеш для отчетов, заданный псевдонимом VPR_REPORT_CACHE из CACHES (по умолчанию "default").
+    Бэкенд (locmem, файловый или база данных), TTL и лимит вытеснения MAX_ENTRIES настраиваются в CACHES.
+    """
+    return caches[get_report_cache_alias()]
+
+
+def get_report_cache_alias() -> str:
+    return getattr(settings, "VPR_REPORT_CACHE", "default")
+
+
+def get_report_cache_timeout() -> int:
+    return getattr(settings, "VPR_REPORT_CACHE_TIMEOUT", 3600)
+
+
+def get_cached_report(data: Dict[str, Any], session=None) -> Dict[str, Any]:
+    """
+    Returns the report from the cache by the dataset fingerprint, calculates and caches it on a miss.
+    Возвращает отчет из кеша по отпечатку данных, при промахе рассчитывает и кеширует его.
+    """
+    cache = get_report_cache()
+    fingerprint = get_data_fingerprint(data)
+    if session is not None:
+        session[SESSION_FINGERPRINT_KEY] = fingerprint
+
+    report = cache.get(REPORT_KEY_PREFIX + fingerprint)
+    if report is not None:
+        _increment(cache, HITS_KEY)
+        return report
+
+    _increment(cache, MISSES_KEY)
+    report, aggregates = get_report_and_aggregates(data)
+    cache.set_many({REPORT_KEY_PREFIX + fingerprint: report, AGGREGATES_KEY_PREFIX + fingerprint: aggregates},
+                   timeout=get_report_cache_timeout())
+    return report
+
+
+def update_cached_report(session, data: Dict[str, Any], index: int, new_student: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Replaces one student in data and updates the cached report of the class by the delta of this student:
+    the report and the aggregates cached with it are patched without a pass over the class,
+    the report is calculated in full only if they are no longer in the cache.
+    Заменяет одного ученика в data и обновляет закешированный отчет класса по изменениям этого ученика:
+    отчет и закешированные вместе с ним агрегаты исправляются без прохода по классу,
+    отчет рассчитывается полностью, только если их уже нет в кеше.
+    """
+    cache = get_report_cache()
+    students_data = data["students_data"]
+    old_fingerprint = session.pop(SESSION_FINGERPRINT_KEY, None)
+
+    report = aggregates = None
+    if old_fingerprint is not None:
+        report_key, aggregates_key = REPORT_KEY_PREFIX + old_fingerprint, AGGREGATES_KEY_PREFIX + old_fingerprint
+        cached = cache.get_many([report_key, aggregates_key])
+        report, aggregates = cached.get(report_key), cached.get(aggregates_key)
+        cache.delete_many(_get_report_keys(old_fingerprint))
+
+    if report is not None and aggregates is not None:
+        aggregates.replace_student(students_data[index], new_student)
+        students_data[index] = new_student
+        report = update_report(report, data, aggregates, index)
+    else:
+        students_data[index] = new_student
+        report, aggregates = get_report_and_aggregates(data)
+
+    fingerprint = get_data_fingerprint(data)
+    cache.set_many({REPORT_KEY_PREFIX + fingerprint: report, AGGREGATES_KEY_PREFIX + fingerprint: aggregates},
+                   timeout=get_report_cache_timeout())
+    session[SESSION_FINGERPRINT_KEY] = fingerprint
+    return report
+
+
+def invalidate_cached_report(session) -> None:
+    """
+    Removes from the cache the last report shown in this session, called when its data is edited.
+    Удаляет из кеша последний показанный в этой сессии отчет, вызывается при изменении его данных.
+    """
+    fingerprint = session.pop(SESSION_FINGERPRINT_KEY, None)
+    if fingerprint is not None:
+        get_report_cache().delete_many(_get_report_keys(fingerprint))
+
+
+def get_report_cache_stats() -> Dict[str, int]:
+    """
+    Returns counters of cache hits and misses.
+    Возвращает счетчики попаданий и промахов кеша.
+    """
+    counters = get_report_cache().get_many([HITS_KEY, MISSES_KEY])
+    return {"hits": counters.get(HITS_KEY, 0), "misses": counters.get(MISSES_KEY, 0)}
+
+
+def get_data_fingerprint(data: Dict[str, Any]) -> str:
+    """
+    Returns the fingerprint of the report data, it keys cached reports and fragments of the results page.
+    It is calculated from the current data and the compiled rules, including the default ones,
+    so a change of the data or of the rules never serves a stale report or fragment.
+    Возвращает отпечаток данных отчета, по нему кешируются отчеты и фрагменты страницы результатов.
+    Он рассчитывается по текущим данным и скомпилированным правилам, включая правила по умолчанию,
+    поэтому при изменении данных или правил устаревший отчет или фрагмент не показывается.
+    """
+    rules = get_rule_set(data.get("verification_rules")).rules
+    return get_dataset_fingerprint(data.get("students_data"), data.get("mark_3"), rules)
+
+
+def _get_report_keys(fingerprint: str) -> List[str]:
+    keys = [REPORT_KEY_PREFIX + fingerprint, AGGREGATES_KEY_PREFIX + fingerprint]
+    keys.extend(make_template_fragment_key(fragment, [fingerprint]) for fragment in REPORT_FRAGMENTS)
+    return keys
+
+
+def _increment(cache, key: str) -> None:
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
@@ -0,0 +1,61 @@
+import json
+from typing import Dict, Any, Iterable, Iterator
+
+from vpr.analytics.batch import get_reports
+from vpr.models import WaveAggregate
+from vpr.storage import load_students_data
+from vpr.verification_rules import get_verification_rules
+
+
+def iter_saved_classes(exam_wave_id: int = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yields saved classes one by one, students data of a class is read only when the class is reached.
+    Classes are listed by their aggregates, one row per class and exam wave, without scanning the results.
+    Отдает сохраненные классы по одному, данные учеников класса читаются только когда очередь доходит до класса.
+    Классы перечисляются по их агрегатам, по одной строке на класс и проведение ВПР, без просмотра результатов.
+    """
+    classes = WaveAggregate.objects.order_by("exam_wave_id", "class_group_id")
+    if exam_wave_id is not None:
+        classes = classes.filter(exam_wave_id=exam_wave_id)
+    classes = classes.values_list("class_group_id", "exam_wave_id", "exam_wave__grade", "exam_wave__points_for_3",
+                                  "class_group__school_id", "class_group__school__region")
+
+    region_rules = {}
+    for class_group_id, exam_wave_id, grade, points_for_3, school_id, region in classes.iterator():
+        if region not in region_rules:
+            region_rules[region] = get_verification_rules(region)
+        yield {
+            "class_group_id": class_group_id,
+            "exam_wave_id": exam_wave_id,
+            "grade": grade,
+            "school_id": school_id,
+            "students_data": load_students_data(class_group_id, exam_wave_id),
+            "mark_3": points_for_3,
+            "verification_rules": region_rules[region],
+        }
+
+
+def iter_class_reports(classes: Iterable[Dict[str, Any]], max_workers: int = 1) -> Iterator[Dict[str, Any]]:
+    """
+    Yields reports with English metric keys together with the keys of their classes.
+    Отдает отчеты с английскими ключами метрик вместе с ключами их классов.
+    """
+    class_keys = {}
+
+    def datasets():
+        for index, class_data in enumerate(classes):
+            class_keys[index] = {key: class_data.get(key) for key in ("class_group_id", "exam_wave_id", "grade")}
+            yield class_data
+
+    for batch_report in get_reports(datasets(), max_workers=max_workers, translate=False):
+        item = class_keys.pop(batch_report.index)
+        item["report"] = batch_report.report
+        yield item
+
+
+def to_ndjson_line(item: Dict[str, Any]) -> str:
+    """
+    Serializes one item to a line of NDJSON (newline delimited JSON).
+    Сериализует один элемент в строку NDJSON (JSON с разделением строками).
+    """
+    return json.dumps(item, ensure_ascii=False, separators=(",", ":")) + "\n"
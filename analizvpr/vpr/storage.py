@@ -0,0 +1,300 @@
+from collections import Counter
+from typing import List, Dict, Any, Optional
+
+from django.conf import settings
+from django.db import transaction
+
+from vpr.analytics.aggregates import ClassAggregates
+from vpr.analytics.items import ItemAnalysis
+from vpr.analytics.packing import pack_students_data, unpack_students_data
+from vpr.analytics.student import Students
+from vpr.analytics.utils import calculate_exam_points, get_task_keys
+from vpr.models import ClassGroup, ExamWave, Student, StudentResult, TaskScore, WaveAggregate
+from vpr.verification_rules import get_verification_rules
+
+
+DATABASE_STORAGE = "database"
+SESSION_STORAGE = "session"
+UNKNOWN_NAMES = ("Неизвестно", "Неизвестный")
+
+
+def get_results_storage() -> str:
+    """
+    Returns where students results are kept: in the database (default) or in the session.
+    Возвращает, где хранятся результаты учеников: в базе данных (по умолчанию) или в сессии.
+    """
+    return getattr(settings, "VPR_RESULTS_STORAGE", DATABASE_STORAGE)
+
+
+def get_session_compression() -> bool:
+    """
+    Returns whether large students data is compressed in the session (VPR_SESSION_COMPRESSION, on by default).
+    Возвращает, сжимаются ли большие данные учеников в сессии (VPR_SESSION_COMPRESSION, по умолчанию включено).
+    """
+    return getattr(settings, "VPR_SESSION_COMPRESSION", True)
+
+
+def get_session_students_data(session) -> Optional[List[Dict[str, Any]]]:
+    """
+    Returns students data kept in the session, unpacked from the compact encoding if needed.
+    Возвращает данные учеников из сессии, распакованные из компактной кодировки при необходимости.
+    """
+    return unpack_students_data(session.get("students_data"))
+
+
+def set_session_students_data(session, students_data: List[Dict[str, Any]]) -> None:
+    """
+    Keeps students data in the session in the compact encoding, which is much smaller than the list of dicts.
+    Хранит данные учеников в сессии в компактной кодировке, которая намного меньше списка словарей.
+    """
+    session["students_data"] = pack_students_data(students_data, compress=get_session_compression())
+
+
+def save_students_data(session, students_data: List[Dict[str, Any]]) -> None:
+    """
+    Saves processed students data and keeps in the session only the keys of the saved class and exam wave.
+    Сохраняет обработанные данные учеников и оставляет в сессии только ключи сохраненного класса и проведения ВПР.
+    """
+    if get_results_storage() == SESSION_STORAGE:
+        set_session_students_data(session, students_data)
+        return
+
+    class_group, exam_wave = save_class_results(session, students_data)
+    session.pop("students_data", None)
+    session["class_group_id"] = class_group.pk
+    session["exam_wave_id"] = exam_wave.pk
+
+
+@transaction.atomic
+def save_class_results(class_data: Dict[str, Any], students_data: List[Dict[str, Any]]):
+    """
+    Creates a class, an exam wave and results of its students with bulk inserts. The class and the exam wave
+    already saved for class_data (by its class_group_id and exam_wave_id) are reused and their results replaced,
+    so submitting the data again does not leave unused rows behind.
+    Создает класс, проведение ВПР и результаты его учеников массовыми вставками. Класс и проведение ВПР,
+    уже сохраненные для class_data (по его class_group_id и exam_wave_id), используются повторно, а их результаты
+    заменяются, поэтому повторная отправка данных не оставляет неиспользуемых строк.
+    """
+    grade = class_data.get("grade") or 0
+    wave_fields = {
+        "grade": grade,
+        "exercises_count": class_data.get("exercises_count") or 0,
+        "points_for_3": class_data.get("points_for_3") or 0,
+        "points_for_4": class_data.get("points_for_4") or 0,
+        "points_for_5": class_data.get("points_for_5") or 0,
+    }
+    class_group = ClassGroup.objects.select_for_update().filter(pk=class_data.get("class_group_id")).first()
+    exam_wave = ExamWave.objects.select_for_update().filter(pk=class_data.get("exam_wave_id")).first()
+    if class_group is None or exam_wave is None:
+        class_group = ClassGroup.objects.create(grade=grade)
+        exam_wave = ExamWave.objects.create(**wave_fields)
+    else:
+        class_group.grade = grade
+        class_group.save(update_fields=["grade"])
+        for field, value in wave_fields.items():
+            setattr(exam_wave, field, value)
+        exam_wave.save()
+        StudentResult.objects.filter(class_group=class_group, exam_wave=exam_wave).delete()
+
+    save_wave_results(class_group, exam_wave, students_data)
+    return class_group, exam_wave
+
+
+@transaction.atomic
+def save_wave_results(class_group: ClassGroup, exam_wave: ExamWave, students_data: List[Dict[str, Any]]) -> None:
+    """
+    Saves results of the students of a class in one exam wave, links them to the students of the class by name
+    and stores the aggregates of the wave.
+    Сохраняет результаты учеников класса в одном проведении ВПР, связывает их с учениками класса по имени
+    и сохраняет агрегаты проведения.
+    """
+    students = get_class_students(class_group, [student.get("student_name") for student in students_data])
+
+    results = []
+    for position, student in enumerate(students_data, start=1):
+        is_present = student.get("is_present") is True
+        results.append(StudentResult(
+            class_group=class_group,
+            exam_wave=exam_wave,
+            student=students.get(student.get("student_name")),
+            position=position,
+            student_name=student.get("student_name") or "Неизвестно",
+            is_present=is_present,
+            third_quarter=student.get("third_quarter"),
+            exam_mark=student.get("exam_mark") if is_present else None,
+            exam_points=calculate_exam_points(student) if is_present else None,
+        ))
+    results = StudentResult.objects.bulk_create(results)
+
+    task_scores = []
+    for result, student in zip(results, students_data):
+        if not result.is_present:
+            continue
+        for task in get_task_keys(student):
+            task_scores.append(TaskScore(student_result=result, task_number=int(task[5:]),
+                                         points=student.get(task) or 0))
+    TaskScore.objects.bulk_create(task_scores)
+    save_wave_aggregate(class_group.pk, exam_wave, students_data)
+
+
+def get_class_students(class_group: ClassGroup, names: List[str]) -> Dict[str, Student]:
+    """
+    Returns students of the class by names, creating missing ones. Empty and repeated names are not linked,
+    as they cannot tell students apart.
+    Возвращает учеников класса по именам, создавая отсутствующих. Пустые и повторяющиеся имена не связываются,
+    так как по ним нельзя различить учеников.
+    """
+    counts = Counter(names)
+    names = [name for name, count in counts.items() if count == 1 and name and name not in UNKNOWN_NAMES]
+    students = {student.name: student for student in Student.objects.filter(class_group=class_group, name__in=names)}
+    missing = [Student(class_group=class_group, name=name) for name in names if name not in students]
+    for student in Student.objects.bulk_create(missing):
+        students[student.name] = student
+    return students
+
+
+def save_wave_aggregate(class_group_id: int, exam_wave: ExamWave, students_data: List[Dict[str, Any]]) -> None:
+    """
+    Stores the aggregates and the item analysis of a class in an exam wave for trend and task queries.
+    Сохраняет агрегаты и анализ заданий класса в проведении ВПР для запросов трендов и статистик заданий.
+    """
+    students = Students(students_data)
+    WaveAggregate.objects.update_or_create(
+        class_group_id=class_group_id, exam_wave=exam_wave,
+        defaults={"held_on": exam_wave.held_on, "aggregates": students.aggregates.to_dict(),
+                  "item_analysis": students.item_analysis.to_dict()},
+    )
+
+
+def update_student_data(session, index: int, student: Dict[str, Any]) -> None:
+    """
+    Replaces the data of one student with the given index in the list of the class.
+    Заменяет данные одного ученика с указанным индексом в списке класса.
+    """
+    if "students_data" in session:
+        students_data = get_session_students_data(session)
+        students_data[index] = student
+        set_session_students_data(session, students_data)
+        return
+
+    update_student_result(session["class_group_id"], session["exam_wave_id"], index + 1, student)
+
+
+@transaction.atomic
+def update_student_result(class_group_id: int, exam_wave_id: int, position: int, student: Dict[str, Any]) -> None:
+    """
+    Updates the saved result of one student and replaces the task scores of the student,
+    the stored aggregates of the class are updated by the delta of this student.
+    Обновляет сохраненный результат одного ученика и заменяет его баллы за задания,
+    сохраненные агрегаты класса обновляются по изменениям этого ученика.
+    """
+    result = StudentResult.objects.get(class_group_id=class_group_id, exam_wave_id=exam_wave_id, position=position)
+    old_student = _get_result_data(result, result.task_scores.values_list("task_number", "points"))
+    result.is_present = student.get("is_present") is True
+    if result.student_name != student.get("student_name"):
+        result.student = _relink_student(result, student.get("student_name"))
+    result.student_name = student.get("student_name") or "Неизвестно"
+    result.third_quarter = student.get("third_quarter")
+    result.exam_mark = student.get("exam_mark") if result.is_present else None
+    result.exam_points = calculate_exam_points(student) if result.is_present else None
+    result.save()
+
+    result.task_scores.all().delete()
+    task_scores = []
+    if result.is_present:
+        task_scores = TaskScore.objects.bulk_create([
+            TaskScore(student_result=result, task_number=int(task[5:]), points=student.get(task) or 0)
+            for task in get_task_keys(student)
+        ])
+    new_student = _get_result_data(result, ((score.task_number, score.points) for score in task_scores))
+    replace_wave_aggregate_student(class_group_id, result.exam_wave, old_student, new_student)
+
+
+def replace_wave_aggregate_student(class_group_id: int, exam_wave: ExamWave, old_student: Dict[str, Any],
+                                   new_student: Dict[str, Any]) -> None:
+    """
+    Replaces one student in the stored aggregates and item analysis of a class in O(tasks),
+    they are recalculated from all students only if they have not been stored yet.
+    Заменяет одного ученика в сохраненных агрегатах и анализе заданий класса за O(заданий),
+    они пересчитываются по всем ученикам, только если еще не были сохранены.
+    """
+    row = (WaveAggregate.objects.select_for_update()
+           .filter(class_group_id=class_group_id, exam_wave=exam_wave).first())
+    if row is None or not row.item_analysis:
+        save_wave_aggregate(class_group_id, exam_wave, load_students_data(class_group_id, exam_wave.pk))
+        return
+
+    aggregates = ClassAggregates.from_dict(row.aggregates)
+    aggregates.replace_student(old_student, new_student)
+    analysis = ItemAnalysis.from_dict(row.item_analysis)
+    analysis.replace_student(old_student, new_student)
+    row.aggregates = aggregates.to_dict()
+    row.item_analysis = analysis.to_dict()
+    row.save(update_fields=["aggregates", "item_analysis"])
+
+
+def _get_result_data(result: StudentResult, task_scores) -> Dict[str, Any]:
+    student = {"student_name": result.student_name, "is_present": result.is_present,
+               "third_quarter": result.third_quarter}
+    if result.is_present:
+        student["exam_mark"] = result.exam_mark
+        student.update((f"task_{task_number}", points) for task_number, points in sorted(task_scores))
+    return student
+
+
+def _relink_student(result: StudentResult, name: str):
+    student = get_class_students(result.class_group, [name]).get(name)
+    if student is None or student.results.filter(exam_wave_id=result.exam_wave_id).exclude(pk=result.pk).exists():
+        return None
+    return student
+
+
+def load_students_data(class_group_id: int, exam_wave_id: int) -> List[Dict[str, Any]]:
+    """
+    Reads students data of a class in one query in the format of processed session data.
+    Читает данные учеников класса одним запросом в формате обработанных данных сессии.
+    """
+    rows = (StudentResult.objects
+            .filter(class_group_id=class_group_id, exam_wave_id=exam_wave_id)
+            .order_by("position", "task_scores__task_number")
+            .values_list("pk", "student_name", "is_present", "third_quarter", "exam_mark",
+                         "task_scores__task_number", "task_scores__points"))
+
+    students_data = []
+    current_pk = None
+    for pk, student_name, is_present, third_quarter, exam_mark, task_number, points in rows:
+        if pk != current_pk:
+            current_pk = pk
+            student = {"student_name": student_name, "is_present": is_present, "third_quarter": third_quarter}
+            if is_present:
+                student["exam_mark"] = exam_mark
+            students_data.append(student)
+        if task_number is not None:
+            student[f"task_{task_number}"] = points
+    return students_data
+
+
+def load_wave_aggregates(exam_wave_id: int) -> ClassAggregates:
+    """
+    Returns the stored aggregates of all classes of an exam wave merged into one, e.g. for a region.
+    Возвращает сохраненные агрегаты всех классов проведения ВПР, объединенные в одни, например, для региона.
+    """
+    rows = WaveAggregate.objects.filter(exam_wave_id=exam_wave_id).values_list("aggregates", flat=True)
+    return ClassAggregates.combine(ClassAggregates.from_dict(row) for row in rows.iterator())
+
+
+def get_report_data(session) -> Dict[str, Any]:
+    """
+    Returns the data for get_report: students data from the database or, for old sessions, from the session.
+    The mark threshold is the lower boundary of points for 3, as in the command line tool and the export.
+    Возвращает данные для get_report: данные учеников из базы данных или, для старых сессий, из сессии.
+    Порог оценки - нижняя граница баллов для 3-ки, как в инструменте командной строки и выгрузке.
+    """
+    class_group_id = session.get("class_group_id")
+    exam_wave_id = session.get("exam_wave_id")
+    if class_group_id is None or exam_wave_id is None or "students_data" in session:
+        students_data = get_session_students_data(session)
+    else:
+        students_data = load_students_data(class_group_id, exam_wave_id)
+    return {"students_data": students_data, "mark_3": session.get("points_for_3"),
+            "verification_rules": get_verification_rules()}
@@ -1,3 +1,1317 @@
-from django.test import TestCase
+import copy
+import itertools
+import io
+import json
+import math
+import random
+import statistics
+import os
+import tempfile
+import zipfile
+from datetime import date, timedelta
+from smtplib import SMTPException
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import caches
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management import call_command
+from django.contrib.auth.models import Permission, User
+from django.core.mail.backends.base import BaseEmailBackend
+from django import forms
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from vpr.forms import TaskScoreInput, StudentsDataForm, get_task_field, get_students_data_formset_class
+from vpr.analytics.aggregates import ClassAggregates
+from vpr.analytics.archive import write_archive, ResultsArchive
+from vpr.analytics.cli import main as analytics_main
+from vpr.analytics.items import ItemAnalysis
+from vpr.analytics.importers import read_students_file, StudentsImportError
+from vpr.analytics.packing import pack_students_data, unpack_students_data, COMPRESS_MIN_SIZE
+from vpr.analytics.profiling import registry as profiling_registry
+from vpr.analytics.metrics_controller import get_report, calculate_report, get_report_and_aggregates, \
+    calculate_aggregates_report
+from vpr.analytics.regional import get_region_reports
+from vpr.analytics.synthetic import generate_class, generate_region, merge_classes
+from vpr.analytics.similarity import find_similar_pairs, get_max_differences
+from vpr.analytics.simulation import BoundarySimulator, get_boundaries_grid
+from vpr.analytics.student import Students
+from vpr.analytics.utils import add_marks_to_students, grade_scores
+from vpr.analytics.rules import get_rule_set, MAX_COMPILED_RULE_SETS
+from vpr.models import School, ClassGroup, ExamWave, Student, StudentResult, TaskScore, WaveAggregate, OutboxMessage
+from vpr.report_cache import get_cached_report, update_cached_report, get_report_cache_stats, \
+    get_data_fingerprint, REPORT_KEY_PREFIX, SESSION_FINGERPRINT_KEY
+from vpr.report_export import iter_saved_classes
+from vpr.outbox import send_outbox, get_retry_delay, queue_mail, _claim_messages
+from vpr.trends import get_slope, get_class_trend, get_school_trend, get_student_trend
+from vpr.utils import get_exam_marks
+from vpr.item_index import get_wave_item_analysis
+from vpr.storage import save_students_data, load_students_data, save_wave_results, update_student_result
+
+
+EXAM_MARKS = {"points_for_3": 3, "points_for_4": 5, "points_for_5": 8}
+
+
+def make_student(name, quarter, scores=None, mark=None):
+    """
+    Returns a student in the format of processed session data, an absent one if scores are not given.
+    Возвращает ученика в формате обработанных данных сессии, отсутствующего, если баллы не заданы.
+    """
+    student = {"student_name": name, "is_present": scores is not None, "third_quarter": quarter}
+    if scores is not None:
+        student["exam_mark"] = mark
+        student.update((f"task_{number}", score) for number, score in enumerate(scores, 1))
+    return student
+
+
+# Tasks are scored 0, 1 or 2 points, marks match EXAM_MARKS
+# Задания оцениваются в 0, 1 или 2 балла, оценки соответствуют EXAM_MARKS
+CLASS = [
+    make_student("Иванов", 4, [1, 0, 2, 1, 1], 4),
+    make_student("Петров", 3),
+    make_student("Сидорова", 5, [2, 2, 2, 1, 1], 5),
+    make_student("Кузнецов", 3, [0, 0, 1, 0, 1], 2),
+    make_student("Смирнова", 4),
+    make_student("Попов", 4, [1, 1, 1, 1, 0], 3),
+]
+SINGLE = [make_student("Иванов", 3, [2, 1, 0], 3)]
+ALL_ABSENT = [make_student("Петров", 4), make_student("Смирнова", 5)]
+
+
+def start_session(client, students_data):
+    """
+    Saves the class like the input views do and returns the session of the test client.
+    Сохраняет класс, как это делают представления ввода, и возвращает сессию тестового клиента.
+    """
+    session = client.session
+    session.update(dict(EXAM_MARKS, grade=5, exercises_count=5))
+    save_students_data(session, copy.deepcopy(students_data))
+    session.save()
+    return session
+
+
+def get_class_report(students_data, mark_3=3):
+    return get_report({"students_data": copy.deepcopy(students_data), "mark_3": mark_3})
+
+
+class ReportTest(SimpleTestCase):
+    """
+    Reports of small classes compared with reports calculated by hand.
+    Отчеты небольших классов в сравнении с отчетами, рассчитанными вручную.
+    """
+    maxDiff = None
+
+    def test_class_with_absent_students(self):
+        self.assertEqual(get_class_report(CLASS), {
+            "Учащихся по списку": 6,
+            "Учащиеся, присутствующие на экзамене": 4,
+            "Список учеников с оценками": [
+                {"student_name": "Иванов", "exam_mark": 4, "exam_points": 5},
+                {"student_name": "Петров", "exam_mark": "-", "exam_points": "-"},
+                {"student_name": "Сидорова", "exam_mark": 5, "exam_points": 8},
+                {"student_name": "Кузнецов", "exam_mark": 2, "exam_points": 2},
+                {"student_name": "Смирнова", "exam_mark": "-", "exam_points": "-"},
+                {"student_name": "Попов", "exam_mark": 3, "exam_points": 4},
+            ],
+            "Оценки за 3-ю четверть": {3: 1, 4: 2, 5: 1},
+            "Оценки за ВПР": {2: 1, 3: 1, 4: 1, 5: 1},
+            "Процент качества, 3я четверть": 75.0,
+            "Процент качества, экзамен": 50.0,
+            "Процент успеваемости, 3-я четверть": 100.0,
+            "Процент успеваемости, экзамен": 75.0,
+            "Средний балл по предмету": 4.0,
+            "Средний балл за ВПР": 3.5,
+            "Среднее количество решенных задач": 3.75,
+            "Процент учащихся, повысивших свой результат": "0.0% (0 чел.)",
+            "Процент учащихся, понизивших свой результат": "50.0% (2 чел.)",
+            "Cамые распространенные ошибки": {
+                "Задание 1": "1 / 25.0%",
+                "Задание 2": "2 / 50.0%",
+                "Задание 4": "1 / 25.0%",
+                "Задание 5": "1 / 25.0%",
+            },
+            "Проверка достоверности результатов": "результат недостоверный, так как кол-во неявившихся учеников > 25%; "
+                                                  "отличие средних баллов и предыдущей четверти >= 0.5 баллов",
+        })
+
+    def test_single_student(self):
+        self.assertEqual(get_class_report(SINGLE), {
+            "Учащихся по списку": 1,
+            "Учащиеся, присутствующие на экзамене": 1,
+            "Список учеников с оценками": [{"student_name": "Иванов", "exam_mark": 3, "exam_points": 3}],
+            "Оценки за 3-ю четверть": {3: 1},
+            "Оценки за ВПР": {3: 1},
+            "Процент качества, 3я четверть": 0.0,
+            "Процент качества, экзамен": 0.0,
+            "Процент успеваемости, 3-я четверть": 100.0,
+            "Процент успеваемости, экзамен": 100.0,
+            "Средний балл по предмету": 3.0,
+            "Средний балл за ВПР": 3.0,
+            "Среднее количество решенных задач": 2.0,
+            "Процент учащихся, повысивших свой результат": "0.0% (0 чел.)",
+            "Процент учащихся, понизивших свой результат": "0.0% (0 чел.)",
+            "Cамые распространенные ошибки": {"Задание 3": "1 / 100.0%"},
+            "Проверка достоверности результатов":
+                "результат недостоверный, так как на нижней границе 3-ки >= 25% учеников",
+        })
+
+    def test_all_students_absent(self):
+        self.assertEqual(get_class_report(ALL_ABSENT), {
+            "Учащихся по списку": 2,
+            "Учащиеся, присутствующие на экзамене": 0,
+            "Список учеников с оценками": [
+                {"student_name": "Петров", "exam_mark": "-", "exam_points": "-"},
+                {"student_name": "Смирнова", "exam_mark": "-", "exam_points": "-"},
+            ],
+            "Оценки за 3-ю четверть": {},
+            "Оценки за ВПР": {},
+            "Процент качества, 3я четверть": 0.0,
+            "Процент качества, экзамен": 0.0,
+            "Процент успеваемости, 3-я четверть": 0.0,
+            "Процент успеваемости, экзамен": 0.0,
+            "Средний балл по предмету": 0,
+            "Средний балл за ВПР": 0,
+            "Среднее количество решенных задач": 0,
+            "Процент учащихся, повысивших свой результат": "0.0% (0 чел.)",
+            "Процент учащихся, понизивших свой результат": "0.0% (0 чел.)",
+            "Cамые распространенные ошибки": "отсутствуют",
+            "Проверка достоверности результатов": "результат недостоверный, так как кол-во неявившихся учеников > 25%",
+        })
+
+    def test_mark_threshold_is_checked_only_if_given(self):
+        report = get_class_report(SINGLE, mark_3=None)
+        self.assertEqual(report["Проверка достоверности результатов"], "результат достоверный")
+
+
+class StorageTest(TestCase):
+    """
+    Results of a class are saved in the database and read back in the format of session data.
+    Результаты класса сохраняются в базе данных и читаются обратно в формате данных сессии.
+    """
+
+    def test_save_and_load(self):
+        session = dict(EXAM_MARKS, grade=5, exercises_count=5)
+        save_students_data(session, copy.deepcopy(CLASS))
+        self.assertEqual(load_students_data(session["class_group_id"], session["exam_wave_id"]), CLASS)
+        self.assertEqual(ExamWave.objects.get().points_for_4, 5)
+
+    def test_resubmit_replaces_results(self):
+        session = dict(EXAM_MARKS, grade=5, exercises_count=5)
+        save_students_data(session, copy.deepcopy(CLASS))
+        class_group_id, exam_wave_id = session["class_group_id"], session["exam_wave_id"]
+
+        session["points_for_3"] = 2
+        save_students_data(session, copy.deepcopy(SINGLE))
+        self.assertEqual((session["class_group_id"], session["exam_wave_id"]), (class_group_id, exam_wave_id))
+        self.assertEqual(ClassGroup.objects.count(), 1)
+        self.assertEqual(ExamWave.objects.get().points_for_3, 2)
+        self.assertEqual(StudentResult.objects.count(), 1)
+        self.assertEqual(TaskScore.objects.count(), 3)
+        self.assertEqual(WaveAggregate.objects.get().aggregates["total_count"], 1)
+        self.assertEqual(load_students_data(class_group_id, exam_wave_id), SINGLE)
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise SMTPException("сервер недоступен")
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend", VPR_OUTBOX_RETRY_DELAY=60)
+class OutboxTest(TestCase):
+    """
+    Mail of the contacts form is queued in the outbox and sent later in batches with retries.
+    Письма формы контактов ставятся в очередь и отправляются позже пачками с повторами.
+    """
+
+    def queue(self, count=1):
+        return [queue_mail(f"Тема {i}", "Текст", "from@example.com", ["to@example.com"]) for i in range(count)]
+
+    def test_contacts_form_queues_mail(self):
+        response = self.client.post(reverse("vpr:contacts"), {"name": "Учитель", "message": "Вопрос"})
+        self.assertRedirects(response, reverse("vpr:contacts"))
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboxMessage.objects.get().recipients, ["braynin-alex@mail.ru"])
+
+        self.assertEqual(send_outbox(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("Вопрос", mail.outbox[0].body)
+        self.assertIsNotNone(OutboxMessage.objects.get().sent_at)
+        self.assertEqual(send_outbox(), (0, 0))
+
+    def test_batch_size(self):
+        self.queue(3)
+        self.assertEqual(send_outbox(batch_size=2), (2, 0))
+        self.assertEqual(send_outbox(batch_size=2), (1, 0))
+        self.assertEqual([message.subject for message in mail.outbox], ["Тема 0", "Тема 1", "Тема 2"])
+
+    def test_retry_backoff(self):
+        self.assertEqual([get_retry_delay(attempts) for attempts in (1, 2, 3)],
+                         [timedelta(seconds=60), timedelta(seconds=120), timedelta(seconds=240)])
+        self.assertEqual(get_retry_delay(30), timedelta(days=1))
+
+        message, = self.queue()
+        with override_settings(EMAIL_BACKEND="vpr.tests.FailingEmailBackend"):
+            self.assertEqual(send_outbox(), (0, 1))
+            self.assertEqual(send_outbox(), (0, 0))
+        message.refresh_from_db()
+        self.assertEqual((message.attempts, message.last_error), (1, "сервер недоступен"))
+        self.assertGreater(message.next_attempt_at, timezone.now() + timedelta(seconds=50))
+
+        OutboxMessage.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(send_outbox(), (1, 0))
+
+    def test_failed_message_is_logged(self):
+        message, = self.queue()
+        OutboxMessage.objects.update(attempts=2)
+        with override_settings(EMAIL_BACKEND="vpr.tests.FailingEmailBackend"), \
+                self.assertLogs("vpr.outbox", "ERROR") as logs:
+            self.assertEqual(send_outbox(max_attempts=3), (0, 1))
+        self.assertIn(str(message.pk), logs.output[0])
+
+        OutboxMessage.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(send_outbox(max_attempts=3), (0, 0))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_claimed_messages_are_skipped(self):
+        self.queue(2)
+        claimed = _claim_messages(batch_size=1, max_attempts=5)
+        self.assertEqual(len(claimed), 1)
+        # another worker does not get the message being sent
+        # другой обработчик не получает отправляемое письмо
+        self.assertEqual([message.pk for message in _claim_messages(batch_size=5, max_attempts=5)],
+                         [message.pk for message in OutboxMessage.objects.exclude(pk=claimed[0].pk)])
+        self.assertEqual(_claim_messages(batch_size=5, max_attempts=5), [])
+
+
+def make_xlsx(sheets, workbook_order=None):
+    """
+    Returns an XLSX file with sheets {path: rows} of inline string cells, listed in the workbook in workbook_order.
+    Возвращает XLSX файл с листами {путь: строки} из ячеек со строками, перечисленными в книге в порядке
+    workbook_order.
+    """
+    main = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+    relationships = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+    file = io.BytesIO()
+    with zipfile.ZipFile(file, "w") as archive:
+        for path, rows in sheets.items():
+            cells = "".join(
+                "<row>" + "".join(f'<c t="inlineStr"><is><t>{value}</t></is></c>' for value in row) + "</row>"
+                for row in rows)
+            archive.writestr(path, f'<worksheet xmlns="{main}"><sheetData>{cells}</sheetData></worksheet>')
+        if workbook_order is not None:
+            sheet_list = "".join(f'<sheet name="Лист{i}" sheetId="{i}" r:id="rId{i}"/>'
+                                 for i in range(len(workbook_order)))
+            archive.writestr("xl/workbook.xml", f'<workbook xmlns="{main}" xmlns:r="{relationships}">'
+                                                f'<sheets>{sheet_list}</sheets></workbook>')
+            archive.writestr("xl/_rels/workbook.xml.rels",
+                             '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                             + "".join(f'<Relationship Id="rId{i}" Target="{path[3:]}"/>'
+                                       for i, path in enumerate(workbook_order)) + "</Relationships>")
+    file.seek(0)
+    return file
+
+
+class ImportersTest(SimpleTestCase):
+    """
+    Import of students from CSV and XLSX files.
+    Импорт учеников из CSV и XLSX файлов.
+    """
+    expected = [
+        {"student_name": "Иванов", "is_present": True, "third_quarter": 4, "task_1": 1, "task_2": 2},
+        {"student_name": "Петров", "is_present": False, "third_quarter": 3, "task_1": None, "task_2": None},
+    ]
+    rows = [["Ученик", "Присутствие", "3-я четверть", "Задание 1", "Задание 2"],
+            ["Иванов", "да", "4", "1", "2"],
+            ["Петров", "нет", "3", "", ""]]
+
+    def read_csv(self, text, encoding="utf-8", filename="class.csv"):
+        return read_students_file(io.BytesIO(text.encode(encoding)), filename)
+
+    def get_errors(self, text):
+        with self.assertRaises(StudentsImportError) as context:
+            self.read_csv(text)
+        return context.exception.errors
+
+    def test_csv_encodings(self):
+        for delimiter in (",", ";", "\t"):
+            text = "\r\n".join(delimiter.join(row) for row in self.rows)
+            for encoding in ("utf-8", "utf-8-sig", "cp1251"):
+                with self.subTest(delimiter=delimiter, encoding=encoding):
+                    self.assertEqual(self.read_csv(text, encoding), self.expected)
+
+    def test_english_header(self):
+        text = "student_name,is_present,third_quarter,task_2,task_1\nИванов,1,4,2,1\nПетров,0,3,,\n"
+        self.assertEqual(self.read_csv(text), self.expected)
+
+    def test_xlsx(self):
+        file = make_xlsx({"xl/worksheets/sheet1.xml": self.rows})
+        self.assertEqual(read_students_file(file, "class.xlsx"), self.expected)
+
+    def test_xlsx_first_sheet_from_workbook(self):
+        other = [["Ученик", "Задание 1"], ["Другой", "0"]]
+        sheets = {"xl/worksheets/sheet2.xml": self.rows, "xl/worksheets/sheet10.xml": other}
+        file = make_xlsx(sheets, workbook_order=["xl/worksheets/sheet2.xml", "xl/worksheets/sheet10.xml"])
+        self.assertEqual(read_students_file(file, "class.xlsx"), self.expected)
+
+        file = make_xlsx(sheets)
+        self.assertEqual(read_students_file(file, "class.xlsx"), self.expected)
+
+    def test_validation_errors(self):
+        text = "Ученик,Присутствие,3-я четверть,Задание 1,Задание 2\nИванов,может быть,6,3,\nПетров,да,4,1.5,x\n"
+        self.assertEqual(self.get_errors(text), [
+            "Строка 2, присутствие на экзамене: недопустимое значение «может быть»",
+            "Строка 2, Оценка за 3-ю четверть: значение должно быть от 2 до 5",
+            "Строка 2, Задание 1: значение должно быть от 0 до 2",
+            "Строка 3, Задание 1: введите целое число",
+            "Строка 3, Задание 2: введите целое число",
+        ])
+        self.assertEqual(self.get_errors("Ученик,Задание 1\nИванов,\n"),
+                         ["Строка 2, Оценка за 3-ю четверть: Укажите оценку", "Строка 2, Задание 1: Укажите балл"])
+
+    def test_file_errors(self):
+        with self.assertRaisesMessage(StudentsImportError, "Файл пуст"):
+            read_students_file(make_xlsx({"xl/worksheets/sheet1.xml": []}), "class.xlsx")
+        self.assertEqual(self.get_errors("Ученик,Присутствие\nИванов,да\n"),
+                         ["В файле нет колонок с заданиями (task_1, Задание 1, ...)"])
+        self.assertEqual(self.get_errors("Ученик,Задание 1\n"), ["В файле нет учеников"])
+        with self.assertRaises(StudentsImportError):
+            read_students_file(io.BytesIO(b"not a zip"), "class.xlsx")
+        with self.assertRaises(StudentsImportError):
+            read_students_file(io.BytesIO(b""), "class.pdf")
+
+
+class VerificationRulesTest(SimpleTestCase):
+    """
+    Each default verification rule fires on its own class, compiled rule sets are cached.
+    Каждое правило проверки по умолчанию срабатывает на своем классе, скомпилированные наборы правил кешируются.
+    """
+    classes = {
+        "результат достоверный": [
+            make_student("Иванов", 4, [2, 2, 1], 4), make_student("Петров", 4, [2, 2, 1], 4),
+            make_student("Попов", 4, [2, 1, 2], 4), make_student("Кузнецов", 4, [1, 2, 2], 4),
+        ],
+        "результат недостоверный, так как кол-во неявившихся учеников > 25%": [
+            make_student("Иванов", 4, [2, 2, 1], 4), make_student("Петров", 4, [2, 2, 1], 4),
+            make_student("Попов", 4), make_student("Кузнецов", 5),
+        ],
+        "результат недостоверный, так как отличие средних баллов и предыдущей четверти >= 0.5 баллов": [
+            make_student("Иванов", 3, [2, 2, 2, 2], 5), make_student("Петров", 4, [2, 2, 1], 4),
+            make_student("Попов", 4, [2, 1, 2], 4), make_student("Кузнецов", 4, [1, 2, 2], 4),
+        ],
+        "результат недостоверный, так как на нижней границе 3-ки >= 25% учеников": [
+            make_student("Иванов", 3, [2, 1, 0], 3), make_student("Петров", 3, [2, 1, 0], 3),
+            make_student("Попов", 4, [2, 1, 2], 4), make_student("Кузнецов", 4, [1, 2, 2], 4),
+        ],
+    }
+
+    def test_default_rules(self):
+        for expected, students_data in self.classes.items():
+            with self.subTest(expected):
+                report = calculate_report({"students_data": students_data, "mark_3": 3})
+                self.assertEqual(report["verification_results"], expected)
+
+    def test_present_rule_measures_absent_students(self):
+        students_data = [make_student("Иванов", 4, [2, 2, 1], 4)] * 3 + [make_student("Петров", 4)]
+        report = calculate_report({"students_data": students_data, "mark_3": 3})
+        self.assertEqual(report["verification_results"], "результат достоверный")
+
+    def test_similar_answers_rule_is_disabled(self):
+        students_data = [make_student(f"Ученик {i}", 4, [2, 0, 1, 2, 0, 1, 1, 0, 2, 1, 0, 2], 4) for i in range(2)]
+        students_data += [make_student(f"Ученик {i}", 4, [i % 3, 1, 0, 2, i % 2, 0, 2, 1, 1, 0, 2, 1], 4)
+                          for i in range(2, 30)]
+        data = {"students_data": students_data, "mark_3": 3}
+        self.assertNotIn("маловероятно", calculate_report(data)["verification_results"])
+
+        data["verification_rules"] = [{"name": "similar_answers", "enabled": True}]
+        self.assertIn("маловероятно", calculate_report(data)["verification_results"])
+
+    def test_compiled_rule_sets_are_least_recently_used(self):
+        rule_sets = [get_rule_set([{"name": "present", "threshold": threshold}])
+                     for threshold in range(MAX_COMPILED_RULE_SETS)]
+        self.assertIs(get_rule_set([{"name": "present", "threshold": 0}]), rule_sets[0])
+
+        get_rule_set([{"name": "present", "threshold": MAX_COMPILED_RULE_SETS}])
+        self.assertIs(get_rule_set([{"name": "present", "threshold": 0}]), rule_sets[0])
+        self.assertIsNot(get_rule_set([{"name": "present", "threshold": 1}]), rule_sets[1])
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                                       "LOCATION": "vpr-tests-fragments"}})
+class ReportFragmentCacheTest(TestCase):
+    """
+    Cached fragments of the results page are keyed by the current data and rules.
+    Закешированные фрагменты страницы результатов зависят от текущих данных и правил.
+    """
+
+    def setUp(self):
+        caches["default"].clear()
+        start_session(self.client, CLASS)
+
+    def test_rules_change_is_shown(self):
+        self.assertContains(self.client.get(reverse("vpr:results")), "кол-во неявившихся учеников &gt; 25%")
+        with override_settings(VPR_VERIFICATION_RULES=[{"name": "present", "threshold": 50}]):
+            self.assertNotContains(self.client.get(reverse("vpr:results")), "неявившихся")
+
+    def test_data_change_is_shown(self):
+        self.assertContains(self.client.get(reverse("vpr:results")), "Кузнецов")
+        session = self.client.session
+        students_data = copy.deepcopy(CLASS)
+        students_data[3]["student_name"] = "Козлов"
+        save_students_data(session, students_data)
+        session.save()
+        response = self.client.get(reverse("vpr:results"))
+        self.assertContains(response, "Козлов")
+        self.assertNotContains(response, "Кузнецов")
+
+
+REPORT_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "vpr-tests-default"},
+    "reports": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "vpr-tests-reports"},
+}
+
+
+@override_settings(CACHES=REPORT_CACHES)
+class ReportCacheTest(SimpleTestCase):
+    """
+    Reports are cached by the fingerprint of their data, edits of one student patch the cached report.
+    Отчеты кешируются по отпечатку их данных, изменения одного ученика исправляют закешированный отчет.
+    """
+
+    def setUp(self):
+        for alias in REPORT_CACHES:
+            caches[alias].clear()
+
+    def get_data(self, students_data=CLASS, **kwargs):
+        return dict({"students_data": copy.deepcopy(students_data), "mark_3": 3}, **kwargs)
+
+    def test_cached_report(self):
+        session = {}
+        report = get_cached_report(self.get_data(), session)
+        self.assertEqual(report, get_report_and_aggregates(self.get_data())[0])
+        self.assertEqual(session[SESSION_FINGERPRINT_KEY], get_data_fingerprint(self.get_data()))
+        self.assertEqual(get_cached_report(self.get_data()), report)
+        self.assertEqual(get_report_cache_stats(), {"hits": 1, "misses": 1})
+
+    def test_fingerprint_is_stable(self):
+        reordered = [dict(reversed(list(student.items()))) for student in CLASS]
+        self.assertEqual(get_data_fingerprint(self.get_data()), get_data_fingerprint(self.get_data(reordered)))
+        self.assertEqual(get_data_fingerprint(self.get_data()),
+                         get_data_fingerprint(self.get_data(verification_rules=[])))
+
+    def test_fingerprint_changes_with_data_and_rules(self):
+        changed = copy.deepcopy(CLASS)
+        changed[0]["task_1"] = 2
+        fingerprints = {
+            get_data_fingerprint(self.get_data()),
+            get_data_fingerprint(self.get_data(changed)),
+            get_data_fingerprint(self.get_data(mark_3=4)),
+            get_data_fingerprint(self.get_data(verification_rules=[{"name": "present", "threshold": 30}])),
+        }
+        self.assertEqual(len(fingerprints), 4)
+
+    def test_update_cached_report(self):
+        new_student = make_student("Петров", 3, [2, 1, 1, 0, 1], 3)
+        expected_data = self.get_data()
+        expected_data["students_data"][1] = new_student
+        expected = get_report_and_aggregates(expected_data)[0]
+
+        for cached in (True, False):
+            with self.subTest(cached=cached):
+                session, data = {}, self.get_data()
+                get_cached_report(data, session)
+                if not cached:
+                    caches["default"].clear()
+                old_fingerprint = session[SESSION_FINGERPRINT_KEY]
+
+                self.assertEqual(update_cached_report(session, data, 1, copy.deepcopy(new_student)), expected)
+                self.assertEqual(session[SESSION_FINGERPRINT_KEY], get_data_fingerprint(expected_data))
+                self.assertIsNone(caches["default"].get(REPORT_KEY_PREFIX + old_fingerprint))
+                self.assertEqual(get_cached_report(expected_data), expected)
+
+    @override_settings(VPR_REPORT_CACHE="reports")
+    def test_cache_alias(self):
+        fingerprint = get_data_fingerprint(self.get_data())
+        get_cached_report(self.get_data())
+        self.assertIsNotNone(caches["reports"].get(REPORT_KEY_PREFIX + fingerprint))
+        self.assertIsNone(caches["default"].get(REPORT_KEY_PREFIX + fingerprint))
+
+    @override_settings(VPR_REPORT_CACHE_TIMEOUT=0)
+    def test_cache_timeout(self):
+        get_cached_report(self.get_data())
+        get_cached_report(self.get_data())
+        self.assertEqual(get_report_cache_stats(), {"hits": 0, "misses": 2})
+
+
+class ReportAPITest(TestCase):
+    """
+    Reports of the session and of saved classes are returned in JSON and NDJSON with English metric keys.
+    Отчеты сессии и сохраненных классов возвращаются в JSON и NDJSON с английскими ключами метрик.
+    """
+
+    def setUp(self):
+        self.session = start_session(self.client, CLASS)
+        # the report as it reads back from JSON, e.g. with string keys of mark counters
+        # отчет в том виде, в котором он читается из JSON, например, со строковыми ключами счетчиков оценок
+        self.report = json.loads(json.dumps(calculate_report({"students_data": CLASS, "mark_3": 3})))
+
+    def login(self):
+        user = User.objects.create_user("teacher")
+        user.user_permissions.add(Permission.objects.get(codename="view_studentresult"))
+        self.client.force_login(user)
+
+    def test_report_json(self):
+        response = self.client.get(reverse("vpr:report_json"))
+        self.assertEqual(response.json(), self.report)
+
+        response = self.client.get(reverse("vpr:report_json"), {"metrics": "quality_exam,success_exam"})
+        self.assertEqual(response.json(), {"quality_exam": 50.0, "success_exam": 75.0})
+
+    def test_report_json_unknown_metric(self):
+        with self.assertLogs("django.request", "WARNING"):
+            response = self.client.get(reverse("vpr:report_json"), {"metrics": "quality_exam,unknown"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "Неизвестная метрика: unknown"})
+
+    def test_report_json_without_data(self):
+        self.client.logout()
+        with self.assertLogs("django.request", "WARNING"):
+            self.assertEqual(self.client.get(reverse("vpr:report_json")).status_code, 404)
+
+    def test_saved_classes(self):
+        other_session = dict(EXAM_MARKS, grade=6, exercises_count=3)
+        save_students_data(other_session, copy.deepcopy(SINGLE))
+        classes = list(iter_saved_classes())
+        self.assertEqual([(item["class_group_id"], item["grade"], item["students_data"]) for item in classes],
+                         [(self.session["class_group_id"], 5, CLASS), (other_session["class_group_id"], 6, SINGLE)])
+        self.assertEqual(len(list(iter_saved_classes(other_session["exam_wave_id"]))), 1)
+
+    def test_reports_ndjson(self):
+        self.assertEqual(self.client.get(reverse("vpr:reports_ndjson")).status_code, 302)
+
+        self.login()
+        response = self.client.get(reverse("vpr:reports_ndjson"))
+        self.assertEqual(response["Content-Type"], "application/x-ndjson; charset=utf-8")
+        lines = b"".join(response.streaming_content).decode("utf-8").splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [{
+            "class_group_id": self.session["class_group_id"],
+            "exam_wave_id": self.session["exam_wave_id"],
+            "grade": 5,
+            "report": self.report,
+        }])
+
+        response = self.client.get(reverse("vpr:reports_ndjson"), {"exam_wave": self.session["exam_wave_id"] + 1})
+        self.assertEqual(b"".join(response.streaming_content), b"")
+
+    def test_reports_ndjson_invalid_exam_wave(self):
+        self.login()
+        with self.assertLogs("django.request", "WARNING"):
+            response = self.client.get(reverse("vpr:reports_ndjson"), {"exam_wave": "first"})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(VPR_PROFILING=True, MIDDLEWARE=settings.MIDDLEWARE + ["vpr.middleware.ReportProfilingMiddleware"],
+                   CACHES=REPORT_CACHES)
+class ProfilingTest(TestCase):
+    """
+    Reports calculated during a request are profiled into the Server-Timing header, the log and the metrics view.
+    Отчеты, рассчитанные во время запроса, профилируются в заголовок Server-Timing, лог и представление метрик.
+    """
+
+    def setUp(self):
+        caches["default"].clear()
+        profiling_registry.clear()
+        self.session = start_session(self.client, CLASS)
+
+    def test_server_timing(self):
+        with self.assertLogs("vpr.profiling", "INFO") as logs:
+            response = self.client.get(reverse("vpr:results"))
+        self.assertIn("metric-quality_exam;dur=", response["Server-Timing"])
+        self.assertIn("intermediate-aggregates;dur=", response["Server-Timing"])
+        self.assertIn('"path": "/vpr/results/"', logs.output[0])
+        self.assertEqual(profiling_registry.reports, 1)
+
+    @override_settings(VPR_PROFILING=False)
+    def test_disabled(self):
+        self.assertNotIn("Server-Timing", self.client.get(reverse("vpr:results")))
+        self.assertEqual(profiling_registry.reports, 0)
+
+    def test_streaming_response_is_profiled_until_sent(self):
+        user = User.objects.create_user("teacher")
+        user.user_permissions.add(Permission.objects.get(codename="view_studentresult"))
+        self.client.force_login(user)
+
+        response = self.client.get(reverse("vpr:reports_ndjson"))
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(profiling_registry.reports, 0)
+        with self.assertLogs("vpr.profiling", "INFO"):
+            self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 1)
+        self.assertEqual(profiling_registry.reports, 1)
+        self.assertIn(("metric", "quality_exam"), profiling_registry.timings)
+
+    def test_metrics_view(self):
+        self.client.get(reverse("vpr:results"))
+        response = self.client.get(reverse("vpr:profiling_metrics"))
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        content = response.content.decode("utf-8")
+        self.assertIn("vpr_profiled_reports_total 1\n", content)
+        self.assertIn('vpr_report_step_calls_total{kind="metric",name="quality_exam"} 1\n', content)
+
+    @override_settings(VPR_METRICS_ALLOWED_IPS=("10.0.0.1",))
+    def test_metrics_view_allowed_ips(self):
+        with self.assertLogs("django.request", "WARNING"):
+            self.assertEqual(self.client.get(reverse("vpr:profiling_metrics")).status_code, 404)
+        self.assertEqual(self.client.get(reverse("vpr:profiling_metrics"), REMOTE_ADDR="10.0.0.1").status_code, 200)
+
+
+@override_settings(CACHES=REPORT_CACHES)
+class ResultsSnapshotTest(TestCase):
+    """
+    The results page and its standalone snapshot are rendered once per report and served from the fragment cache.
+    Страница результатов и ее отдельный снимок отображаются один раз на отчет и отдаются из кеша фрагментов.
+    """
+
+    def setUp(self):
+        caches["default"].clear()
+        start_session(self.client, CLASS)
+        self.fingerprint = get_data_fingerprint({"students_data": CLASS, "mark_3": 3})
+
+    def test_fragment_cache(self):
+        first = self.client.get(reverse("vpr:results"))
+        self.assertIsNotNone(caches["default"].get(make_template_fragment_key("vpr_report", [self.fingerprint])))
+        second = self.client.get(reverse("vpr:results"))
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(get_report_cache_stats(), {"hits": 0, "misses": 1})
+
+    def test_results_page(self):
+        response = self.client.get(reverse("vpr:results"))
+        self.assertContains(response, reverse("vpr:student_edit", args=[1]))
+        self.assertContains(response, reverse("vpr:results_snapshot"))
+
+    def test_snapshot_download(self):
+        response = self.client.get(reverse("vpr:results_snapshot"))
+        self.assertEqual(response["Content-Disposition"],
+                         f'attachment; filename="vpr_report_{self.fingerprint[:12]}.html"')
+        self.assertContains(response, "@page { size: A4;")
+        self.assertContains(response, "Сидорова")
+        self.assertNotContains(response, reverse("vpr:student_edit", args=[1]))
+        self.assertIsNotNone(caches["default"].get(make_template_fragment_key("vpr_report_snapshot",
+                                                                              [self.fingerprint])))
+
+    def test_export_snapshots(self):
+        session = self.client.session
+        with tempfile.TemporaryDirectory() as directory:
+            call_command("export_snapshots", output_dir=directory, stdout=io.StringIO())
+            file_name = f"class_{session['class_group_id']}_wave_{session['exam_wave_id']}.html"
+            self.assertEqual(os.listdir(directory), [file_name])
+            with open(os.path.join(directory, file_name), encoding="utf-8") as snapshot:
+                self.assertEqual(snapshot.read(), self.client.get(reverse("vpr:results_snapshot")).content.decode())
+
+
+class ClassAggregatesTest(SimpleTestCase):
+    """
+    Incremental updates of class aggregates compared with aggregates built again from all students.
+    Инкрементальные обновления агрегатов класса в сравнении с агрегатами, построенными заново по всем ученикам.
+    """
+
+    def assert_replaced(self, index, new_student):
+        students_data = copy.deepcopy(CLASS)
+        aggregates = Students(students_data).aggregates
+        aggregates.replace_student(students_data[index], new_student)
+
+        students_data[index] = new_student
+        self.assertEqual(aggregates.to_dict(), Students(students_data).aggregates.to_dict())
+
+    def test_replace_task_score(self):
+        self.assert_replaced(0, make_student("Иванов", 4, [2, 2, 2, 1, 1], 5))
+
+    def test_replace_present_with_absent(self):
+        self.assert_replaced(3, make_student("Кузнецов", 3))
+
+    def test_replace_absent_with_present(self):
+        self.assert_replaced(1, make_student("Петров", 3, [0, 1, 0, 2, 0], 2))
+
+    def test_report_from_replaced_aggregates(self):
+        students_data = copy.deepcopy(CLASS)
+        aggregates = Students(students_data).aggregates
+        new_student = make_student("Смирнова", 4, [2, 2, 1, 0, 0], 4)
+        aggregates.replace_student(students_data[4], new_student)
+        students_data[4] = new_student
+        self.assertEqual(get_report({"students_data": students_data, "mark_3": 3}, aggregates=aggregates),
+                         get_class_report(students_data))
+
+    def test_round_trip(self):
+        aggregates = Students(CLASS).aggregates
+        self.assertEqual(ClassAggregates.from_dict(aggregates.to_dict()).to_dict(), aggregates.to_dict())
+
+
+class MarksTest(SimpleTestCase):
+    """
+    Assignment of exam marks by the lower points boundaries of marks.
+    Назначение оценок за экзамен по нижним границам баллов оценок.
+    """
+
+    def test_grade_scores(self):
+        scores = [[0, 0, 0], [1, 1, 0], [1, 1, 1], [2, 2, 0], [2, 2, 1], [2, 2, 2], [2, 2, 2, 2]]
+        self.assertEqual(grade_scores(scores, [3, 5, 8]), [2, 2, 3, 3, 4, 4, 5])
+
+    def test_grade_scores_with_weights_and_marks(self):
+        self.assertEqual(grade_scores([[1, 0], [0, 1], [1, 1]], [2], weights=[1, 2], marks=["незачет", "зачет"]),
+                         ["незачет", "зачет", "зачет"])
+        with self.assertRaises(ValueError):
+            grade_scores([[1]], [2, 3], marks=[2, 3])
+
+    def test_add_marks_to_students(self):
+        students_data = copy.deepcopy(CLASS)
+        for student in students_data:
+            student.pop("exam_mark", None)
+        students_data = add_marks_to_students(students_data, EXAM_MARKS)
+        self.assertEqual(students_data, CLASS)
+
+    def test_add_marks_to_absent_students(self):
+        self.assertEqual(add_marks_to_students(copy.deepcopy(ALL_ABSENT), EXAM_MARKS), ALL_ABSENT)
+
+
+class RegionalTest(SimpleTestCase):
+    """
+    School and region reports from merged aggregates equal reports of the merged students.
+    Отчеты школ и региона по объединенным агрегатам равны отчетам объединенных учеников.
+    """
+
+    def setUp(self):
+        self.region = generate_region(3, 4, rng=random.Random(1), students_count=12, tasks_count=6)
+        for school in self.region:
+            for class_data in school:
+                class_data["students_data"] = add_marks_to_students(class_data["students_data"],
+                                                                    get_exam_marks(class_data))
+        self.mark_3 = self.region[0][0]["points_for_3"]
+
+    def get_merged_report(self, classes):
+        report = calculate_report({"students_data": merge_classes(classes)["students_data"], "mark_3": self.mark_3})
+        report.pop("list_students_and_marks")
+        return report
+
+    def test_region_reports(self):
+        reports = get_region_reports(self.region, self.mark_3, max_workers=1)
+        self.assertEqual(reports["schools"], [self.get_merged_report(school) for school in self.region])
+        self.assertEqual(reports["region"], self.get_merged_report([c for school in self.region for c in school]))
+        self.assertEqual(get_region_reports(self.region, self.mark_3, max_workers=2), reports)
+
+    def test_merge_order(self):
+        classes = [class_data for school in self.region for class_data in school]
+        partials = [Students(class_data["students_data"]).aggregates for class_data in classes]
+        merged = ClassAggregates.combine(partials).to_dict()
+        self.assertEqual(ClassAggregates.combine(reversed(partials)).to_dict(), merged)
+        self.assertEqual(ClassAggregates.combine([ClassAggregates.combine(partials[:5]),
+                                                  ClassAggregates.combine(partials[5:])]).to_dict(), merged)
+
+    def test_report_from_aggregates(self):
+        self.assertNotIn("list_students_and_marks", calculate_aggregates_report(Students(CLASS).aggregates, 3))
+        self.assertEqual(calculate_aggregates_report(Students(CLASS).aggregates, 3, metrics=["quality_exam"]),
+                         {"quality_exam": 50.0})
+
+    def test_different_tasks(self):
+        with self.assertRaises(ValueError):
+            ClassAggregates.combine([Students(CLASS).aggregates, Students(SINGLE).aggregates])
+
+
+class StudentsDataFormTest(SimpleTestCase):
+    """
+    Form classes of the students table are built once per tasks count, the task grid renders like NumberInput.
+    Классы форм таблицы учеников создаются один раз на количество заданий, таблица заданий выводится как NumberInput.
+    """
+
+    def get_formset_data(self, *students):
+        data = {"form-TOTAL_FORMS": str(len(students)), "form-INITIAL_FORMS": "0"}
+        for index, student in enumerate(students):
+            data.update((f"form-{index}-{key}", value) for key, value in student.items())
+        return data
+
+    def test_classes_are_cached(self):
+        formset_class = get_students_data_formset_class(5)
+        self.assertIs(get_students_data_formset_class(5), formset_class)
+        self.assertIsNot(get_students_data_formset_class(6), formset_class)
+        self.assertEqual([name for name in formset_class.form.base_fields if name.startswith("task_")],
+                         [f"task_{number}" for number in range(1, 6)])
+
+    def test_fields_of_other_tasks_count(self):
+        form_class = get_students_data_formset_class(5).form
+        self.assertEqual(len([name for name in form_class(exercises_count=3).fields if name.startswith("task_")]), 3)
+        self.assertIn("task_7", form_class(exercises_count=7).fields)
+        self.assertIn("task_2", StudentsDataForm(exercises_count=2).fields)
+
+    def test_task_score_input_render(self):
+        attrs = {"class": "form-control", "style": "width: 100px;"}
+        for value in (0, 2, None, "", "abc", '"><script>'):
+            for extra_attrs in (None, {"id": "id_form-0-task_1", "required": True, "disabled": False}):
+                with self.subTest(value=value, attrs=extra_attrs):
+                    self.assertHTMLEqual(TaskScoreInput(attrs).render("form-0-task_1", value, extra_attrs),
+                                         forms.NumberInput(attrs).render("form-0-task_1", value, extra_attrs))
+        self.assertEqual(TaskScoreInput(attrs).render("task_1", 1),
+                         forms.NumberInput(attrs).render("task_1", 1))
+
+    def test_task_score_field(self):
+        field = get_task_field(1)
+        self.assertEqual([field.clean(value) for value in ("0", "1", "2", " 2 ", "", None)], [0, 1, 2, 2, None, None])
+        for value in ("3", "-1", "два"):
+            with self.subTest(value), self.assertRaises(forms.ValidationError):
+                field.clean(value)
+
+    def test_formset(self):
+        formset_class = get_students_data_formset_class(2)
+        formset = formset_class(self.get_formset_data(
+            {"student_name": "Иванов", "is_present": "on", "third_quarter": "4", "task_1": "2", "task_2": "1"},
+            {"student_name": "", "third_quarter": "", "task_1": "", "task_2": ""},
+        ))
+        self.assertTrue(formset.is_valid(), formset.errors)
+        self.assertEqual(formset.cleaned_data[0], {"student_name": "Иванов", "is_present": True, "third_quarter": 4,
+                                                   "task_1": 2, "task_2": 1})
+        self.assertEqual(formset.cleaned_data[1]["student_name"], "Неизвестно")
+
+        formset = formset_class(self.get_formset_data({"student_name": "Иванов", "is_present": "on",
+                                                       "third_quarter": "4", "task_1": "2", "task_2": ""}))
+        self.assertEqual(formset.errors, [{"task_2": ["Укажите балл"]}])
+
+
+class TrendTest(TestCase):
+    """
+    Trends of classes, schools and students over exam waves ordered by their dates.
+    Тренды классов, школ и учеников по проведениям ВПР, упорядоченным по их датам.
+    """
+    # the class of CLASS in the next year: Иванов and Кузнецов improved, Петров came
+    # класс CLASS через год: Иванов и Кузнецов улучшили результат, Петров пришел
+    NEXT_CLASS = [
+        make_student("Иванов", 4, [2, 2, 2, 1, 1], 5),
+        make_student("Петров", 3, [1, 1, 1, 0, 0], 3),
+        make_student("Сидорова", 5, [2, 2, 2, 1, 1], 5),
+        make_student("Кузнецов", 3, [1, 1, 1, 0, 1], 3),
+        make_student("Смирнова", 4),
+        make_student("Попов", 4, [1, 1, 1, 1, 0], 3),
+    ]
+
+    def setUp(self):
+        self.school = School.objects.create(name="Школа 1")
+        self.class_group = ClassGroup.objects.create(school=self.school, grade=5)
+        # the later wave is saved first, waves are ordered by held_on
+        # более позднее проведение сохраняется первым, проведения упорядочиваются по held_on
+        self.next_wave = self.save_wave(self.class_group, date(2025, 4, 20), self.NEXT_CLASS)
+        self.first_wave = self.save_wave(self.class_group, date(2024, 4, 20), CLASS)
+
+    def save_wave(self, class_group, held_on, students_data):
+        exam_wave = ExamWave.objects.create(held_on=held_on, grade=class_group.grade, exercises_count=5, **EXAM_MARKS)
+        save_wave_results(class_group, exam_wave, copy.deepcopy(students_data))
+        return exam_wave
+
+    def test_slope(self):
+        self.assertEqual(get_slope([1, 2, None, 4]), 1.0)
+        self.assertEqual(get_slope([3, 1]), -2.0)
+        self.assertIsNone(get_slope([None, 2]))
+
+    def test_class_trend(self):
+        trend = get_class_trend(self.class_group.pk)
+        self.assertEqual([wave["exam_wave_id"] for wave in trend["waves"]], [self.first_wave.pk, self.next_wave.pk])
+        self.assertEqual([wave["quality_exam"] for wave in trend["waves"]], [50.0, 40.0])
+        self.assertEqual([wave["success_exam"] for wave in trend["waves"]], [75.0, 100.0])
+        self.assertEqual(trend["trends"]["quality_exam"], -10.0)
+        self.assertEqual(trend["trends"]["success_exam"], 25.0)
+        self.assertEqual([wave["task_solve_rates"]["task_1"] for wave in trend["waves"]], [0.75, 1.0])
+        self.assertEqual(trend["trends"]["tasks"]["task_1"], 0.25)
+
+    def test_school_trend(self):
+        other_class = ClassGroup.objects.create(school=self.school, grade=5, name="5Б")
+        other_students = [make_student("Орлов", 5, [2, 2, 2, 2, 2], 5)]
+        save_wave_results(other_class, self.first_wave, copy.deepcopy(other_students))
+
+        trend = get_school_trend(self.school.pk)
+        self.assertEqual([wave["exam_wave_id"] for wave in trend["waves"]], [self.first_wave.pk, self.next_wave.pk])
+        merged = ClassAggregates.combine([Students(CLASS).aggregates, Students(other_students).aggregates])
+        self.assertEqual(trend["waves"][0]["quality_exam"],
+                         calculate_aggregates_report(merged, metrics=["quality_exam"])["quality_exam"])
+        self.assertEqual(trend["waves"][0]["quality_exam"], 60.0)
+        self.assertEqual(trend["waves"][0]["present_count"], 5)
+
+    def test_student_trend(self):
+        student = Student.objects.get(class_group=self.class_group, name="Иванов")
+        trend = get_student_trend(student.pk)
+        self.assertEqual([(wave["exam_mark"], wave["exam_points"]) for wave in trend["waves"]], [(4, 5), (5, 8)])
+        self.assertEqual(trend["waves"][1]["task_scores"], {f"task_{i}": score
+                                                            for i, score in enumerate([2, 2, 2, 1, 1], 1)})
+        self.assertEqual(trend["trends"]["exam_points"], 3.0)
+
+        petrov = get_student_trend(Student.objects.get(class_group=self.class_group, name="Петров").pk)
+        self.assertEqual([wave["is_present"] for wave in petrov["waves"]], [False, True])
+        self.assertIsNone(petrov["trends"]["exam_mark"])
+
+    def test_held_on_is_kept_in_sync(self):
+        self.first_wave.held_on = date(2026, 4, 20)
+        self.first_wave.save()
+        self.assertEqual(set(WaveAggregate.objects.filter(exam_wave=self.first_wave).values_list("held_on", flat=True)),
+                         {date(2026, 4, 20)})
+        trend = get_class_trend(self.class_group.pk)
+        self.assertEqual([wave["exam_wave_id"] for wave in trend["waves"]], [self.next_wave.pk, self.first_wave.pk])
+        self.assertEqual(trend["trends"]["quality_exam"], 10.0)
+
+    def test_trend_views(self):
+        url = reverse("vpr:class_trend", args=[self.class_group.pk])
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        user = User.objects.create_user("teacher")
+        user.user_permissions.add(Permission.objects.get(codename="view_studentresult"))
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(url).json(), json.loads(json.dumps(get_class_trend(self.class_group.pk))))
+        with self.assertLogs("django.request", "WARNING"):
+            self.assertEqual(self.client.get(reverse("vpr:school_trend", args=[self.school.pk + 1])).status_code,
+                             404)
+
+
+class CommandLineTest(TestCase):
+    """
+    The command line tool, the import_students command and the web pages give the same reports of one file.
+    Инструмент командной строки, команда import_students и веб-страницы дают одинаковые отчеты по одному файлу.
+    """
+    # two of five present students are at the lower boundary of mark 3, so the mark threshold rule fires
+    # двое из пяти присутствующих учеников на нижней границе 3-ки, поэтому срабатывает правило порога оценки
+    students_data = CLASS[:4] + [make_student("Орлов", 3, [1, 1, 1, 0, 0], 3),
+                                 make_student("Волков", 3, [0, 1, 1, 1, 0], 3)]
+    options = ["--points-for-3", "3", "--points-for-4", "5", "--points-for-5", "8"]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.path = os.path.join(self.directory, "class.csv")
+        with open(self.path, "w", encoding="utf-8") as students_file:
+            students_file.write("student_name,is_present,third_quarter,task_1,task_2,task_3,task_4,task_5\n")
+            for student in self.students_data:
+                scores = [str(student.get(f"task_{i}", "")) for i in range(1, 6)] if student["is_present"] else [""] * 5
+                students_file.write(",".join([student["student_name"], "1" if student["is_present"] else "0",
+                                              str(student["third_quarter"])] + scores) + "\n")
+
+    def run_cli(self, *arguments):
+        output = os.path.join(self.directory, "output.json")
+        code = analytics_main([*arguments, *self.options, "--output", output])
+        with open(output, encoding="utf-8") as result:
+            return code, result.read()
+
+    def test_cli(self):
+        code, output = self.run_cli(self.path)
+        self.assertEqual(code, 0)
+        report = json.loads(output)
+        self.assertEqual(report, json.loads(json.dumps(calculate_report({"students_data": self.students_data,
+                                                                         "mark_3": 3}))))
+        self.assertEqual(report["verification_results"],
+                         "результат недостоверный, так как на нижней границе 3-ки >= 25% учеников")
+
+    def test_cli_several_files(self):
+        missing = os.path.join(self.directory, "missing.csv")
+        code, output = self.run_cli(self.path, missing)
+        self.assertEqual(code, 1)
+        results = {result["file"]: result for result in map(json.loads, output.splitlines())}
+        self.assertEqual(results[self.path]["report"], json.loads(self.run_cli(self.path)[1]))
+        self.assertEqual(len(results[missing]["errors"]), 1)
+
+    def test_import_students_command(self):
+        stdout = io.StringIO()
+        call_command("import_students", self.path, *self.options, stdout=stdout)
+        self.assertEqual(json.loads(stdout.getvalue()), json.loads(self.run_cli(self.path, "--russian")[1]))
+
+    def test_web_report_equals_cli(self):
+        self.client.post(reverse("vpr:grade_and_exam_settings"), {
+            "grade": 5, "students_count": len(self.students_data), "exercises_count": 5,
+            "points_for_3": 3, "points_for_4": 5, "points_for_5": 8,
+        })
+        with open(self.path, "rb") as students_file:
+            response = self.client.post(reverse("vpr:students_data_upload"), {"students_file": students_file})
+        self.assertRedirects(response, reverse("vpr:results"))
+
+        cli_report = json.loads(self.run_cli(self.path)[1])
+        self.assertEqual(self.client.get(reverse("vpr:report_json")).json(), cli_report)
+        self.assertContains(self.client.get(reverse("vpr:results")), "на нижней границе 3-ки &gt;= 25% учеников")
+
+
+class PackingTest(SimpleTestCase):
+    """
+    Students data packed for the session is restored exactly, with the order of keys.
+    Данные учеников, упакованные для сессии, восстанавливаются точно, с порядком ключей.
+    """
+
+    def assert_round_trip(self, students_data, compress):
+        packed = pack_students_data(students_data, compress=compress)
+        unpacked = unpack_students_data(packed)
+        self.assertEqual(unpacked, students_data)
+        self.assertEqual([list(student) for student in unpacked], [list(student) for student in students_data])
+        return packed
+
+    def test_round_trip(self):
+        for compress in (False, True):
+            with self.subTest(compress=compress):
+                packed = self.assert_round_trip(CLASS, compress)
+                self.assertNotIn("compressed", packed)
+                self.assertEqual(len(packed["schemas"]), 2)
+
+    def test_compressed_round_trip(self):
+        students_data = [make_student(f"Ученик {i}", 4, [i % 3] * 20, 4) for i in range(COMPRESS_MIN_SIZE // 20)]
+        self.assertIn("compressed", self.assert_round_trip(students_data, True))
+
+    def test_unpacked_data(self):
+        self.assertEqual(unpack_students_data(CLASS), CLASS)
+        self.assertIsNone(unpack_students_data(None))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            unpack_students_data({"format": 0, "schemas": [], "rows": []})
+
+
+class BoundarySimulatorTest(TestCase):
+    """
+    Simulated marks for candidate boundaries equal the marks and report metrics calculated in full.
+    Смоделированные оценки для вариантов границ равны оценкам и метрикам отчета, рассчитанным полностью.
+    """
+
+    def setUp(self):
+        self.students_data = generate_class(students_count=30, tasks_count=8, rng=random.Random(2))["students_data"]
+
+    def get_full_result(self, points_for_3, points_for_4, points_for_5):
+        exam_marks = {"points_for_3": points_for_3, "points_for_4": points_for_4, "points_for_5": points_for_5}
+        students_data = add_marks_to_students(copy.deepcopy(self.students_data), exam_marks)
+        report = calculate_report({"students_data": students_data, "mark_3": points_for_3},
+                                  metrics=["marks_exam", "quality_exam", "success_exam", "average_mark_exam",
+                                           "verification_results"])
+        return {
+            "marks_exam": dict(report["marks_exam"]),
+            "quality_exam": report["quality_exam"],
+            "success_exam": report["success_exam"],
+            "average_mark_exam": round(report["average_mark_exam"], 2),
+            "mark_threshold_verified": "на нижней границе 3-ки" not in report["verification_results"],
+        }
+
+    def test_simulate_equals_full_report(self):
+        simulator = BoundarySimulator(Students(self.students_data).aggregates)
+        for boundaries in get_boundaries_grid(range(2, 8), range(5, 11), range(9, 17)):
+            with self.subTest(boundaries=boundaries):
+                result = simulator.simulate(*boundaries)
+                result["marks_exam"] = {mark: count for mark, count in result["marks_exam"].items() if count}
+                expected = self.get_full_result(*boundaries)
+                self.assertEqual({key: result[key] for key in expected}, expected)
+
+    def test_boundaries_grid(self):
+        self.assertEqual(list(get_boundaries_grid([3, 5], [4, 5, 6], [5, 7])),
+                         [(3, 4, 5), (3, 4, 7), (3, 5, 7), (3, 6, 7), (5, 6, 7)])
+        self.assertEqual(list(get_boundaries_grid([8], [4], [9])), [])
+
+    def test_simulation_view(self):
+        start_session(self.client, CLASS)
+        response = self.client.get(reverse("vpr:boundary_simulation"),
+                                   {"points_for_3": "3", "points_for_4": "4-5", "points_for_5": "8"})
+        self.assertEqual(response.json()["present_count"], 4)
+        self.assertEqual([(result["points_for_4"], result["quality_exam"]) for result in response.json()["results"]],
+                         [(4, 75.0), (5, 50.0)])
+
+        with self.assertLogs("django.request", "WARNING"):
+            response = self.client.get(reverse("vpr:boundary_simulation"),
+                                       {"points_for_3": "5", "points_for_4": "4", "points_for_5": "x"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("points_for_5", response.json()["errors"])
+
+
+class ItemAnalysisTest(TestCase):
+    """
+    Item analysis of tasks compared with statistics calculated directly, merged and stored in the wave index.
+    Анализ заданий в сравнении со статистиками, рассчитанными напрямую, объединенный и сохраненный в индексе
+    проведения.
+    """
+
+    def get_expected_items(self, students_data):
+        present = [student for student in students_data if student["is_present"]]
+        totals = [sum(student[f"task_{i}"] for i in range(1, 6)) for student in present]
+        items = []
+        for i in range(1, 6):
+            scores = [student[f"task_{i}"] for student in present]
+            items.append({
+                "task": f"task_{i}",
+                "solve_rate": round(sum(score > 0 for score in scores) / len(scores), 4),
+                "partial_rate": round(scores.count(1) / len(scores), 4),
+                "mean_score": round(statistics.fmean(scores), 4),
+                "discrimination": round(statistics.correlation(scores, totals), 4) if len(set(scores)) > 1 else None,
+            })
+        return items
+
+    def assert_items_equal(self, items, expected):
+        for item, expected_item in zip(items, expected, strict=True):
+            self.assertEqual(item.keys(), expected_item.keys())
+            for key, value in expected_item.items():
+                if isinstance(value, float):
+                    self.assertAlmostEqual(item[key], value, places=3, msg=f"{item['task']} {key}")
+                else:
+                    self.assertEqual(item[key], value, f"{item['task']} {key}")
+
+    def test_items(self):
+        self.assert_items_equal(Students(CLASS).item_analysis.get_items(), self.get_expected_items(CLASS))
+        self.assertEqual(ItemAnalysis().get_items(), [])
+
+    def test_replace_student(self):
+        for index, new_student in ((0, make_student("Иванов", 4, [2, 2, 2, 1, 1], 5)),
+                                   (3, make_student("Кузнецов", 3)),
+                                   (1, make_student("Петров", 3, [0, 1, 0, 2, 0], 2))):
+            with self.subTest(index=index):
+                students_data = copy.deepcopy(CLASS)
+                analysis = Students(students_data).item_analysis
+                analysis.replace_student(students_data[index], new_student)
+                students_data[index] = new_student
+                self.assertEqual(analysis.to_dict(), Students(students_data).item_analysis.to_dict())
+
+    def test_merge_and_round_trip(self):
+        other = TrendTest.NEXT_CLASS
+        merged = ItemAnalysis.combine([Students(CLASS).item_analysis, Students(other).item_analysis])
+        self.assertEqual(merged.to_dict(), Students(CLASS + other).item_analysis.to_dict())
+        self.assertEqual(ItemAnalysis.from_dict(json.loads(json.dumps(merged.to_dict()))).to_dict(), merged.to_dict())
+        with self.assertRaises(ValueError):
+            merged.merge(Students(SINGLE).item_analysis)
+
+    def test_wave_index(self):
+        school = School.objects.create(name="Школа 1")
+        exam_wave = ExamWave.objects.create(grade=5, exercises_count=5, **EXAM_MARKS)
+        class_groups = [ClassGroup.objects.create(school=school, grade=5),
+                        ClassGroup.objects.create(grade=5, name="5Б")]
+        save_wave_results(class_groups[0], exam_wave, copy.deepcopy(CLASS))
+        save_wave_results(class_groups[1], exam_wave, copy.deepcopy(TrendTest.NEXT_CLASS))
+
+        analysis = get_wave_item_analysis(exam_wave.pk)
+        self.assertEqual((analysis["classes_count"], analysis["present_count"]), (2, 9))
+        self.assert_items_equal(analysis["tasks"], self.get_expected_items(CLASS + TrendTest.NEXT_CLASS))
+        self.assert_items_equal(get_wave_item_analysis(exam_wave.pk, school_id=school.pk)["tasks"],
+                                self.get_expected_items(CLASS))
+
+        new_student = make_student("Петров", 3, [0, 1, 0, 2, 0], 2)
+        update_student_result(class_groups[0].pk, exam_wave.pk, 2, new_student)
+        students_data = copy.deepcopy(CLASS)
+        students_data[1] = new_student
+        self.assert_items_equal(get_wave_item_analysis(exam_wave.pk, class_group_id=class_groups[0].pk)["tasks"],
+                                self.get_expected_items(students_data))
+
+    def test_index_is_filled_for_old_rows(self):
+        exam_wave = ExamWave.objects.create(grade=5, exercises_count=5, **EXAM_MARKS)
+        save_wave_results(ClassGroup.objects.create(grade=5), exam_wave, copy.deepcopy(CLASS))
+        WaveAggregate.objects.update(item_analysis={})
+
+        self.assert_items_equal(get_wave_item_analysis(exam_wave.pk)["tasks"], self.get_expected_items(CLASS))
+        self.assertEqual(ItemAnalysis.from_dict(WaveAggregate.objects.get().item_analysis).to_dict(),
+                         Students(CLASS).item_analysis.to_dict())
+
+
+class SimilarityTest(SimpleTestCase):
+    """
+    Pairs of students with improbably similar task scores: the banded search finds every near-identical pair
+    and p-values equal the chance of such an agreement.
+    Пары учеников с маловероятно похожими баллами за задания: поиск по полосам находит каждую почти совпадающую
+    пару, а p-значения равны вероятности такого совпадения.
+    """
+
+    def get_vectors(self, students_count, tasks_count, seed):
+        rng = random.Random(seed)
+        vectors = [(index, [rng.choice((0, 1, 2)) for _ in range(tasks_count)]) for index in range(students_count)]
+        # near copies of some works with up to 3 changed tasks
+        # почти копии некоторых работ с изменением до 3 заданий
+        for index in range(0, students_count, 4):
+            scores = list(vectors[index][1])
+            for task_index in rng.sample(range(tasks_count), rng.randint(0, 3)):
+                scores[task_index] = (scores[task_index] + 1) % 3
+            vectors.append((len(vectors), scores))
+        return vectors
+
+    def test_max_differences(self):
+        self.assertEqual([get_max_differences(tasks) for tasks in (5, 14, 15, 29, 30)], [0, 0, 1, 1, 2])
+
+    def test_recall(self):
+        # without the significance limit every pair within max_differences is reported, as by comparing all pairs
+        # без предела значимости выводится каждая пара в пределах max_differences, как при сравнении всех пар
+        vectors = self.get_vectors(80, 12, seed=3)
+        for max_differences in (0, 1, 2, 3, 12):
+            with self.subTest(max_differences=max_differences):
+                pairs = find_similar_pairs(vectors, max_differences, significance=float("inf"), max_pairs=10 ** 6)
+                expected = {frozenset((first[0], second[0])) for first, second in itertools.combinations(vectors, 2)
+                            if sum(a != b for a, b in zip(first[1], second[1])) <= max_differences}
+                self.assertEqual({frozenset((pair.first, pair.second)) for pair in pairs}, expected)
+                self.assertEqual(len(pairs), len(expected))
+
+    def test_p_value(self):
+        vectors = self.get_vectors(12, 5, seed=4)
+        columns = list(zip(*(scores for _, scores in vectors)))
+        probabilities = [{score: column.count(score) / len(column) for score in set(column)} for column in columns]
+
+        def get_chance(scores, agreements):
+            # the probability that a random student agrees with scores in at least agreements tasks, by enumeration
+            # вероятность, что случайный ученик совпадет с scores не менее чем в agreements заданиях, перебором
+            chance = 0.0
+            for work in itertools.product(*(task.items() for task in probabilities)):
+                if sum(score == other for (score, _), other in zip(work, scores)) >= agreements:
+                    chance += math.prod(probability for _, probability in work)
+            return chance
+
+        pairs = find_similar_pairs(vectors, 1, significance=float("inf"), max_pairs=10 ** 6)
+        self.assertTrue(pairs)
+        for pair in pairs:
+            first, second = vectors[pair.first][1], vectors[pair.second][1]
+            self.assertEqual(pair.differences, sum(a != b for a, b in zip(first, second)))
+            expected = max(get_chance(first, 5 - pair.differences), get_chance(second, 5 - pair.differences))
+            self.assertAlmostEqual(pair.p_value, expected)
+        self.assertEqual([pair.p_value for pair in pairs], sorted(pair.p_value for pair in pairs))
+
+    def test_copies_are_found_in_honest_class(self):
+        class_data = generate_class(students_count=25, tasks_count=20, absence_rate=0, rng=random.Random(5))
+        vectors = [(index, [student[f"task_{i}"] for i in range(1, 21)])
+                   for index, student in enumerate(class_data["students_data"])]
+        self.assertEqual(find_similar_pairs(vectors), [])
+
+        copied = list(vectors[7][1])
+        copied[0] = (copied[0] + 1) % 3
+        pairs = find_similar_pairs(vectors + [(25, copied)])
+        self.assertEqual([(pair.first, pair.second, pair.differences) for pair in pairs], [(7, 25, 1)])
+        self.assertLess(pairs[0].p_value, 0.001 / (26 * 25 / 2))
+
+
+class ArchiveTest(SimpleTestCase):
+    """
+    Classes read back from a results archive give the same reports as the written ones.
+    Классы, прочитанные из архива результатов, дают те же отчеты, что и записанные.
+    """
+
+    def test_round_trip(self):
+        classes = [
+            {"students_data": CLASS, "mark_3": 3, "school_id": 1},
+            {"students_data": [make_student("Иванов", 3, [2, 1, 0, 2, 0], 3)], "mark_3": 3, "school_id": 2},
+            {"students_data": ALL_ABSENT, "mark_3": 3, "school_id": 2},
+            {"students_data": [], "mark_3": 3, "school_id": 3},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "wave.vpra")
+            self.assertEqual(write_archive(path, classes), len(classes))
+
+            with ResultsArchive(path) as archive:
+                unread_class = archive[0]
+                datasets = list(archive.datasets())
+                self.assertEqual(len(archive), len(classes))
+                for class_data, dataset in zip(classes, datasets):
+                    self.assertEqual(dataset["school_id"], class_data["school_id"])
+                    self.assertEqual([student.student_name for student in dataset["students_data"]],
+                                     [student["student_name"] for student in class_data["students_data"]])
+                    self.assertEqual(calculate_report(dataset), calculate_report(class_data))
+                self.assertEqual([len(group) for group in archive.group_by("school_id")], [1, 2, 1])
+
+            with self.assertRaises(ValueError):
+                unread_class.columns
+
+    def test_different_tasks(self):
+        classes = [{"students_data": CLASS}, {"students_data": SINGLE}]
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaises(ValueError):
+                write_archive(os.path.join(directory, "wave.vpra"), classes)
+
+    def test_not_archive(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "wave.vpra")
+            with open(path, "wb") as archive_file:
+                archive_file.write(b"student_name;is_present\n")
+            with self.assertRaises(ValueError):
+                ResultsArchive(path)
@@ -0,0 +1,121 @@
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Sequence
+
+from vpr.analytics.aggregates import ClassAggregates
+from vpr.analytics.metrics_controller import calculate_aggregates_report
+from vpr.models import StudentResult, TaskScore, WaveAggregate
+
+
+TREND_METRICS = ("quality_exam", "success_exam", "average_mark_exam", "average_solved_exam_tasks")
+
+
+def get_slope(values: Sequence[Optional[float]]) -> Optional[float]:
+    """
+    Returns the least squares slope of values per wave, missing values are skipped.
+    Возвращает наклон прямой по методу наименьших квадратов на одно проведение, пропущенные значения не учитываются.
+    """
+    points = [(x, y) for x, y in enumerate(values) if y is not None]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    return round(sum((x - mean_x) * (y - mean_y) for x, y in points) / variance, 4)
+
+
+def summarize_wave(aggregates: ClassAggregates) -> Dict[str, Any]:
+    """
+    Returns the numbers followed by trends for one wave: main metrics, average points and solve rate of every task.
+    Возвращает показатели одного проведения, по которым строятся тренды: основные метрики, средний балл
+    и долю решивших каждое задание.
+    """
+    present_count = aggregates.present_count
+    summary = calculate_aggregates_report(aggregates, metrics=TREND_METRICS)
+    summary["present_count"] = present_count
+    summary["average_points"] = round(sum(points * count for points, count in aggregates.exam_points.items())
+                                      / present_count, 2) if present_count else 0
+    summary["task_solve_rates"] = {task: round(1 - mistakes / present_count, 4) if present_count else None
+                                   for task, mistakes in zip(aggregates.task_keys, aggregates.task_mistakes)}
+    return summary
+
+
+def get_trends(waves: List[Dict[str, Any]], metrics: Sequence[str], tasks_key: str) -> Dict[str, Any]:
+    """
+    Returns slopes of the metrics and of every task over time ordered waves.
+    Возвращает наклоны метрик и каждого задания по упорядоченным во времени проведениям.
+    """
+    tasks = dict.fromkeys(task for wave in waves for task in wave[tasks_key])
+    trends = {metric: get_slope([wave[metric] for wave in waves]) for metric in metrics}
+    trends["tasks"] = {task: get_slope([wave[tasks_key].get(task) for wave in waves]) for task in tasks}
+    return trends
+
+
+def get_class_trend(class_group_id: int) -> Dict[str, Any]:
+    """
+    Returns the results of a class in all its waves and their trends, read from the stored wave aggregates.
+    Возвращает результаты класса во всех его проведениях и их тренды, прочитанные из сохраненных агрегатов.
+    """
+    rows = (WaveAggregate.objects
+            .filter(class_group_id=class_group_id)
+            .select_related("exam_wave")
+            .order_by("held_on", "exam_wave_id"))
+    waves = [_get_wave_item(row.exam_wave, ClassAggregates.from_dict(row.aggregates)) for row in rows]
+    return {"class_group_id": class_group_id, "waves": waves,
+            "trends": get_trends(waves, TREND_METRICS + ("average_points",), "task_solve_rates")}
+
+
+def get_school_trend(school_id: int) -> Dict[str, Any]:
+    """
+    Returns the results of a school in every wave, merged from the stored aggregates of its classes, and their trends.
+    Возвращает результаты школы в каждом проведении, объединенные из сохраненных агрегатов ее классов, и их тренды.
+    """
+    rows = (WaveAggregate.objects
+            .filter(class_group__school_id=school_id)
+            .select_related("exam_wave")
+            .order_by("held_on", "exam_wave_id"))
+    exam_waves = {}
+    aggregates = defaultdict(ClassAggregates)
+    for row in rows:
+        exam_waves[row.exam_wave_id] = row.exam_wave
+        aggregates[row.exam_wave_id].merge(ClassAggregates.from_dict(row.aggregates))
+
+    waves = [_get_wave_item(exam_wave, aggregates[pk]) for pk, exam_wave in exam_waves.items()]
+    return {"school_id": school_id, "waves": waves,
+            "trends": get_trends(waves, TREND_METRICS + ("average_points",), "task_solve_rates")}
+
+
+def get_student_trend(student_id: int) -> Dict[str, Any]:
+    """
+    Returns marks, points and task scores of a student in all waves and their trends.
+    Возвращает оценки, баллы и баллы за задания ученика во всех проведениях и их тренды.
+    """
+    results = (StudentResult.objects
+               .filter(student_id=student_id)
+               .order_by("exam_wave__held_on", "exam_wave_id")
+               .values_list("exam_wave_id", "exam_wave__title", "exam_wave__held_on", "is_present",
+                            "third_quarter", "exam_mark", "exam_points"))
+    scores = defaultdict(dict)
+    for exam_wave_id, task_number, points in (TaskScore.objects
+                                              .filter(student_result__student_id=student_id)
+                                              .values_list("student_result__exam_wave_id", "task_number", "points")):
+        scores[exam_wave_id][f"task_{task_number}"] = points
+
+    waves = []
+    for exam_wave_id, title, held_on, is_present, third_quarter, exam_mark, exam_points in results:
+        waves.append({
+            "exam_wave_id": exam_wave_id,
+            "title": title,
+            "held_on": held_on.isoformat(),
+            "is_present": is_present,
+            "third_quarter": third_quarter,
+            "exam_mark": exam_mark,
+            "exam_points": exam_points,
+            "task_scores": scores.get(exam_wave_id, {}),
+        })
+    return {"student_id": student_id, "waves": waves,
+            "trends": get_trends(waves, ("exam_mark", "exam_points"), "task_scores")}
+
+
+def _get_wave_item(exam_wave, aggregates: ClassAggregates) -> Dict[str, Any]:
+    return {"exam_wave_id": exam_wave.pk, "title": str(exam_wave), "held_on": exam_wave.held_on.isoformat(),
+            **summarize_wave(aggregates)}
@@ -1,13 +1,31 @@
 from django.urls import path
 from .views import (GradeAndExamInputView, StudentsDataInputView, ResultsAnalysisView, instructions_view, ContactsView,
-                    about_view)
+                    about_view, StudentsDataUploadView, StudentEditView, ReportJSONView,
+                    ReportsNDJSONView, ResultsSnapshotView, profiling_metrics_view, TrendView,
+                    BoundarySimulationView, WaveBoundarySimulationView, ItemAnalysisView, WaveItemAnalysisView,
+                    WaveSimilarityView)
+from .trends import get_class_trend, get_school_trend, get_student_trend
 
 app_name = "vpr"
 
 urlpatterns = [
     path('', GradeAndExamInputView.as_view(), name='grade_and_exam_settings'),
     path('students_data/', StudentsDataInputView.as_view(), name='students_data_input'),
+    path('students_data/upload/', StudentsDataUploadView.as_view(), name='students_data_upload'),
     path('results/', ResultsAnalysisView.as_view(), name='results'),
+    path('results/snapshot/', ResultsSnapshotView.as_view(), name='results_snapshot'),
+    path('results/students/<int:position>/', StudentEditView.as_view(), name='student_edit'),
+    path('api/report/', ReportJSONView.as_view(), name='report_json'),
+    path('api/reports/', ReportsNDJSONView.as_view(), name='reports_ndjson'),
+    path('api/trends/classes/<int:pk>/', TrendView.as_view(get_trend=get_class_trend), name='class_trend'),
+    path('api/trends/schools/<int:pk>/', TrendView.as_view(get_trend=get_school_trend), name='school_trend'),
+    path('api/trends/students/<int:pk>/', TrendView.as_view(get_trend=get_student_trend), name='student_trend'),
+    path('api/simulate/', BoundarySimulationView.as_view(), name='boundary_simulation'),
+    path('api/simulate/waves/<int:pk>/', WaveBoundarySimulationView.as_view(), name='wave_boundary_simulation'),
+    path('api/items/', ItemAnalysisView.as_view(), name='item_analysis'),
+    path('api/items/waves/<int:pk>/', WaveItemAnalysisView.as_view(), name='wave_item_analysis'),
+    path('api/similarity/waves/<int:pk>/', WaveSimilarityView.as_view(), name='wave_similarity'),
+    path('metrics/', profiling_metrics_view, name='profiling_metrics'),
     path('instructions/', instructions_view, name='instructions'),
     path('contacts/', ContactsView.as_view(), name='contacts'),
     path('about/', about_view, name='about'),
@@ -22,11 +22,35 @@ def process_students_data(session, formset) -> List[Dict[str, Any]]:
     Обрабатывает данные учеников и назначает им оценки.
     """
     students_cleaned_data = [form.cleaned_data for form in formset]
-    exam_marks = {f"points_for_{i}": session.get(f"points_for_{i}") for i in range(3, 6)}
-    students_data = add_marks_to_students(students_cleaned_data, exam_marks)
+    students_data = add_marks_to_students(students_cleaned_data, get_exam_marks(session))
     return students_data
 
 
+def process_imported_students_data(session, students_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Assigns marks to students imported from a file and updates the class data in the session.
+    Назначает оценки ученикам, импортированным из файла, и обновляет данные о классе в сессии.
+    """
+    session["students_count"] = len(students_data)
+    return add_marks_to_students(students_data, get_exam_marks(session))
+
+
+def process_edited_student_data(session, cleaned_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Assigns a mark to one corrected student.
+    Назначает оценку одному исправленному ученику.
+    """
+    return add_marks_to_students([cleaned_data], get_exam_marks(session))[0]
+
+
+def get_exam_marks(session) -> Dict[str, int]:
+    """
+    Returns the lower points boundaries of exam marks from the session.
+    Возвращает из сессии нижние границы баллов для оценок за экзамен.
+    """
+    return {f"points_for_{i}": session.get(f"points_for_{i}") for i in range(3, 6)}
+
+
 def get_students_names(session) -> List[Dict[str, str]]:
     """
     Generates a list of student names based on grade and student count.
@@ -0,0 +1,73 @@
+import json
+import os
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+from vpr.analytics.aggregates import ClassAggregates
+from vpr.analytics.rules import RuleSet, get_rule_set
+from vpr.models import WaveAggregate
+
+
+def get_verification_rules(region: str = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    Returns overrides of the default verification rules: VPR_VERIFICATION_RULES for all classes, then
+    VPR_REGION_VERIFICATION_RULES[region] for classes of the region. Both may be lists of rules or paths
+    to JSON files with them, None means the default rules.
+    Возвращает переопределения правил проверки по умолчанию: VPR_VERIFICATION_RULES для всех классов, затем
+    VPR_REGION_VERIFICATION_RULES[region] для классов региона. Оба могут быть списками правил или путями
+    к JSON файлам с ними, None означает правила по умолчанию.
+    """
+    rules = _load_rules(getattr(settings, "VPR_VERIFICATION_RULES", None))
+    if region:
+        rules += _load_rules(getattr(settings, "VPR_REGION_VERIFICATION_RULES", {}).get(region))
+    return rules or None
+
+
+def verify_saved_classes(exam_wave_id: int = None, rules: List[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Re-verifies saved classes from their stored aggregates without reading the scores, rules are compiled
+    once per region and updated by rules if they are given.
+    Повторно проверяет сохраненные классы по их сохраненным агрегатам без чтения баллов, правила компилируются
+    один раз на регион и обновляются правилами rules, если они заданы.
+    """
+    rows = WaveAggregate.objects.order_by("exam_wave_id", "class_group_id")
+    if exam_wave_id is not None:
+        rows = rows.filter(exam_wave_id=exam_wave_id)
+    rows = rows.values_list("class_group_id", "exam_wave_id", "class_group__school__region",
+                            "exam_wave__points_for_3", "aggregates")
+
+    rule_sets: Dict[str, RuleSet] = {}
+    for class_group_id, wave_id, region, points_for_3, aggregates in rows.iterator():
+        if region not in rule_sets:
+            rule_sets[region] = get_rule_set((get_verification_rules(region) or []) + (rules or []))
+        yield {
+            "class_group_id": class_group_id,
+            "exam_wave_id": wave_id,
+            "region": region,
+            "fired": rule_sets[region].evaluate(ClassAggregates.from_dict(aggregates), points_for_3),
+        }
+
+
+def _load_rules(rules) -> List[Dict[str, Any]]:
+    if isinstance(rules, str):
+        return _load_rules_file(rules)
+    return list(rules or ())
+
+
+def _load_rules_file(path: str) -> List[Dict[str, Any]]:
+    """
+    Reads a JSON file of rules once and again only after it is changed, as rules are needed by every report.
+    Читает JSON файл правил один раз и повторно только после его изменения, так как правила нужны каждому отчету.
+    """
+    modified = os.stat(path).st_mtime_ns
+    cached = _rules_files.get(path)
+    if cached is None or cached[0] != modified:
+        with open(path, encoding="utf-8") as rules_file:
+            cached = _rules_files[path] = (modified, json.load(rules_file))
+    return list(cached[1])
+
+
+# Rules read from JSON files by path: (modification time, rules)
+# Правила, прочитанные из JSON файлов, по пути: (время изменения, правила)
+_rules_files: Dict[str, Tuple[int, List[Dict[str, Any]]]] = {}
@@ -1,13 +1,28 @@
-from django.forms import formset_factory
+from django.conf import settings
+from django.contrib.auth.mixins import PermissionRequiredMixin
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.views import View
 from django.views.generic import FormView, TemplateView
-from django.core.mail import send_mail
 from django.urls import reverse_lazy
+from django.utils.functional import SimpleLazyObject
 from django.contrib import messages
 
-from vpr.analytics.metrics_controller import get_report
-from vpr.forms import GradeAndExamForm, StudentsDataForm, EmailForm
-from vpr.utils import save_grade_exam_data, get_students_names, process_students_data, prepare_report_context
+from vpr.forms import GradeAndExamForm, StudentsDataForm, EmailForm, StudentsFileUploadForm, \
+    BoundarySimulationForm, get_students_data_formset_class
+from vpr.utils import save_grade_exam_data, get_students_names, process_students_data, prepare_report_context, \
+    process_imported_students_data, process_edited_student_data
+from vpr.analytics.metrics_controller import calculate_report
+from vpr.analytics.profiling import registry as profiling_registry
+from vpr.analytics.simulation import BoundarySimulator
+from vpr.analytics.student import Students
+from vpr.answer_similarity import get_wave_similar_pairs
+from vpr.item_index import get_wave_item_analysis
+from vpr.outbox import queue_mail
+from vpr.report_export import iter_saved_classes, iter_class_reports, to_ndjson_line
+from vpr.report_cache import get_cached_report, invalidate_cached_report, update_cached_report, \
+    get_data_fingerprint, get_report_cache_alias, get_report_cache_timeout
+from vpr.storage import save_students_data, get_report_data, update_student_data, load_wave_aggregates
 
 
 class GradeAndExamInputView(FormView):
@@ -48,34 +63,90 @@ class StudentsDataInputView(FormView):
         return context_data
 
     def get_formset(self):
-        """Creates and returns a formset for GET and POST requests.
-        Создаёт и возвращает formset для GET и POST запросов.
+        """Creates and returns a formset for GET and POST requests, once per request.
+        Создаёт и возвращает formset для GET и POST запросов, один раз за запрос.
         """
-        StudentsDataFormSet = formset_factory(self.form_class, extra=0)
+        if getattr(self, "formset", None) is not None:
+            return self.formset
+
         exercises_count = self.request.session.get('exercises_count', 1)
+        StudentsDataFormSet = get_students_data_formset_class(exercises_count)
 
         if self.request.method == 'POST':
-            return StudentsDataFormSet(self.request.POST, form_kwargs={'exercises_count': exercises_count})
-
-        return StudentsDataFormSet(
-            initial=get_students_names(self.request.session),
-            form_kwargs={'exercises_count': exercises_count})
+            self.formset = StudentsDataFormSet(self.request.POST)
+        else:
+            self.formset = StudentsDataFormSet(initial=get_students_names(self.request.session))
+        return self.formset
 
     def form_valid(self, form):
         """
-        Validates the formset, processes student data, and saves it to the session.
-        Проверяет formset, обрабатывает данные учеников и сохраняет их в сессии.
+        Validates the formset, processes student data, and saves it.
+        Проверяет formset, обрабатывает данные учеников и сохраняет их.
         """
         formset = self.get_formset()
         if not formset.is_valid():
             return self.form_invalid(formset)
 
         students_data = process_students_data(self.request.session, formset)
-        self.request.session["students_data"] = students_data
+        invalidate_cached_report(self.request.session)
+        save_students_data(self.request.session, students_data)
+        return super().form_valid(form)
+
+
+class StudentsDataUploadView(FormView):
+    """
+    Handles the upload of a CSV or XLSX file with all students data at once.
+    Обрабатывает загрузку CSV или XLSX файла сразу со всеми данными учеников.
+    """
+    form_class = StudentsFileUploadForm
+    template_name = "vpr/students_data_upload.html"
+    extra_context = {"Title": "Шаг 2. Загрузите файл"}
+    success_url = reverse_lazy("vpr:results")
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs["exercises_count"] = self.request.session.get('exercises_count')
+        return kwargs
+
+    def form_valid(self, form):
+        """
+        Assigns marks to the imported students and saves them.
+        Назначает оценки импортированным ученикам и сохраняет их.
+        """
+        students_data = process_imported_students_data(self.request.session, form.students_data)
+        invalidate_cached_report(self.request.session)
+        save_students_data(self.request.session, students_data)
         return super().form_valid(form)
 
 
-class ResultsAnalysisView(TemplateView):
+class ReportContextMixin:
+    """
+    Adds the report to the context lazily: it is calculated only if the cached fragment of the page is missing.
+    The fragment is keyed by the fingerprint of the current data and rules, calculated on every request.
+    Добавляет отчет в контекст лениво: он рассчитывается, только если закешированного фрагмента страницы нет.
+    Фрагмент кешируется по отпечатку текущих данных и правил, рассчитываемому при каждом запросе.
+    """
+    report_context_keys = ("chart_data", "table_marks", "table_students", "popular_mistakes", "other_data")
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        session = self.request.session
+        data = get_report_data(session)
+
+        def get_report_context():
+            return prepare_report_context({}, get_cached_report(data=data, session=session))
+
+        report_context = SimpleLazyObject(get_report_context)
+        for key in self.report_context_keys:
+            context[key] = SimpleLazyObject(lambda key=key: report_context[key])
+
+        context["report_fingerprint"] = get_data_fingerprint(data)
+        context["report_cache"] = get_report_cache_alias()
+        context["report_cache_timeout"] = get_report_cache_timeout()
+        return context
+
+
+class ResultsAnalysisView(ReportContextMixin, TemplateView):
     """
     Displays the "VPR analysis" report.
     Отображает отчет "Анализ ВПР"
@@ -83,15 +154,239 @@ class ResultsAnalysisView(TemplateView):
     template_name = "vpr/results_analysis.html"
     extra_context = {"Title": "Анализ ВПР"}
 
-    def get_context_data(self, **kwargs):
+
+class ResultsSnapshotView(ReportContextMixin, TemplateView):
+    """
+    Returns the report as a standalone HTML page ready for printing or saving to PDF.
+    Возвращает отчет отдельной HTML страницей, готовой для печати или сохранения в PDF.
+    """
+    template_name = "vpr/report/results_snapshot.html"
+    extra_context = {"Title": "Анализ ВПР"}
+
+    def render_to_response(self, context, **response_kwargs):
+        response = super().render_to_response(context, **response_kwargs)
+        response["Content-Disposition"] = f'attachment; filename="vpr_report_{context["report_fingerprint"][:12]}.html"'
+        return response
+
+
+class ReportJSONView(View):
+    """
+    Returns the report of the current session in JSON with English metric keys,
+    ?metrics=quality_exam,success_exam limits the report to the named metrics.
+    Возвращает отчет текущей сессии в JSON с английскими ключами метрик,
+    ?metrics=quality_exam,success_exam ограничивает отчет указанными метриками.
+    """
+
+    def get(self, request, *args, **kwargs):
+        data = get_report_data(request.session)
+        if data["students_data"] is None:
+            raise Http404("Данные учеников не найдены")
+
+        metrics = request.GET.get("metrics")
+        try:
+            report = calculate_report(data, metrics=metrics.split(",") if metrics else None)
+        except KeyError as error:
+            return JsonResponse({"error": f"Неизвестная метрика: {error.args[0]}"}, status=400,
+                                json_dumps_params={"ensure_ascii": False})
+        return JsonResponse(report, json_dumps_params={"ensure_ascii": False})
+
+
+class ReportsNDJSONView(PermissionRequiredMixin, View):
+    """
+    Streams reports of all saved classes as NDJSON, one class per line, e.g. for a district dashboard.
+    Передает потоком отчеты всех сохраненных классов в NDJSON, по одному классу в строке, например, для
+    районной панели мониторинга.
+    """
+    permission_required = "vpr.view_studentresult"
+
+    def get(self, request, *args, **kwargs):
+        exam_wave_id = request.GET.get("exam_wave")
+        if exam_wave_id is not None and not exam_wave_id.isdigit():
+            return JsonResponse({"error": "exam_wave должен быть числом"}, status=400,
+                                json_dumps_params={"ensure_ascii": False})
+
+        classes = iter_saved_classes(int(exam_wave_id) if exam_wave_id is not None else None)
+        lines = (to_ndjson_line(item) for item in iter_class_reports(classes))
+        return StreamingHttpResponse(lines, content_type="application/x-ndjson; charset=utf-8")
+
+
+class TrendView(PermissionRequiredMixin, View):
+    """
+    Returns in JSON the results of a class, a school or a student over all exam waves and their trends.
+    Возвращает в JSON результаты класса, школы или ученика во всех проведениях ВПР и их тренды.
+    """
+    permission_required = "vpr.view_studentresult"
+    get_trend = None
+
+    def get(self, request, pk, *args, **kwargs):
+        trend = self.get_trend(pk)
+        if not trend["waves"]:
+            raise Http404("Результаты не найдены")
+        return JsonResponse(trend, json_dumps_params={"ensure_ascii": False})
+
+
+class BoundarySimulationView(View):
+    """
+    Returns in JSON the exam marks, quality, success and the mark threshold verification of the current class
+    for every combination of candidate boundaries, e.g. ?points_for_3=5-8&points_for_4=9-12&points_for_5=13-16.
+    Возвращает в JSON оценки за экзамен, качество, успеваемость и проверку нижней границы 3-ки текущего класса
+    для каждого сочетания вариантов границ, например, ?points_for_3=5-8&points_for_4=9-12&points_for_5=13-16.
+    """
+
+    def get(self, request, *args, **kwargs):
+        form = BoundarySimulationForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({"errors": form.errors}, status=400, json_dumps_params={"ensure_ascii": False})
+
+        simulator = BoundarySimulator(self.get_aggregates())
+        return JsonResponse({"present_count": simulator.present_count,
+                             "results": simulator.simulate_grid(form.cleaned_data["boundaries"])},
+                            json_dumps_params={"ensure_ascii": False})
+
+    def get_aggregates(self):
+        students_data = get_report_data(self.request.session)["students_data"]
+        if students_data is None:
+            raise Http404("Данные учеников не найдены")
+        return Students(students_data).aggregates
+
+
+class WaveBoundarySimulationView(PermissionRequiredMixin, BoundarySimulationView):
+    """
+    The boundary simulator over all saved classes of an exam wave, e.g. of a region.
+    Симулятор границ по всем сохраненным классам проведения ВПР, например, региона.
+    """
+    permission_required = "vpr.view_studentresult"
+
+    def get_aggregates(self):
+        aggregates = load_wave_aggregates(self.kwargs["pk"])
+        if not aggregates.total_count:
+            raise Http404("Результаты не найдены")
+        return aggregates
+
+
+class ItemAnalysisView(View):
+    """
+    Returns in JSON the solve rate, partial credit rate, mean score and discrimination of every task
+    of the current class.
+    Возвращает в JSON долю решивших, долю частичных баллов, средний балл и дискриминативность каждого задания
+    текущего класса.
+    """
+
+    def get(self, request, *args, **kwargs):
+        students_data = get_report_data(request.session)["students_data"]
+        if students_data is None:
+            raise Http404("Данные учеников не найдены")
+
+        analysis = Students(students_data).item_analysis
+        return JsonResponse({"present_count": analysis.present_count, "tasks": analysis.get_items()},
+                            json_dumps_params={"ensure_ascii": False})
+
+
+class WaveItemAnalysisView(PermissionRequiredMixin, View):
+    """
+    Returns in JSON the item analysis of an exam wave from the stored index,
+    ?class_group=ID or ?school=ID limits it to one class or school.
+    Возвращает в JSON анализ заданий проведения ВПР из сохраненного индекса,
+    ?class_group=ID или ?school=ID ограничивает его одним классом или школой.
+    """
+    permission_required = "vpr.view_studentresult"
+
+    def get(self, request, pk, *args, **kwargs):
+        try:
+            filters = get_number_parameters(request, ("class_group", "school"))
+        except ValueError as error:
+            return JsonResponse({"error": str(error)}, status=400, json_dumps_params={"ensure_ascii": False})
+
+        analysis = get_wave_item_analysis(pk, class_group_id=filters["class_group"], school_id=filters["school"])
+        if not analysis["classes_count"]:
+            raise Http404("Результаты не найдены")
+        return JsonResponse(analysis, json_dumps_params={"ensure_ascii": False})
+
+
+class WaveSimilarityView(PermissionRequiredMixin, View):
+    """
+    Returns in JSON pairs of students of an exam wave with improbably coinciding task scores, within and across
+    classes. ?class_group=ID or ?school=ID limits the check, ?max_differences=N sets how many tasks may differ.
+    Возвращает в JSON пары учеников проведения ВПР с маловероятно совпадающими баллами за задания, внутри классов
+    и между ними. ?class_group=ID или ?school=ID ограничивает проверку, ?max_differences=N задает, во скольких
+    заданиях допускаются отличия.
+    """
+    permission_required = "vpr.view_studentresult"
+
+    def get(self, request, pk, *args, **kwargs):
+        try:
+            parameters = get_number_parameters(request, ("class_group", "school", "max_differences"))
+        except ValueError as error:
+            return JsonResponse({"error": str(error)}, status=400, json_dumps_params={"ensure_ascii": False})
+
+        similarity = get_wave_similar_pairs(pk, class_group_id=parameters["class_group"],
+                                            school_id=parameters["school"],
+                                            max_differences=parameters["max_differences"])
+        if not similarity["checked_count"]:
+            raise Http404("Результаты не найдены")
+        return JsonResponse(similarity, json_dumps_params={"ensure_ascii": False})
+
+
+def get_number_parameters(request, names) -> dict:
+    """
+    Returns optional non-negative integer GET parameters, None for missing ones, raises ValueError for others.
+    Возвращает необязательные неотрицательные целые GET параметры, None для отсутствующих, для других значений
+    выбрасывает ValueError.
+    """
+    parameters = {}
+    for name in names:
+        value = request.GET.get(name)
+        if value is not None and not value.isdigit():
+            raise ValueError(f"{name} должен быть числом")
+        parameters[name] = int(value) if value is not None else None
+    return parameters
+
+
+def profiling_metrics_view(request):
+    """
+    Returns report timings in the Prometheus text format, only for requests from VPR_METRICS_ALLOWED_IPS.
+    Возвращает замеры отчетов в текстовом формате Prometheus, только для запросов с VPR_METRICS_ALLOWED_IPS.
+    """
+    if request.META.get("REMOTE_ADDR") not in getattr(settings, "VPR_METRICS_ALLOWED_IPS", ("127.0.0.1", "::1")):
+        raise Http404
+    return HttpResponse(profiling_registry.to_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+class StudentEditView(FormView):
+    """
+    Handles the correction of one student's data on the results page.
+    Обрабатывает исправление данных одного ученика на странице результатов.
+    """
+    form_class = StudentsDataForm
+    template_name = "vpr/student_edit.html"
+    extra_context = {"Title": "Исправление данных ученика"}
+    success_url = reverse_lazy("vpr:results")
+
+    def dispatch(self, request, *args, **kwargs):
+        self.report_data = get_report_data(request.session)
+        self.index = kwargs["position"] - 1
+        if not 0 <= self.index < len(self.report_data["students_data"] or []):
+            raise Http404("Ученик не найден")
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_initial(self):
+        return self.report_data["students_data"][self.index]
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs["exercises_count"] = self.request.session.get('exercises_count', 1)
+        return kwargs
+
+    def form_valid(self, form):
         """
-        Adds report data to the context.
-        Добавляет данные отчета в контекст.
+        Saves the corrected student and recalculates the report only by the delta of this student.
+        Сохраняет исправленного ученика и пересчитывает отчет только по изменениям этого ученика.
         """
-        context = super().get_context_data(**kwargs)
-        report = get_report(data=self.request.session)
-        context.update(prepare_report_context(context, report))
-        return context
+        session = self.request.session
+        student = process_edited_student_data(session, form.cleaned_data)
+        update_student_data(session, self.index, student)
+        update_cached_report(session, self.report_data, self.index, student)
+        return super().form_valid(form)
 
 
 def instructions_view(request):
@@ -109,12 +404,11 @@ class ContactsView(FormView):
         email = cd.get("email", "unknown")
         message = cd.get("message")
 
-        send_mail(subject=f"Анализ ВПР, новое сообщене от {name}",
-                  message=f"Email: {email}\n\n{message}",
-                  from_email="braynin-alex@mail.ru",
-                  recipient_list=["braynin-alex@mail.ru"],
-                  fail_silently=False,
-                  )
+        queue_mail(subject=f"Анализ ВПР, новое сообщене от {name}",
+                   message=f"Email: {email}\n\n{message}",
+                   from_email="braynin-alex@mail.ru",
+                   recipient_list=["braynin-alex@mail.ru"],
+                   )
         messages.success(self.request, "Ваше сообщение отправлено!")
         return super().form_valid(form)
 